@@ -42,8 +42,12 @@ def main():
     _logger.info('=== Starting netbiostracker ===')
 
     addresses = tracker.get_addresses_to_scan(config.get_exceptions())
-    scanresult = tracker.scan(addresses)
-    parsed_results = tracker.parse(scanresult, config.get_encoding())
+    parsed_results = list(tracker.scan_in_parallel(
+        addresses,
+        workers=config.get_workers(),
+        bandwidth=config.get_bandwidth(),
+        shard_size=config.get_shard_size(),
+    ))
     tracker.update_database(parsed_results)
 
     _logger.info('Scanned %d addresses, got %d results in %.2f seconds',
@@ -20,14 +20,16 @@
 
 import gc
 import logging
+from collections import defaultdict
 from datetime import datetime
+from itertools import chain
 
 from django.db import transaction, reset_queries
 from django.utils.lru_cache import lru_cache
 
 from nav.models.profiles import (Account, AccountAlertQueue, AlertSubscription,
                                  AlertAddress, FilterGroup, AlertPreference,
-                                 TimePeriod)
+                                 TimePeriod, Expression)
 from nav.models.event import AlertQueue
 
 
@@ -122,7 +124,6 @@ def check_alerts(debug=False):
 @transaction.atomic()
 def handle_new_alerts(new_alerts):
     """Handles new alerts on the queue"""
-    memoized_check_alert = lru_cache()(check_alert_against_filtergroupcontents)
     logger = logging.getLogger('nav.alertengine.handle_new_alerts')
     accounts = []
 
@@ -157,13 +158,16 @@ def handle_new_alerts(new_alerts):
         for alertsubscription in current_alertsubscriptions:
             tmp.append(
                 (alertsubscription,
-                 alertsubscription.filter_group.filtergroupcontent_set.all()))
+                 alertsubscription.filter_group.filtergroupcontent_set
+                 .select_related('filter')))
 
         if tmp:
             permissions = []
             for filtergroup in FilterGroup.objects.filter(
                     group_permissions__accounts__in=[account]):
-                permissions.append(filtergroup.filtergroupcontent_set.all())
+                permissions.append(
+                    filtergroup.filtergroupcontent_set.select_related(
+                        'filter'))
 
             accounts.append((account, tmp, permissions))
             del permissions
@@ -172,26 +176,192 @@ def handle_new_alerts(new_alerts):
         del current_alertsubscriptions
         del account
 
+    evaluator = FilterEvaluator(new_alerts, _get_filters(accounts))
+
+    @lru_cache()
+    def memoized_check_alert(alert, filtergroupcontents, atype):
+        return check_alert_against_filtergroupcontents(
+            alert, filtergroupcontents, atype, evaluator)
+
     # Remember which alerts are sent where to avoid duplicates
     dupemap = set()
 
-    # Check all acounts against all their active subscriptions
-    for account, alertsubscriptions, permissions in accounts:
-        logger.debug("Checking new alerts for account '%s'", account)
+    # Check all alerts against the active subscriptions they can match
+    index = SubscriptionIndex(accounts, evaluator)
+    for alert in new_alerts:
+        candidates = index.get_candidates(alert)
+        logger.debug("Checking alert %d against subscriptions of %d "
+                     "account(s)", alert.id, len(candidates))
 
-        for alert in new_alerts:
+        for account, alertsubscriptions, permissions in candidates:
             _check_match_and_permission(account, alert, alertsubscriptions,
                                         dupemap, logger, memoized_check_alert,
                                         permissions)
-            del alert
-        del account
-        del permissions
+        del alert
+        del candidates
 
     del memoized_check_alert
+    del index
     del new_alerts
     gc.collect()
 
 
+def _get_filters(accounts):
+    """Returns all the distinct filters used by the filter group contents of
+    accounts, as built by handle_new_alerts()
+
+    """
+    filters = {}
+    for _account, alertsubscriptions, permissions in accounts:
+        contents = chain(
+            chain.from_iterable(
+                contents for _subscription, contents in alertsubscriptions),
+            chain.from_iterable(permissions))
+        for content in contents:
+            filters[content.filter_id] = content.filter
+    return list(filters.values())
+
+
+class FilterEvaluator(object):
+    """Verifies alerts against filters compiled into Python predicates.
+
+    Each filter is compiled only once, and all the alert attributes needed by
+    the compiled filters are fetched up front using a single query.
+
+    """
+    def __init__(self, alerts, filters):
+        self._compiled = {}
+        self._attributes = {}
+
+        expressions = defaultdict(list)
+        for expression in Expression.objects.filter(
+                filter__in=filters).select_related('match_field'):
+            expressions[expression.filter_id].append(expression)
+        for filtr in filters:
+            self._compiled[filtr.id] = filtr.compile(expressions[filtr.id])
+
+        self._lookups = set(chain.from_iterable(
+            compiled.lookups for compiled in self._compiled.values()))
+        if self._lookups and alerts:
+            for attributes in AlertQueue.objects.filter(
+                    id__in=[alert.id for alert in alerts]).values(
+                        'id', *self._lookups):
+                self._attributes[attributes['id']] = attributes
+
+    def get_compiled(self, filtr):
+        """Returns the compiled version of filtr"""
+        compiled = self._compiled.get(filtr.id)
+        if compiled is None:
+            compiled = self._compiled[filtr.id] = filtr.compile()
+        return compiled
+
+    def get_attributes(self, alert, lookups=()):
+        """Returns a dict of alert's attribute values, containing at least
+        the given lookups, or None if the alert no longer exists.
+
+        """
+        attributes = self._attributes.get(alert.id, {})
+        if not self._lookups.union(lookups).issubset(attributes):
+            self._lookups.update(lookups)
+            attributes = AlertQueue.objects.filter(id=alert.id).values(
+                'id', *self._lookups).first()
+            if attributes is None:
+                return None
+            self._attributes[alert.id] = attributes
+        return attributes
+
+    def verify(self, filtr, alert):
+        """Verifies whether alert matches filtr"""
+        compiled = self.get_compiled(filtr)
+        attributes = self.get_attributes(alert, compiled.lookups)
+        if attributes is None:
+            return False
+        return compiled.verify(alert, attributes)
+
+
+class SubscriptionIndex(object):
+    """An inverted index of the alert subscriptions of a list of accounts,
+    used to find the subscriptions an alert can possibly match.
+
+    Subscriptions are indexed by the (attribute, value) pairs that the
+    filters included by their filter groups require an alert to have, as
+    given by compiled equality expressions. Subscriptions that cannot be
+    indexed this way are candidates for every alert.
+
+    """
+    def __init__(self, accounts, evaluator):
+        """Builds the index.
+
+        :param accounts: A list of (account, alertsubscriptions, permissions)
+                         tuples, as built by handle_new_alerts().
+        :param evaluator: A FilterEvaluator instance.
+        """
+        self._accounts = accounts
+        self._evaluator = evaluator
+        self._index = defaultdict(set)
+        self._unindexed = set()
+
+        for account_index, (_account, alertsubscriptions,
+                            _permissions) in enumerate(accounts):
+            for subscription_index, (_subscription, filtergroupcontents) \
+                    in enumerate(alertsubscriptions):
+                key = (account_index, subscription_index)
+                index_keys = self._get_index_keys(filtergroupcontents)
+                if index_keys is None:
+                    self._unindexed.add(key)
+                for index_key in index_keys or ():
+                    self._index[index_key].add(key)
+
+        self._lookups = set(lookup for lookup, _value in self._index)
+
+    def _get_index_keys(self, filtergroupcontents):
+        """Returns the (attribute, value) pairs of which an alert must have
+        at least one to match the filter group contents, or None if there
+        is no such set of pairs.
+
+        """
+        index_keys = set()
+        for content in filtergroupcontents:
+            if not content.include:
+                continue
+            if not content.positive:
+                # inverted filters match anything but their own matches
+                return None
+            equalities = self._evaluator.get_compiled(
+                content.filter).equalities
+            if not equalities:
+                return None
+            lookup, values = min(equalities.items(),
+                                 key=lambda item: len(item[1]))
+            index_keys.update((lookup, value) for value in values)
+        return index_keys
+
+    def get_candidates(self, alert):
+        """Returns the subscriptions that alert can possibly match.
+
+        :returns: A list of (account, alertsubscriptions, permissions) tuples
+                  like the one this index was built from, leaving out the
+                  subscriptions, and accounts, that alert cannot match.
+        """
+        keys = set(self._unindexed)
+        attributes = self._evaluator.get_attributes(alert, self._lookups)
+        if attributes is not None:
+            for lookup in self._lookups:
+                keys.update(self._index.get((lookup, attributes[lookup]), ()))
+
+        candidates = []
+        for account_index in sorted(set(key[0] for key in keys)):
+            account, alertsubscriptions, permissions = (
+                self._accounts[account_index])
+            alertsubscriptions = [
+                subscription
+                for subscription_index, subscription
+                in enumerate(alertsubscriptions)
+                if (account_index, subscription_index) in keys]
+            candidates.append((account, alertsubscriptions, permissions))
+        return candidates
+
+
 def _check_match_and_permission(account, alert, alertsubscriptions, dupemap,
                                 logger, memoized_check_alert, permissions):
     for alertsubscription, filtergroupcontents in alertsubscriptions:
@@ -428,8 +598,17 @@ def alert_should_be_ignored(queued_alert, subscription, now):
             subscription.type != AlertSubscription.NOW)
 
 
-def check_alert_against_filtergroupcontents(alert, filtergroupcontents, atype):
-    """Checks a given alert against an array of filtergroupcontents"""
+def check_alert_against_filtergroupcontents(alert, filtergroupcontents, atype,
+                                            evaluator=None):
+    """Checks a given alert against an array of filtergroupcontents
+
+    :param evaluator: An optional FilterEvaluator to verify filters with.
+    """
+    if evaluator:
+        verify = evaluator.verify
+    else:
+        def verify(filtr, alert):
+            return filtr.verify(alert)
 
     logger = logging.getLogger(
         'nav.alertengine.check_alert_against_filtergroupcontents')
@@ -446,7 +625,7 @@ def check_alert_against_filtergroupcontents(alert, filtergroupcontents, atype):
 
         # If we have not matched the message see if we can match it
         if not matches and content.include:
-            matches = content.filter.verify(alert) == content.positive
+            matches = verify(content.filter, alert) == content.positive
 
             if matches:
                 logger.debug('alert %d: got included by filter %d in %s',
@@ -454,7 +633,7 @@ def check_alert_against_filtergroupcontents(alert, filtergroupcontents, atype):
 
         # If the alert has been matched try excluding it
         elif matches and not content.include:
-            matches = content.filter.verify(alert) != content.positive
+            matches = verify(content.filter, alert) != content.positive
 
             # Log that we excluded the alert
             if not matches:
@@ -15,15 +15,19 @@
 #
 """Alert generator functionality for the eventEngine"""
 from collections import namedtuple
+import io
 import logging
 import os
 from pprint import pformat
 import re
+import time
 
-from django.template import loader
+from django.db import connection
+from django.template import engines, loader
+from django.template.backends.django import DjangoTemplates
 
 from nav.models.event import AlertQueue as Alert, EventQueue as Event, AlertType
-from nav.models.event import AlertHistory
+from nav.models.event import AlertHistory, AlertQueueVariable
 from nav.models.fields import INFINITY
 
 import nav.config
@@ -32,6 +36,7 @@ from . import unresolved
 ALERT_TEMPLATE_DIR = nav.config.find_configfile('alertmsg')
 _logger = logging.getLogger(__name__)
 _template_logger = logging.getLogger(__name__ + '.template')
+_current_batch = None
 
 
 class AlertGenerator(dict):
@@ -125,25 +130,51 @@ class AlertGenerator(dict):
         self.post_alert(history)
 
     def post_alert(self, history=None):
-        """Generates and posts an alert on the alert queue only"""
+        """Generates and posts an alert on the alert queue only.
+
+        If an AlertBatch is active, the alert is not saved until the batch is
+        flushed.
+
+        """
         _logger.debug("posting to alert queue for %r", self)
         alert = self.make_alert()
         alert.history = history
-        alert.save()
-        self._post_alert_messages(alert)
+        if _current_batch is not None:
+            _current_batch.add_alert(alert, self)
+        else:
+            alert.save()
+            self._post_alert_messages(alert)
         return alert
 
     def post_alert_history(self):
-        """Generates and posts an alert history record only"""
+        """Generates and posts an alert history record only.
+
+        If an AlertBatch is active, the record's messages are not saved until
+        the batch is flushed.
+
+        """
         _logger.debug("posting to alert history for %r", self)
         history = self.make_alert_history()
         if history:
             history.save()
-            self._post_alert_messages(history)
+            unresolved.register(history)
+            if _current_batch is not None:
+                _current_batch.add_messages(history, self)
+            else:
+                self._post_alert_messages(history)
         return history
 
     def _post_alert_messages(self, obj):
+        for msg in self._make_alert_messages(obj):
+            msg.save()
+
+    def _make_alert_messages(self, obj):
+        """Makes unsaved message objects for a saved alert queue or alert
+        history object.
+
+        """
         msg_class = obj.messages.model
+        messages = []
         for details, text in self._make_messages():
             msg = msg_class(type=details.msgtype,
                             language=details.language,
@@ -153,7 +184,8 @@ class AlertGenerator(dict):
             elif hasattr(msg_class, 'alert_history'):
                 msg.alert_history = obj
                 msg.state = self.state
-            msg.save()
+            messages.append(msg)
+        return messages
 
     def _make_messages(self):
         if self._messages is None:
@@ -178,6 +210,120 @@ class AlertGenerator(dict):
             return
 
 
+class AlertBatch(object):
+    """Collects alert queue records, alert messages and event deletions
+    posted while the batch is active, and writes them to the database in bulk
+    when the batch is flushed.
+
+    Use as a context manager; the batch is flushed on exit, unless an
+    exception was raised::
+
+        with AlertBatch():
+            for event in events:
+                handle(event)
+
+    """
+    def __init__(self):
+        self._alerts = []
+        self._messages = []
+        self._deleted_events = []
+
+    def __enter__(self):
+        global _current_batch  # pylint: disable=W0603
+        _current_batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _current_batch  # pylint: disable=W0603
+        _current_batch = None
+        if exc_type is None:
+            self.flush()
+
+    def add_alert(self, alert, generator):
+        """Adds an unsaved alert queue object and its messages to the batch"""
+        self._alerts.append((alert, generator))
+
+    def add_messages(self, obj, generator):
+        """Adds the messages of a saved alert history object to the batch"""
+        self._messages.append((obj, generator))
+
+    def delete_event(self, event):
+        """Marks an event as deleted, deferring the actual deletion until the
+        batch is flushed.
+
+        """
+        if event.id:
+            self._deleted_events.append((event, event.id))
+            event.id = None
+
+    def mark(self):
+        """Returns a marker of the current batch contents, for use with
+        rollback().
+
+        """
+        return (len(self._alerts), len(self._messages),
+                len(self._deleted_events))
+
+    def rollback(self, mark):
+        """Discards everything added to the batch since mark() was called"""
+        alerts, messages, deleted_events = mark
+        del self._alerts[alerts:]
+        del self._messages[messages:]
+        for event, event_id in self._deleted_events[deleted_events:]:
+            event.id = event_id
+        del self._deleted_events[deleted_events:]
+
+    def flush(self):
+        """Writes the batch contents to the database"""
+        _logger.debug("flushing %d alerts, messages of %d alert history "
+                      "records and %d event deletions", len(self._alerts),
+                      len(self._messages), len(self._deleted_events))
+        self._save_alerts()
+
+        messages = [msg for obj, generator in self._alerts + self._messages
+                    for msg in generator._make_alert_messages(obj)]
+        for msg_class in set(type(msg) for msg in messages):
+            msg_class.objects.bulk_create(
+                [msg for msg in messages if type(msg) is msg_class])
+
+        if self._deleted_events:
+            Event.objects.filter(
+                id__in=[event_id for _, event_id in self._deleted_events]
+            ).delete()
+
+        self._alerts = []
+        self._messages = []
+        self._deleted_events = []
+
+    def _save_alerts(self):
+        alerts = [alert for alert, _ in self._alerts]
+        if not getattr(connection.features, 'can_return_ids_from_bulk_insert',
+                       False):
+            for alert in alerts:
+                alert.save()
+            return
+
+        variables = [(alert, alert.varmap) for alert in alerts]
+        Alert.objects.bulk_create(alerts)
+        AlertQueueVariable.objects.bulk_create(
+            AlertQueueVariable(alert_queue=alert, variable=key, value=value)
+            for alert, varmap in variables
+            for key, value in varmap.items())
+
+
+def delete_event(event):
+    """Deletes an event from the event queue.
+
+    If an AlertBatch is active, the deletion is deferred until the batch is
+    flushed.
+
+    """
+    if _current_batch is not None:
+        _current_batch.delete_event(event)
+    else:
+        event.delete()
+
+
 ###
 ### Alert message template processing
 ###
@@ -201,6 +347,119 @@ def ensure_alert_templates_are_available():
             config['DIRS'] += (ALERT_TEMPLATE_DIR,)
 
 
+class TemplateRegistry(object):
+    """A registry of the alert message templates found in a directory.
+
+    The directory is only scanned once, and each template is only compiled
+    once. At most every CHECK_INTERVAL seconds, the registry checks whether
+    any templates have been added, removed or modified, and if so, reloads
+    everything.
+
+    """
+    CHECK_INTERVAL = 10
+
+    def __init__(self, directory=ALERT_TEMPLATE_DIR):
+        self.directory = directory
+        self._details = {}
+        self._compiled = {}
+        self._signature = None
+        self._last_check = None
+
+    def get_templates(self, event_type, alert_type="default"):
+        """Returns a list of (TemplateDetails, template) tuples for the
+        available alert message templates for the given event_type and
+        alert_type.
+
+        """
+        return [(details, self.get_template(details))
+                for details in self.get_details(event_type, alert_type)]
+
+    def get_details(self, event_type, alert_type="default"):
+        """Returns a list of TemplateDetails objects for the available alert
+        message templates for the given event_type and alert_type, without
+        compiling the templates.
+
+        """
+        self.refresh()
+        return list(self._details.get((event_type, alert_type), []))
+
+    def get_template(self, details):
+        """Returns the compiled template described by a TemplateDetails
+        object.
+
+        """
+        template = self._compiled.get(details.name)
+        if template is None:
+            path = os.path.join(self.directory, details.name)
+            with io.open(path, encoding='utf-8') as source:
+                template = _get_template_engine().from_string(source.read())
+            self._compiled[details.name] = template
+        return template
+
+    def refresh(self):
+        """Reloads the registry if any templates have changed since it was
+        last loaded, but only if CHECK_INTERVAL seconds have passed since the
+        last check.
+
+        """
+        now = time.time()
+        if self._last_check and now - self._last_check < self.CHECK_INTERVAL:
+            return
+        self._last_check = now
+
+        signature = self._get_signature()
+        if signature != self._signature:
+            _template_logger.debug("(re)loading alert message templates "
+                                   "from %s", self.directory)
+            self._load()
+            self._signature = signature
+
+    def _get_signature(self):
+        """Returns the modification times of the template directory tree"""
+        signature = {}
+        for dirpath, _dirnames, filenames in os.walk(self.directory):
+            for name in [''] + filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    signature[path] = os.stat(path).st_mtime
+                except OSError:
+                    pass
+        return signature
+
+    def _load(self):
+        ensure_alert_templates_are_available()
+        self._compiled = {}
+        self._details = {}
+        if not os.path.isdir(self.directory):
+            return
+        for event_type in os.listdir(self.directory):
+            directory = os.path.join(self.directory, event_type)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                match = TEMPLATE_PATTERN.search(name)
+                if match:
+                    key = (event_type, match.group('alert_type'))
+                    self._details.setdefault(key, []).append(TemplateDetails(
+                        os.path.join(event_type, name),
+                        match.group('msgtype'),
+                        match.group('language') or DEFAULT_LANGUAGE))
+
+
+def _get_template_engine():
+    """Returns the Django template engine used to compile alert message
+    templates.
+
+    """
+    for engine in engines.all():
+        if isinstance(engine, DjangoTemplates):
+            return engine
+    return engines.all()[0]
+
+
+_registry = TemplateRegistry()
+
+
 def render_templates(alert):
     """Renders and returns message template based on the parameters of `alert`.
 
@@ -208,24 +467,27 @@ def render_templates(alert):
     :return: A list of (TemplateDetails, <rendered_unicode>) tuples
 
     """
-    ensure_alert_templates_are_available()
     templates = (
-        get_list_of_templates_for(alert.event_type.id, alert.alert_type)
-        or get_list_of_templates_for(alert.event_type.id)
+        _registry.get_templates(alert.event_type.id, alert.alert_type)
+        or _registry.get_templates(alert.event_type.id)
         )
     if not templates:
         _logger.error("no templates defined for %r, sending generic alert "
                       "message", alert)
         templates = [
-            TemplateDetails("default-email.txt", "email", DEFAULT_LANGUAGE),
-            TemplateDetails("default-sms.txt", "sms", DEFAULT_LANGUAGE),
-            ]
+            (details, _registry.get_template(details)) for details in (
+                TemplateDetails("default-email.txt", "email",
+                                DEFAULT_LANGUAGE),
+                TemplateDetails("default-sms.txt", "sms", DEFAULT_LANGUAGE),
+            )]
 
-    return [_render_template(template, alert) for template in templates]
+    return [_render_template(details, alert, template)
+            for details, template in templates]
 
 
-def _render_template(details, alert):
-    template = loader.get_template(details.name)
+def _render_template(details, alert, template=None):
+    if template is None:
+        template = loader.get_template(details.name)
     context = dict(alert)
     context.update(vars(alert))
     context.update(dict(msgtype=details.msgtype,
@@ -241,24 +503,11 @@ def _render_template(details, alert):
 
 def get_list_of_templates_for(event_type, alert_type="default"):
     """Returns a list of TemplateDetails objects for the available alert
-    message templates for the given event_type and alert_type.
+    message templates for the given event_type and alert_type, as found by
+    the same template registry that render_templates() uses.
 
     """
-    def _matcher(name):
-        match = TEMPLATE_PATTERN.search(name)
-        if match and match.group('alert_type') == alert_type:
-            return match
-
-    directory = os.path.join(ALERT_TEMPLATE_DIR, event_type)
-    if os.path.isdir(directory):
-        matches = [(_matcher(name), os.path.join(event_type, name))
-                   for name in os.listdir(directory)]
-    else:
-        matches = []
-    return [TemplateDetails(name,
-                            match.group('msgtype'),
-                            match.group('language') or DEFAULT_LANGUAGE)
-            for match, name in matches if match]
+    return _registry.get_details(event_type, alert_type)
 
 
 # pylint sucks on namedtuples
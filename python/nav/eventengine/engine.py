@@ -21,6 +21,10 @@ SQL is needed::
 
     CREATE RULE eventq_notify AS ON INSERT TO eventq DO ALSO NOTIFY new_event;
 
+The engine also listens for topology_changed notifications, which navtopology
+sends whenever it has updated the VLAN topology, to invalidate its cached
+topology graphs.
+
 """
 import logging
 import sched
@@ -30,8 +34,9 @@ from functools import wraps
 import errno
 from psycopg2 import OperationalError
 from nav.eventengine.plugin import EventHandler
-from nav.eventengine.alerts import AlertGenerator
+from nav.eventengine.alerts import AlertBatch, AlertGenerator, delete_event
 from nav.eventengine.config import EVENTENGINE_CONF
+from nav.eventengine import topology
 from nav.eventengine import unresolved
 from nav.models.event import EventQueue as Event
 import nav.db
@@ -81,6 +86,8 @@ class EventEngine(object):
     # too often, since we rely on PostgreSQL notification when new events are
     # inserted into the queue.
     CHECK_INTERVAL = 30
+    # max number of events to handle in a single transaction
+    BATCH_SIZE = 500
     PLUGIN_TASKS_PRIORITY = 1
     _logger = logging.getLogger(__name__)
 
@@ -115,9 +122,15 @@ class EventEngine(object):
                 self._listen()
                 return
             if conn.notifies:
-                self._logger.debug("got event notification from database")
-                self._schedule_next_queuecheck()
+                channels = set(notify.channel for notify in conn.notifies)
                 del conn.notifies[:]
+                if 'topology_changed' in channels:
+                    self._logger.debug("got topology notification from "
+                                       "database")
+                    topology.invalidate_graph_cache()
+                if 'new_event' in channels:
+                    self._logger.debug("got event notification from database")
+                    self._schedule_next_queuecheck()
         else:
             time.sleep(delay)
 
@@ -132,13 +145,14 @@ class EventEngine(object):
     @retry_on_db_loss()
     @transaction.atomic()
     def _listen():
-        """Ensures that we subscribe to new_event notifications on our
-        PostgreSQL connection.
+        """Ensures that we subscribe to new_event and topology_changed
+        notifications on our PostgreSQL connection.
 
         """
         _logger.debug("registering event listener with PostgreSQL")
         cursor = connection.cursor()
         cursor.execute('LISTEN new_event')
+        cursor.execute('LISTEN topology_changed')
 
     def _load_new_events_and_reschedule(self):
         self.load_new_events()
@@ -153,7 +167,6 @@ class EventEngine(object):
         self._scheduler.enter(delay, 0, action, ())
 
     @swallow_unhandled_exceptions
-    @transaction.atomic()
     def load_new_events(self):
         "Loads and processes new events on the queue, if any"
         self._logger.debug("checking for new events on queue")
@@ -165,18 +178,38 @@ class EventEngine(object):
                           if event.id not in self._unfinished]
             self._logger.info("found %d new and %d old events in queue db",
                               len(new_events), len(old_events))
-            for event in new_events:
-                unresolved.update()
+            for index in range(0, len(new_events), self.BATCH_SIZE):
+                self._handle_event_batch(
+                    new_events[index:index + self.BATCH_SIZE])
+
+        self._log_task_queue()
+
+    @transaction.atomic()
+    def _handle_event_batch(self, events):
+        """Handles a batch of events in a single transaction.
+
+        Alerts, alert messages and event deletions resulting from the batch
+        are written to the database in bulk once all the events have been
+        handled.
+
+        """
+        with AlertBatch() as batch:
+            for event in events:
+                unresolved.update_if_stale()
+                mark = batch.mark()
                 try:
-                    self.handle_event(event)
+                    with transaction.atomic():
+                        self.handle_event(event)
                 except Exception:
                     self._logger.exception("Unhandled exception while "
                                            "handling %s, deleting event",
                                            event)
+                    # database changes made while handling the event have
+                    # been rolled back to the savepoint; discard the rest
+                    batch.rollback(mark)
+                    unresolved.invalidate()
                     if event.id:
-                        event.delete()
-
-        self._log_task_queue()
+                        delete_event(event)
 
     def _log_task_queue(self):
         logger = logging.getLogger(__name__ + '.queue')
@@ -213,7 +246,7 @@ class EventEngine(object):
             self._logger.info('Ignoring duplicate %s event for %s',
                               event.event_type, event.netbox)
             self._logger.debug('ignored alert details: %r', event)
-        event.delete()
+        delete_event(event)
 
     @staticmethod
     def _box_is_on_maintenance(event):
@@ -245,7 +278,7 @@ class EventEngine(object):
                 if len(queue) == 1 and event.id:
                     # there's only one handler and it failed,
                     # this will probably never be handled, so we delete it
-                    event.delete()
+                    delete_event(event)
 
         if event.id:
             self._logger.debug("event wasn't disposed of, "
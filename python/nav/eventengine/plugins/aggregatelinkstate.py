@@ -15,7 +15,7 @@
 #
 from nav.eventengine import unresolved
 from nav.eventengine.plugin import EventHandler
-from nav.eventengine.alerts import AlertGenerator
+from nav.eventengine.alerts import AlertGenerator, delete_event
 
 
 class AggregateLinkStateHandler(EventHandler):
@@ -51,7 +51,7 @@ class AggregateLinkStateHandler(EventHandler):
         else:
             alert.post()
 
-        event.delete()
+        delete_event(event)
 
     def _handle_duplicate(self, alert, existing_alert):
         interface = self.event.get_subject()
@@ -61,9 +61,9 @@ class AggregateLinkStateHandler(EventHandler):
                            interface, vars(existing_alert))
         # Post just an alertq entry, but don't touch alerthist
         alert.post_alert(history=existing_alert)
-        self.event.delete()
+        delete_event(self.event)
 
     def _ignore(self, msg):
         interface = self.event.get_subject()
         self._logger.info("%s: %s Ignoring event.", interface, msg)
-        self.event.delete()
+        delete_event(self.event)
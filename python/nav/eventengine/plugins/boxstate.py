@@ -39,6 +39,9 @@ class BoxStateHandler(delayedstate.DelayedStateHandler):
 
     def _set_internal_state(self, state):
         netbox = self.get_target()
+        if (netbox.up == Netbox.UP_UP) != (state == Netbox.UP_UP):
+            # other boxes may be reachable through this one
+            self.forget_reachability()
         netbox.up = state
         Netbox.objects.filter(id=netbox.id).update(up=state)
 
@@ -14,11 +14,14 @@
 # along with NAV. If not, see <http://www.gnu.org/licenses/>.
 #
 """"Superclass for plugins that use delayed handling of state events"""
+import time
+
 from nav.eventengine import unresolved
 
-from nav.eventengine.topology import netbox_appears_reachable
+from nav.eventengine.topology import netboxes_appear_reachable
 from nav.models.manage import Netbox
 from nav.eventengine.plugin import EventHandler
+from nav.eventengine.alerts import delete_event
 
 
 class DelayedStateHandler(EventHandler):
@@ -29,9 +32,13 @@ class DelayedStateHandler(EventHandler):
     HAS_WARNING_ALERT = True
     WARNING_WAIT_TIME = 60
     ALERT_WAIT_TIME = 240
+    # max number of seconds to remember bulk reachability evaluations
+    REACHABILITY_CACHE_TIME = 30
 
     handled_types = (None,)
     __waiting_for_resolve = {}
+    __reachability = {}
+    __reachability_time = 0
 
     def __init__(self, *args, **kwargs):
         super(DelayedStateHandler, self).__init__(*args, **kwargs)
@@ -55,7 +62,7 @@ class DelayedStateHandler(EventHandler):
         else:
             self._logger.info("ignoring strange stateless %s event: %r",
                               event.event_type, event)
-            self.event.delete()
+            delete_event(self.event)
 
     def _handle_start(self):
         event = self.event
@@ -63,7 +70,7 @@ class DelayedStateHandler(EventHandler):
             self._logger.info(
                 "%s is already down, ignoring duplicate start event",
                 self.get_target())
-            event.delete()
+            delete_event(event)
         else:
             self._set_internal_state_down()
             if self.HAS_WARNING_ALERT:
@@ -139,7 +146,7 @@ class DelayedStateHandler(EventHandler):
             self._logger.info("no unresolved %s for %s, ignoring end event",
                               self.event.event_type, self.get_target())
 
-        self.event.delete()
+        delete_event(self.event)
 
     def _get_up_alert(self):
         raise NotImplementedError
@@ -191,7 +198,7 @@ class DelayedStateHandler(EventHandler):
 
         del self.__waiting_for_resolve[(type(self), self.get_target())]
         self.task = None
-        self.event.delete()
+        delete_event(self.event)
 
     def _get_down_alert(self):
         """Returns a ready-made AlertGenerator that can be used to post a
@@ -205,11 +212,43 @@ class DelayedStateHandler(EventHandler):
 
     def _verify_shadow(self):
         netbox = self.event.netbox
-        netbox.up = (Netbox.UP_DOWN if netbox_appears_reachable(netbox)
+        netbox.up = (Netbox.UP_DOWN if self._appears_reachable(netbox)
                      else Netbox.UP_SHADOW)
         Netbox.objects.filter(id=netbox.id).update(up=netbox.up)
         return netbox.up == Netbox.UP_SHADOW
 
+    def _appears_reachable(self, netbox):
+        """Returns True if netbox appears to be reachable through the known
+        topology.
+
+        When many boxes go down at once, their reachability would otherwise
+        be evaluated against the same VLAN topology over and over again.
+        Instead, all the netboxes currently waiting to be declared down are
+        evaluated in bulk, and the results are remembered until a netbox
+        changes between up and down, or REACHABILITY_CACHE_TIME has passed.
+
+        """
+        age = time.time() - DelayedStateHandler.__reachability_time
+        if age > self.REACHABILITY_CACHE_TIME:
+            self.forget_reachability()
+
+        if netbox.id not in self.__reachability:
+            netboxes = set(plugin.event.netbox
+                           for plugin in self.__waiting_for_resolve.values()
+                           if plugin.event.netbox)
+            netboxes.add(netbox)
+            if not self.__reachability:
+                DelayedStateHandler.__reachability_time = time.time()
+            verdicts = netboxes_appear_reachable(netboxes)
+            self.__reachability.update((box.id, verdict)
+                                       for box, verdict in verdicts.items())
+        return self.__reachability[netbox.id]
+
+    @classmethod
+    def forget_reachability(cls):
+        """Forgets all remembered netbox reachability evaluations"""
+        DelayedStateHandler.__reachability.clear()
+
     def schedule(self, delay, action, args=()):
         "Schedules a callback and makes a note of it in a class variable"
         self.task = self.engine.schedule(delay, action, args=args)
@@ -223,4 +262,4 @@ class DelayedStateHandler(EventHandler):
         self.task = None
         if self._get_waiting() == self:
             del self.__waiting_for_resolve[(type(self), self.get_target())]
-        self.event.delete()
+        delete_event(self.event)
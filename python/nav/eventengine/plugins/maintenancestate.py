@@ -16,7 +16,7 @@
 """maintenance handler plugin"""
 
 from nav.eventengine.plugin import EventHandler
-from nav.eventengine.alerts import AlertGenerator
+from nav.eventengine.alerts import AlertGenerator, delete_event
 
 
 class MaintenanceStateHandler(EventHandler):
@@ -32,7 +32,7 @@ class MaintenanceStateHandler(EventHandler):
         else:
             self._post_alert(event)
 
-        event.delete()
+        delete_event(event)
 
     def _post_alert(self, event):
         alert = AlertGenerator(event)
@@ -16,7 +16,7 @@
 """servicestate handler plugin"""
 
 from nav.eventengine.plugin import EventHandler
-from nav.eventengine.alerts import AlertGenerator
+from nav.eventengine.alerts import AlertGenerator, delete_event
 from nav.models.event import EventQueue as Event
 from nav.models.manage import Netbox
 from nav.models.service import Service
@@ -42,7 +42,7 @@ class ServiceStateHandler(EventHandler):
         else:
             alert.post()
 
-        event.delete()
+        delete_event(event)
 
     def _update_service(self):
         """Update state of service directly based on event"""
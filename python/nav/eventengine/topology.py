@@ -16,6 +16,7 @@
 """Topology evaluation functions for event processing"""
 import socket
 import datetime
+import time
 
 import networkx
 from networkx.exception import NetworkXException
@@ -24,21 +25,51 @@ from nav.models.manage import SwPortVlan, Netbox, Prefix, Arp, Cam
 import logging
 _logger = logging.getLogger(__name__)
 
+# Number of seconds to cache the topology graph of a VLAN. Cached graphs are
+# also invalidated whenever navtopology signals that it has updated the VLAN
+# topology.
+GRAPH_CACHE_TTL = 300
+_graph_cache = {}
+
 
 def netbox_appears_reachable(netbox):
     """Returns True if netbox appears to be reachable through the known
     topology.
 
     """
-    target_path = get_path_to_netbox(netbox)
-    nav = NAVServer.make_for(netbox.ip)
-    nav_path = get_path_to_netbox(nav) if nav else True
-    _logger.debug("reachability paths, target_path=%(target_path)r, "
-                  "nav_path=%(nav_path)r", locals())
-    return bool(target_path and nav_path)
+    return netboxes_appear_reachable([netbox])[netbox]
+
+
+def netboxes_appear_reachable(netboxes):
+    """Evaluates the reachability of multiple netboxes in one go.
+
+    Netboxes on the same VLAN are evaluated against the same topology graph,
+    and the path to the NAV server itself is only looked up once per source
+    address.
 
+    :returns: A dict mapping each netbox to True if it appears to be
+              reachable through the known topology, False otherwise.
+
+    """
+    graphs = {}
+    nav_paths = {}
+    result = {}
+    for netbox in netboxes:
+        target_path = get_path_to_netbox(netbox, graphs)
+        nav = NAVServer.make_for(netbox.ip)
+        if nav:
+            if nav.ip not in nav_paths:
+                nav_paths[nav.ip] = get_path_to_netbox(nav, graphs)
+            nav_path = nav_paths[nav.ip]
+        else:
+            nav_path = True
+        _logger.debug("reachability paths for %s, target_path=%r, "
+                      "nav_path=%r", netbox, target_path, nav_path)
+        result[netbox] = bool(target_path and nav_path)
+    return result
 
-def get_path_to_netbox(netbox):
+
+def get_path_to_netbox(netbox, graphs=None):
     """Returns a likely path from netbox to its apparent gateway/router.
 
     If any switches on the path, or the router itself is down,
@@ -46,6 +77,10 @@ def get_path_to_netbox(netbox):
     if there is insufficient information for NAV to find a likely path,
     a True value is returned.
 
+    :param graphs: An optional dict of VLAN graphs to share between multiple
+                   calls. Graphs are looked up here by VLAN, and added to it
+                   as they are loaded. Shared graphs are never modified.
+
     """
     prefix = netbox.get_prefix()
     if not prefix:
@@ -63,11 +98,14 @@ def get_path_to_netbox(netbox):
     _logger.debug("reachability check for %s on %s (router: %s)",
                   netbox, prefix, router)
 
-    graph = get_graph_for_vlan(prefix.vlan)
-    try:
+    if graphs is None:
+        graphs = {}
+    if prefix.vlan_id not in graphs:
+        graphs[prefix.vlan_id] = get_graph_for_vlan(prefix.vlan)
+    graph = graphs[prefix.vlan_id]
+    if hasattr(netbox, 'add_to_graph'):
+        graph = graph.copy()
         netbox.add_to_graph(graph)
-    except AttributeError:
-        pass
 
     # first, see if any path exists
     if not _path_exists(graph, netbox, router):
@@ -75,8 +113,8 @@ def get_path_to_netbox(netbox):
                         netbox, router, prefix.vlan)
         return True
 
-    # now, remove nodes that are down and see if a path still exists
-    strip_down_nodes_from_graph(graph, keep=netbox)
+    # now, disregard nodes that are down and see if a path still exists
+    graph = get_subgraph_of_up_nodes(graph, keep=netbox)
 
     if netbox not in graph or router not in graph:
         if router.up == router.UP_UP:
@@ -108,12 +146,31 @@ def _path_exists(graph, source, target):
 
 
 def get_graph_for_vlan(vlan):
-    """Builds a simple topology graph of the active netboxes in vlan.
+    """Returns a simple topology graph of the netboxes in vlan.
+
+    The graph structure is cached for up to GRAPH_CACHE_TTL seconds, or until
+    invalidate_graph_cache() is called, but the up states of the netboxes are
+    refreshed from the database on every call.
+
+    :returns: A networkx.MultiGraph object, which the caller is free to
+              modify.
+
+    """
+    key = getattr(vlan, 'pk', vlan)
+    timestamp, graph = _graph_cache.get(key, (None, None))
+    if graph is None or time.time() - timestamp > GRAPH_CACHE_TTL:
+        graph = build_graph_for_vlan(vlan)
+        _graph_cache[key] = (time.time(), graph)
+    else:
+        refresh_netbox_states(graph)
+    return graph.copy()
 
-    Any netbox that seems to be down at the moment will not be included in
-    the graph.
 
-    :returns: A networkx.Graph object.
+def build_graph_for_vlan(vlan):
+    """Builds a simple topology graph of the netboxes in vlan from the
+    database.
+
+    :returns: A networkx.MultiGraph object.
 
     """
     swpvlan = SwPortVlan.objects.filter(vlan=vlan).select_related(
@@ -133,16 +190,38 @@ def get_graph_for_vlan(vlan):
     return graph
 
 
-def strip_down_nodes_from_graph(graph, keep=None):
-    """Strips all nodes (netboxes) from graph that are currently down.
+def invalidate_graph_cache(vlan=None):
+    """Invalidates the cached topology graph of vlan, or the cached graphs
+    of all VLANs if vlan is None.
+
+    """
+    if vlan is None:
+        _graph_cache.clear()
+    else:
+        _graph_cache.pop(getattr(vlan, 'pk', vlan), None)
+
+
+def refresh_netbox_states(graph):
+    """Refreshes the up states of all the netboxes in graph from the
+    database, using a single query.
+
+    """
+    netboxes = [node for node in graph if isinstance(node, Netbox)]
+    states = dict(Netbox.objects.filter(
+        id__in=[netbox.pk for netbox in netboxes]).values_list('id', 'up'))
+    for netbox in netboxes:
+        netbox.up = states.get(netbox.pk, netbox.up)
+
+
+def get_subgraph_of_up_nodes(graph, keep=None):
+    """Returns a read-only view of graph without the nodes (netboxes) that
+    are currently down.
 
     :param keep: A node to keep regardless of its current status.
 
     """
-    removable = set(node for node in graph.nodes()
-                    if node.up != node.UP_UP and node != keep)
-    graph.remove_nodes_from(removable)
-    return len(removable)
+    return graph.subgraph(node for node in graph
+                          if node.up == node.UP_UP or node == keep)
 
 
 def strip_down_links_from_graph(graph):
@@ -13,14 +13,28 @@
 # details.  You should have received a copy of the GNU General Public License
 # along with NAV. If not, see <http://www.gnu.org/licenses/>.
 #
-"""Loading and caching of unresolved alert states from the database"""
+"""Loading and caching of unresolved alert states from the database.
+
+The map of unresolved alerts is loaded in full from the database by update(),
+and is thereafter kept up to date by having the event engine register()
+every alert history record it posts or resolves. Since other programs may
+also resolve alerts, the map should still be fully reloaded at regular
+intervals, using update_if_stale().
+
+"""
 
 from nav.models.event import AlertHistory
 from nav.models.fields import INFINITY
 import logging
+import time
+
+# Maximum age of the unresolved alerts map, in seconds, before it is fully
+# reloaded from the database
+MAX_AGE = 60
 
 _logger = logging.getLogger(__name__)
 _unresolved_alerts_map = {}
+_last_update = 0
 
 
 def get_map():
@@ -32,10 +46,48 @@ def update():
     """Updates the map of unresolved alerts from the database"""
     # yes mr. pylint, we use global state, this module acts as a singleton
     # pylint: disable=W0603
-    global _unresolved_alerts_map
+    global _unresolved_alerts_map, _last_update
     unresolved = AlertHistory.objects.filter(end_time__gte=INFINITY)
     _unresolved_alerts_map = dict((alert.get_key(), alert)
                                   for alert in unresolved)
+    _last_update = time.time()
+    _logger.debug("loaded %d unresolved alerts", len(_unresolved_alerts_map))
+
+
+def update_if_stale(max_age=MAX_AGE):
+    """Updates the map of unresolved alerts from the database if it was last
+    updated more than max_age seconds ago.
+
+    """
+    if time.time() - _last_update >= max_age:
+        update()
+
+
+def invalidate():
+    """Ensures the map of unresolved alerts is fully reloaded from the
+    database on the next call to update_if_stale().
+
+    """
+    # pylint: disable=W0603
+    global _last_update
+    _last_update = 0
+
+
+def register(alert):
+    """Registers a new or changed AlertHistory object in the map of unresolved
+    alerts.
+
+    Open alerts are added to the map, while resolved alerts are removed from
+    it.
+
+    """
+    key = alert.get_key()
+    if alert.is_open():
+        _unresolved_alerts_map[key] = alert
+    else:
+        existing = _unresolved_alerts_map.get(key)
+        if existing is not None and existing.pk == alert.pk:
+            del _unresolved_alerts_map[key]
 
 
 def refers_to_unresolved_alert(event):
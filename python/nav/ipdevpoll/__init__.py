@@ -33,6 +33,12 @@ class Plugin(object):
     """
     _logger = ContextLogger()
     RESTRICT_TO_VENDORS = []
+    # The resources (typically shadow classes) a plugin reads from and writes
+    # to. Plugins whose resources don't conflict may be run concurrently
+    # within a job. Leaving WRITES as None means the plugin's resource usage
+    # is unknown, and it will always be run exclusively.
+    READS = ()
+    WRITES = None
 
     def __init__(self, netbox, agent, containers, config=None):
         """
@@ -87,6 +93,19 @@ class Plugin(object):
         else:
             return True
 
+    @classmethod
+    def conflicts_with(cls, other):
+        """Verifies whether this plugin class and another plugin class may
+        interfere with each other's results if run concurrently.
+
+        :returns: A boolean value.
+        """
+        if cls.WRITES is None or other.WRITES is None:
+            return True
+        writes, other_writes = set(cls.WRITES), set(other.WRITES)
+        return bool(writes & (other_writes | set(other.READS)) or
+                    other_writes & set(cls.READS))
+
     @classmethod
     def on_plugin_load(cls):
         """Called as the plugin class is loaded in the plugin registry.
@@ -32,6 +32,11 @@ class IpdevpollConfig(NAVConfigParser):
 [ipdevpoll]
 logfile = ipdevpolld.log
 max_concurrent_jobs = 500
+max_concurrent_plugins = 1
+
+[multiprocess]
+max_worker_memory = 0
+status_interval = 60
 
 [snmp]
 timeout = 1.5
@@ -84,6 +84,7 @@ class IPDevPollProcess(object):
     def run(self):
         """Loads plugins, and initiates polling schedules."""
         reactor.callWhenRunning(self.install_sighandlers)
+        reactor.callWhenRunning(self.install_metrics_sink)
 
         if self.options.netbox:
             self.setup_single_job()
@@ -108,6 +109,16 @@ class IPDevPollProcess(object):
         signal.signal(signal.SIGUSR1, self.sigusr1_handler)
         signal.signal(signal.SIGUSR2, self.sigusr2_handler)
 
+    def install_metrics_sink(self):
+        """Makes all metrics sent by this process go through a non-blocking
+        metrics sink, to avoid stalling the reactor.
+
+        """
+        from nav.metrics.twistedcarbon import install_sink
+        sink = install_sink()
+        self._logger.debug("Metrics are sent to carbon at [%s]:%s using %s",
+                           sink.host, sink.port, sink.protocol)
+
     def setup_scheduling(self):
         "Sets up regular job scheduling according to config"
         # NOTE: This is locally imported because it will in turn import
@@ -178,10 +189,17 @@ class IPDevPollProcess(object):
     def setup_multiprocess(self, process_count, max_jobs):
         self._logger.info("Starting multi-process setup")
         from .schedule import JobScheduler
+        from .config import ipdevpoll_conf as conf
         plugins.import_plugins()
+        max_worker_memory = conf.getint('multiprocess', 'max_worker_memory')
         self.work_pool = pool.WorkerPool(process_count,
                                          max_jobs,
-                                         self.options.threadpoolsize)
+                                         self.options.threadpoolsize,
+                                         max_worker_memory * 1024 * 1024)
+        reactor.callWhenRunning(self.work_pool.load_job_costs)
+        reactor.callWhenRunning(
+            self.work_pool.monitor_workers,
+            conf.getint('multiprocess', 'status_interval'))
         reactor.callWhenRunning(JobScheduler.initialize_from_config_and_run,
                                 self.work_pool, self.options.onlyjob)
 
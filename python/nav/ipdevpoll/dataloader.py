@@ -33,6 +33,7 @@ interfering with the daemon's asynchronous operations.
 
 """
 from collections import defaultdict
+import pickle
 
 from nav.models import manage, event
 from nav import ipdevpoll
@@ -55,6 +56,28 @@ def load_netbox(netbox_id):
     return storage.shadowify(netbox)
 
 
+def dump_netbox(netbox):
+    """Serializes a Netbox shadow object, e.g. for shipping it to a worker
+    process along with a job.
+
+    :type netbox: nav.ipdevpoll.shadows.netbox.Netbox
+    :rtype: bytes
+
+    """
+    return pickle.dumps(netbox, pickle.HIGHEST_PROTOCOL)
+
+
+def load_dumped_netbox(data):
+    """Deserializes a Netbox shadow object serialized by dump_netbox().
+
+    :returns: A Netbox shadow object, with no attributes marked as touched.
+
+    """
+    netbox = pickle.loads(data)
+    netbox._touched = set()
+    return netbox
+
+
 class NetboxLoader(dict):
     """Loads netboxes from the database, synchronously or asynchronously.
 
@@ -188,3 +211,27 @@ def load_last_updated_times():
     for netboxid, job_name, end_time in cursor.fetchall():
         times[netboxid][job_name] = end_time
     return dict(times)
+
+
+def load_job_durations():
+    """Loads the average run time, in seconds, of each job of each netbox
+    over the last day.
+
+    :returns: A dict of {(netboxid, job_name): seconds}.
+
+    """
+    sql = """SELECT
+               netboxid,
+               job_name,
+               AVG(duration) AS duration
+             FROM
+               ipdevpoll_job_log
+             WHERE
+               end_time > NOW() - INTERVAL '1 day'
+               AND duration IS NOT NULL
+             GROUP BY netboxid, job_name
+             """
+    cursor = django.db.connection.cursor()
+    cursor.execute(sql)
+    return dict(((netboxid, job_name), float(duration))
+                for netboxid, job_name, duration in cursor.fetchall())
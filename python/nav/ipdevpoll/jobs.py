@@ -24,6 +24,7 @@ from itertools import cycle
 
 from twisted.internet import defer, reactor
 from twisted.internet.error import TimeoutError
+from twisted.python.failure import Failure
 
 from nav.ipdevpoll import ContextLogger
 from nav.ipdevpoll.snmp import snmpprotocol, AgentProxy
@@ -65,6 +66,19 @@ class SuggestedReschedule(AbortedJobError):
             cause=cause)
 
 
+def _find_runnable_plugin(pending, running):
+    """Returns the first plugin from the pending list that conflicts with
+    neither a running plugin nor a plugin preceding it in the pending list,
+    or None if there is no such plugin.
+
+    """
+    for index, plugin in enumerate(pending):
+        blockers = running + pending[:index]
+        if not any(plugin.conflicts_with(other) for other in blockers):
+            return plugin
+    return None
+
+
 class JobHandler(object):
 
     """Handles a single polling job against a single netbox.
@@ -80,10 +94,12 @@ class JobHandler(object):
     _timing_logger = ContextLogger(suffix='timings')
     _start_time = datetime.datetime.min
 
-    def __init__(self, name, netbox, plugins=None, interval=None):
+    def __init__(self, name, netbox, plugins=None, interval=None,
+                 netbox_snapshot=None):
         self.name = name
         self.netbox_id = netbox
         self.netbox = None
+        self.netbox_snapshot = netbox_snapshot
         self.cancelled = threading.Event()
         self.interval = interval
 
@@ -187,8 +203,22 @@ class JobHandler(object):
         defer.returnValue(willing_plugins)
 
     def _iterate_plugins(self, plugins):
-        """Iterates plugins."""
-        plugins = iter(plugins)
+        """Iterates plugins.
+
+        Plugins are started in their configured order. Up to
+        max_concurrent_plugins plugins are run at the same time, as long as
+        their declared resource usage does not conflict with that of any
+        running plugin or any plugin scheduled before them.
+
+        Once a plugin has failed, no further plugins are started, and the
+        failure is returned as soon as the running plugins are done.
+
+        """
+        pending = list(plugins)
+        running = []
+        failures = []
+        max_concurrent = self._get_max_concurrent_plugins()
+        done = defer.Deferred()
 
         def log_plugin_failure(failure, plugin_instance):
             if failure.check(TimeoutError, defer.TimeoutError):
@@ -209,24 +239,53 @@ class JobHandler(object):
                                       plugin_instance)
             return failure
 
-        def next_plugin(result=None):
-            self._raise_if_cancelled()
-            try:
-                plugin_instance = next(plugins)
-            except StopIteration:
-                return result
+        def plugin_done(_result, plugin_instance):
+            running.remove(plugin_instance)
+            next_plugins()
+
+        def plugin_failed(failure, plugin_instance):
+            failures.append(failure)
+            plugin_done(None, plugin_instance)
 
+        def start_plugin(plugin_instance):
             self._logger.debug("Now calling plugin: %s", plugin_instance)
-            self._start_plugin_timer(plugin_instance)
+            running.append(plugin_instance)
+            timings = self._start_plugin_timer(plugin_instance)
 
             df = defer.maybeDeferred(plugin_instance.handle)
-            df.addErrback(self._stop_plugin_timer)
+            df.addBoth(self._stop_plugin_timer, timings)
             df.addErrback(log_plugin_failure, plugin_instance)
-            df.addCallback(self._stop_plugin_timer)
-            df.addCallback(next_plugin)
-            return df
+            df.addCallbacks(plugin_done, plugin_failed,
+                            callbackArgs=(plugin_instance,),
+                            errbackArgs=(plugin_instance,))
+
+        def next_plugins():
+            while not failures and pending and len(running) < max_concurrent:
+                plugin_instance = _find_runnable_plugin(pending, running)
+                if plugin_instance is None:
+                    break
+                try:
+                    self._raise_if_cancelled()
+                except AbortedJobError:
+                    failures.append(Failure())
+                    break
+                pending.remove(plugin_instance)
+                start_plugin(plugin_instance)
+
+            if not running and not done.called:
+                if failures:
+                    done.errback(failures[0])
+                elif not pending:
+                    done.callback(None)
+
+        next_plugins()
+        return done
+
+    def _get_max_concurrent_plugins(self):
+        from nav.ipdevpoll.config import ipdevpoll_conf
 
-        return next_plugin()
+        return max(1, ipdevpoll_conf.getint('ipdevpoll',
+                                            'max_concurrent_plugins'))
 
     @defer.inlineCallbacks
     def run(self):
@@ -237,8 +296,11 @@ class JobHandler(object):
                   plugins ran).
 
         """
-        self.netbox = yield db.run_in_thread(dataloader.load_netbox,
-                                             self.netbox_id)
+        if self.netbox_snapshot is not None:
+            self.netbox = self.netbox_snapshot
+        else:
+            self.netbox = yield db.run_in_thread(dataloader.load_netbox,
+                                                 self.netbox_id)
         self._log_context.update(dict(job=self.name,
                                       sysname=self.netbox.sysname))
         self._logger.debug("Job %r started with plugins: %r",
@@ -342,9 +404,11 @@ class JobHandler(object):
         now = datetime.datetime.now()
         timings = [plugin.__class__.__name__, now, now]
         self._plugin_times.append(timings)
+        return timings
 
-    def _stop_plugin_timer(self, result=None):
-        timings = self._plugin_times[-1]
+    def _stop_plugin_timer(self, result=None, timings=None):
+        if timings is None:
+            timings = self._plugin_times[-1]
         timings[-1] = datetime.datetime.now()
         return result
 
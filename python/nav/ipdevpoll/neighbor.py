@@ -35,7 +35,7 @@ from django.utils import six
 from nav.mibs.lldp_mib import IdSubtypes
 
 from nav.ipdevpoll.log import ContextLogger
-from nav.ipdevpoll import shadows
+from nav.ipdevpoll import shadows, sharedcache
 from nav.ipdevpoll.utils import is_invalid_utf8
 
 HSRP_MAC_PREFIXES = ('00:00:0c:07:ac',)
@@ -43,6 +43,7 @@ VRRP_MAC_PREFIXES = ('00:00:5e:00:01', '00:00:5e:00:02')  # RFC5798
 IGNORED_MAC_PREFIXES = HSRP_MAC_PREFIXES + VRRP_MAC_PREFIXES
 
 
+@sharedcache.shared('netbox_macs')
 @synchronized(threading.Lock())
 @cachedfor(timedelta(minutes=5))
 def get_netbox_macs():
@@ -71,6 +72,7 @@ def _mac_is_ignored(mac):
     return False
 
 
+@sharedcache.shared('netbox_catids')
 @synchronized(threading.Lock())
 @cachedfor(timedelta(minutes=10))
 def get_netbox_catids():
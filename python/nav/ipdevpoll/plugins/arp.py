@@ -35,8 +35,8 @@ the name for historical reasons.
 
 """
 
-import operator
 from datetime import datetime, timedelta
+import threading
 
 from IPy import IP
 from twisted.internet import defer
@@ -46,15 +46,18 @@ from nav.mibs.ipv6_mib import Ipv6Mib
 from nav.mibs.cisco_ietf_ip_mib import CiscoIetfIpMib
 
 from nav.models import manage
+from nav.iptrie import PrefixTrie
+from nav.util import cachedfor, synchronized
 from nav.ipdevpoll import Plugin, db
-from nav.ipdevpoll import storage, shadows
+from nav.ipdevpoll import storage, shadows, sharedcache
 
 INCOMPLETE_MAC = '00:00:00:00:00:00'
 
 
 class Arp(Plugin):
     """Collects ARP records for IPv4 devices and NDP cache for IPv6 devices."""
-    prefix_cache = [] # prefix cache, should be sorted by descending mask length
+    prefix_cache = PrefixTrie()  # maps known prefixes to their ids
+    prefix_cache_prefixes = None  # the prefix list the cache was built from
     prefix_cache_update_time = datetime.min
     prefix_cache_max_age = timedelta(minutes=5)
 
@@ -158,18 +161,18 @@ class Arp(Plugin):
 
     @classmethod
     def _load_prefixes_synchronously(cls):
-        return list(manage.Prefix.objects.all().values('id', 'net_address'))
+        return get_prefixes()
 
     @classmethod
     def _update_prefix_cache_with_result(cls, prefixes):
+        if prefixes is cls.prefix_cache_prefixes:
+            return
         cls._logger.debug(
             "Populating prefix cache with %d prefixes", len(prefixes))
 
-        prefixes = [(IP(p['net_address']), p['id']) for p in prefixes]
-        prefixes.sort(key=operator.itemgetter(1), reverse=True)
-
-        del cls.prefix_cache[:]
-        cls.prefix_cache.extend(prefixes)
+        cls.prefix_cache = PrefixTrie(
+            (IP(p['net_address']), p['id']) for p in prefixes)
+        cls.prefix_cache_prefixes = prefixes
 
     def _make_new_mappings(self, mappings):
         """Convert a sequence of (ip, mac) tuples into a Arp shadow containers.
@@ -211,15 +214,24 @@ class Arp(Plugin):
             arp.end_time = timestamp
 
     def _find_largest_matching_prefix(self, ip):
-        """Find the largest prefix that ip is part of.
+        """Find the most precise prefix that ip is part of.
 
         Returns:
 
           An integer prefix ID, or None if no matches were found.
         """
-        for prefix_addr, prefix_id in self.prefix_cache:
-            if ip in prefix_addr:
-                return prefix_id
+        return self.prefix_cache.longest_match(ip)
+
+
+@sharedcache.shared('prefixes')
+@synchronized(threading.Lock())
+@cachedfor(timedelta(minutes=5))
+def get_prefixes():
+    """Returns a list of the ids and network addresses of all known
+    prefixes.
+
+    """
+    return list(manage.Prefix.objects.all().values('id', 'net_address'))
 
 
 def ipv6_address_in_mappings(mappings):
@@ -31,6 +31,7 @@ from nav.enterprise.ids import VENDOR_ID_HEWLETT_PACKARD
 
 class StatMulticast(Plugin):
     """Collects system statistics and pushes to Graphite"""
+    WRITES = ()
 
     @defer.inlineCallbacks
     def handle(self):
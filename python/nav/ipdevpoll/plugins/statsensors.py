@@ -36,6 +36,8 @@ class StatSensors(Plugin):
     Graphite.
 
     """
+    WRITES = ()
+
     @classmethod
     @defer.inlineCallbacks
     def can_handle(cls, netbox):
@@ -66,6 +66,8 @@ MEMORY_MIBS = {
 
 class StatSystem(Plugin):
     """Collects system statistics and pushes to Graphite"""
+    WRITES = ()
+
     @defer.inlineCallbacks
     def handle(self):
         if self.netbox.master:
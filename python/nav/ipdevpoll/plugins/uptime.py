@@ -28,6 +28,7 @@ COLDBOOT_MAX_DELTA = 60*60  # seconds
 
 class Uptime(Plugin):
     """Collects uptime ticks and discovers discontinuities in uptime data"""
+    WRITES = (shadows.Netbox, shadows.NetboxInfo)
 
     @inlineCallbacks
     def handle(self):
@@ -16,22 +16,40 @@
 """Handle sending jobs to worker processes."""
 from __future__ import print_function
 import os
+import resource
+import socket
 import sys
+import time
 
 from twisted.protocols import amp
 from twisted.internet import reactor, protocol
 from twisted.internet.defer import inlineCallbacks, returnValue
 from twisted.internet.endpoints import ProcessEndpoint, StandardIOEndpoint
+from twisted.internet.task import LoopingCall
 import twisted.internet.endpoints
 
 from nav.ipdevpoll import ContextLogger
-from . import control, jobs
+from nav.metrics.carbon import send_metrics
+from nav.metrics.templates import metric_prefix_for_ipdevpoll_worker
+from . import control, dataloader, db, jobs, sharedcache
+
+# The expected cost, in seconds, of a job that has no run time history
+DEFAULT_JOB_COST = 1.0
+# How much weight the latest run time of a job is given when updating its
+# expected cost
+COST_WEIGHT = 0.3
 
 
 def initialize_worker():
     handler = JobHandler()
     factory = protocol.Factory()
-    factory.protocol = lambda: ProcessAMP(is_worker=True, locator=handler)
+
+    def _make_protocol():
+        master = ProcessAMP(is_worker=True, locator=handler)
+        sharedcache.install_client(master)
+        return master
+
+    factory.protocol = _make_protocol
     StandardIOEndpoint(reactor).listen(factory)
     return handler
 
@@ -50,6 +68,13 @@ class Shutdown(amp.Command):
     response = []
 
 
+class GetStatus(amp.Command):
+    """Represent a request for a worker's resource usage"""
+    arguments = []
+    response = [(b'rss', amp.Integer()),
+                (b'cpu_time', amp.Float())]
+
+
 class Job(amp.Command):
     """Represent a job for sending to a worker"""
     arguments = [
@@ -59,6 +84,8 @@ class Job(amp.Command):
         (b'interval', amp.Integer()),  # Needs to be included in database record.
                                       # Not used for scheduling
         (b'serial', amp.Integer()),  # Serial number needed for cancelling
+        # The master's netbox object, to avoid loading it in the worker
+        (b'snapshot', amp.String(optional=True)),
     ]
     response = [(b'result', amp.Boolean()),
                 (b'reschedule', amp.Integer())]
@@ -85,7 +112,8 @@ class JobHandler(amp.CommandLocator):
         return result
 
     @Job.responder
-    def execute_job(self, netbox, job, plugins, interval, serial):
+    def execute_job(self, netbox, job, plugins, interval, serial,
+                    snapshot=None):
         self._logger.debug("Process {pid} received job {job} for"
                            " netbox {netbox}"
                            " with plugins {plugins}".format(
@@ -93,7 +121,10 @@ class JobHandler(amp.CommandLocator):
                                job=job,
                                netbox=netbox,
                                plugins=",".join(plugins)),)
-        job = jobs.JobHandler(job, netbox, plugins, interval)
+        if snapshot is not None:
+            snapshot = dataloader.load_dumped_netbox(snapshot)
+        job = jobs.JobHandler(job, netbox, plugins, interval,
+                              netbox_snapshot=snapshot)
         self.jobs[serial] = job
         deferred = job.run()
         deferred.addBoth(self.job_done, serial)
@@ -115,8 +146,14 @@ class JobHandler(amp.CommandLocator):
     @Shutdown.responder
     def shutdown(self):
         self.done = True
+        if not self.jobs:
+            reactor.callLater(3, reactor.stop)
         return {}
 
+    @GetStatus.responder
+    def get_status(self):
+        return {'rss': get_rss(), 'cpu_time': get_cpu_time()}
+
     def log_jobs(self):
         self._logger.info("Got {jobs} active jobs".format(
             jobs=len(self.jobs)))
@@ -164,7 +201,12 @@ class InlinePool(object):
             del self.active_jobs[deferred]
         return result
 
-    def execute_job(self, job, netbox, plugins=None, interval=None):
+    def execute_job(self, job, netbox, plugins=None, interval=None,
+                    netbox_snapshot=None):
+        """Runs a job in this process. The job always loads a fresh netbox
+        object, since netbox_snapshot is shared with the job's scheduler.
+
+        """
         job = jobs.JobHandler(job, netbox, plugins, interval)
         deferred = job.run()
         self.active_jobs[deferred] = job
@@ -182,13 +224,20 @@ class Worker(object):
 
     _logger = ContextLogger()
 
-    def __init__(self, pool, threadpoolsize, max_jobs):
+    def __init__(self, pool, threadpoolsize, max_jobs, slot=0):
         self.active_jobs = 0
         self.total_jobs = 0
         self.max_concurrent_jobs = 0
+        self.pending_cost = 0.0
         self.pool = pool
         self.threadpoolsize = threadpoolsize
         self.max_jobs = max_jobs
+        self.slot = slot
+        self.retired = False
+        self.rss = None
+        self.cpu_time = None
+        self.cpu_usage = None
+        self._status_time = None
 
     @inlineCallbacks
     def start(self):
@@ -199,13 +248,35 @@ class Worker(object):
                                    args, os.environ)
         factory = protocol.Factory()
         factory.protocol = lambda: ProcessAMP(is_worker=False,
-                                              locator=JobHandler())
+                                              locator=self.pool.cache)
         self.process = yield endpoint.connect(factory)
         self.process.lost_handler = self._worker_died
         returnValue(self)
 
     def done(self):
-        return self.max_jobs and (self.total_jobs >= self.max_jobs)
+        return self.retired or (
+            self.max_jobs and (self.total_jobs >= self.max_jobs))
+
+    def retire(self):
+        """Stops sending jobs to this worker, and tells it to exit once its
+        active jobs are done.
+
+        """
+        self.retired = True
+        return self.process.callRemote(Shutdown)
+
+    @inlineCallbacks
+    def update_status(self):
+        """Retrieves the current memory and CPU usage of the worker process"""
+        status = yield self.process.callRemote(GetStatus)
+        now = time.time()
+        if self.cpu_time is not None and now > self._status_time:
+            self.cpu_usage = (100.0 * (status['cpu_time'] - self.cpu_time)
+                              / (now - self._status_time))
+        self.rss = status['rss']
+        self.cpu_time = status['cpu_time']
+        self._status_time = now
+        returnValue(self)
 
     def _worker_died(self, worker, reason):
         if not self.done():
@@ -223,8 +294,9 @@ class Worker(object):
                                .format(worker=worker))
         self.pool.worker_died(self)
 
-    def execute(self, serial, command, **kwargs):
+    def execute(self, serial, command, cost=DEFAULT_JOB_COST, **kwargs):
         self.active_jobs += 1
+        self.pending_cost += cost
         self.total_jobs += 1
         self.max_concurrent_jobs = max(self.active_jobs,
                                        self.max_concurrent_jobs)
@@ -243,43 +315,70 @@ class WorkerPool(object):
 
     _logger = ContextLogger()
 
-    def __init__(self, workers, max_jobs, threadpoolsize=None):
+    def __init__(self, workers, max_jobs, threadpoolsize=None,
+                 max_worker_memory=None):
+        """Initializes a worker pool.
+
+        :param workers: The number of worker processes to run.
+        :param max_jobs: The number of jobs a worker may run before it is
+                         replaced by a new worker process, if any.
+        :param threadpoolsize: The size of each worker's thread pool.
+        :param max_worker_memory: The resident memory size, in bytes, above
+                                  which a worker is replaced by a new worker
+                                  process, if any. Only checked while the
+                                  workers are being monitored.
+
+        """
         twisted.internet.endpoints.log = HackLog
         self.workers = set()
         self.target_count = workers
         self.max_jobs = max_jobs
         self.threadpoolsize = threadpoolsize
-        for i in range(self.target_count):
-            self._spawn_worker()
+        self.max_worker_memory = max_worker_memory
+        self.job_costs = JobCostEstimator()
+        self.cache = sharedcache.SharedCacheService()
+        reactor.addSystemEventTrigger("after", "shutdown", self.cache.cleanup)
+        for slot in range(self.target_count):
+            self._spawn_worker(slot)
         self.serial = 0
         self.jobs = dict()
+        self._monitor = None
 
     def worker_died(self, worker):
         self.workers.remove(worker)
         if not worker.done():
-            self._spawn_worker()
+            self._spawn_worker(worker.slot)
 
     @inlineCallbacks
-    def _spawn_worker(self):
-        worker = yield Worker(self, self.threadpoolsize, self.max_jobs).start()
+    def _spawn_worker(self, slot):
+        worker = yield Worker(self, self.threadpoolsize, self.max_jobs,
+                              slot).start()
         self.workers.add(worker)
 
     def _cleanup(self, result, deferred):
-        serial, worker = self.jobs[deferred]
+        serial, worker, cost = self.jobs[deferred]
         del self.jobs[deferred]
         worker.active_jobs -= 1
+        worker.pending_cost = max(worker.pending_cost - cost, 0.0)
         return result
 
-    def _execute(self, command, **kwargs):
+    def _execute(self, command, cost=DEFAULT_JOB_COST, **kwargs):
+        """Sends a command to the ready worker with the lowest expected cost
+        of its pending jobs.
+
+        :param cost: The expected cost of the command, in seconds.
+
+        """
         ready_workers = [w for w in self.workers if not w.done()]
         if not ready_workers:
             raise RuntimeError("No ready workers")
-        worker = min(ready_workers, key=lambda x: x.active_jobs)
+        worker = min(ready_workers,
+                     key=lambda x: (x.pending_cost, x.active_jobs))
         self.serial += 1
-        deferred = worker.execute(self.serial, command, **kwargs)
+        deferred = worker.execute(self.serial, command, cost=cost, **kwargs)
         if worker.done():
-            self._spawn_worker()
-        self.jobs[deferred] = (self.serial, worker)
+            self._spawn_worker(worker.slot)
+        self.jobs[deferred] = (self.serial, worker, cost)
         deferred.addBoth(self._cleanup, deferred)
         return deferred
 
@@ -287,12 +386,100 @@ class WorkerPool(object):
         if deferred not in self.jobs:
             self._logger.debug("Cancelling job that isn't known")
             return
-        serial, worker = self.jobs[deferred]
+        serial, worker, _cost = self.jobs[deferred]
         return worker.cancel(serial)
 
-    def execute_job(self, job, netbox, plugins=None, interval=None):
-        deferred = self._execute(Job, job=job, netbox=netbox,
-                                 plugins=plugins, interval=interval)
+    @inlineCallbacks
+    def load_job_costs(self):
+        """Seeds the expected job costs from the ipdevpoll job log"""
+        try:
+            durations = yield db.run_in_thread(dataloader.load_job_durations)
+        except Exception as error:  # pylint: disable=broad-except
+            self._logger.warning("could not load job durations: %s", error)
+        else:
+            self.job_costs.load(durations)
+            self._logger.debug("loaded job durations for %d jobs",
+                               len(durations))
+
+    def monitor_workers(self, interval):
+        """Starts checking the resource usage of the workers at regular
+        intervals.
+
+        :param interval: The number of seconds between each check. Workers
+                         are not monitored if this is not a positive number.
+
+        """
+        if interval <= 0:
+            self._logger.info("Worker monitoring is disabled")
+            return
+        if self._monitor is None:
+            self._monitor = LoopingCall(self.check_workers)
+            self._monitor.start(interval, now=False)
+
+    @inlineCallbacks
+    def check_workers(self):
+        """Updates the resource usage of each worker, replaces the workers
+        that use too much memory and sends the state of the workers as
+        metrics.
+
+        """
+        for worker in list(self.workers):
+            try:
+                yield worker.update_status()
+            except Exception as error:  # pylint: disable=broad-except
+                self._logger.debug("could not get status of worker %s: %s",
+                                   worker.slot, error)
+                continue
+            if (self.max_worker_memory and not worker.done()
+                    and worker.rss > self.max_worker_memory):
+                self._logger.info("Worker %s uses %d MiB of memory, replacing "
+                                  "it", worker.slot, worker.rss // 2**20)
+                worker.retire()
+                self._spawn_worker(worker.slot)
+        send_metrics(self.get_metrics())
+
+    def get_metrics(self):
+        """Returns the state of each ready worker as a list of metrics"""
+        timestamp = time.time()
+        hostname = socket.gethostname()
+        metrics = []
+        for worker in self.workers:
+            if worker.done():
+                continue
+            prefix = metric_prefix_for_ipdevpoll_worker(hostname, worker.slot)
+            values = [
+                ('active_jobs', worker.active_jobs),
+                ('pending_cost', worker.pending_cost),
+                ('rss', worker.rss),
+                ('cpu_usage', worker.cpu_usage),
+            ]
+            metrics.extend(('{}.{}'.format(prefix, name), (timestamp, value))
+                           for name, value in values if value is not None)
+        return metrics
+
+    def execute_job(self, job, netbox, plugins=None, interval=None,
+                    netbox_snapshot=None):
+        """Runs a job in a worker process.
+
+        :param netbox: The netbox ID.
+        :param netbox_snapshot: An optional Netbox shadow object for the
+                                worker to use, instead of loading the
+                                netbox from the database.
+
+        """
+        kwargs = dict(job=job, netbox=netbox, plugins=plugins,
+                      interval=interval)
+        if netbox_snapshot is not None:
+            snapshot = dataloader.dump_netbox(netbox_snapshot)
+            if len(snapshot) <= amp.MAX_VALUE_LENGTH:
+                kwargs['snapshot'] = snapshot
+        cost = self.job_costs.estimate(job, netbox)
+        started = time.time()
+        deferred = self._execute(Job, cost=cost, **kwargs)
+
+        def update_cost(result):
+            self.job_costs.update(job, netbox, time.time() - started)
+            return result
 
         def handle_reschedule(result):
             reschedule = result.get('reschedule', 0)
@@ -300,6 +487,7 @@ class WorkerPool(object):
                 raise jobs.SuggestedReschedule(delay=reschedule)
             return result
 
+        deferred.addBoth(update_cost)
         deferred.addCallback(handle_reschedule)
         deferred.addCallback(lambda x: x['result'])
         return deferred
@@ -310,11 +498,78 @@ class WorkerPool(object):
             target=self.target_count))
         for worker in self.workers:
             self._logger.info(" - ready {ready} active {active}"
-                              " max {max} total {total}".format(
+                              " max {max} total {total}"
+                              " cost {cost:.1f}s rss {rss}".format(
                                   ready=not worker.done(),
                                   active=worker.active_jobs,
                                   max=worker.max_concurrent_jobs,
-                                  total=worker.total_jobs))
+                                  total=worker.total_jobs,
+                                  cost=worker.pending_cost,
+                                  rss=worker.rss))
+
+
+class JobCostEstimator(object):
+    """Estimates the cost of running a job for a netbox, as the number of
+    seconds it is expected to run.
+
+    Estimates are moving averages of the actual run times of each job for
+    each netbox. Jobs that haven't run for a netbox yet are expected to cost
+    as much as the same job does on average for other netboxes.
+
+    """
+    def __init__(self, default=DEFAULT_JOB_COST, weight=COST_WEIGHT):
+        self.default = default
+        self.weight = weight
+        self.costs = {}
+        self.job_costs = {}
+
+    def load(self, durations):
+        """Seeds the estimates from historical run times.
+
+        :param durations: A dict of {(netboxid, job_name): seconds}.
+
+        """
+        totals = {}
+        for (netbox, job), duration in durations.items():
+            self.costs[(netbox, job)] = duration
+            total, count = totals.get(job, (0.0, 0))
+            totals[job] = (total + duration, count + 1)
+        for job, (total, count) in totals.items():
+            self.job_costs[job] = total / count
+
+    def estimate(self, job, netbox):
+        """Returns the expected cost of running job for netbox"""
+        cost = self.costs.get((netbox, job))
+        if cost is None:
+            cost = self.job_costs.get(job, self.default)
+        return cost
+
+    def update(self, job, netbox, duration):
+        """Updates the estimates with the actual run time of a job"""
+        self.costs[(netbox, job)] = self._average(
+            self.costs.get((netbox, job)), duration)
+        self.job_costs[job] = self._average(self.job_costs.get(job), duration)
+
+    def _average(self, previous, duration):
+        if previous is None:
+            return duration
+        return previous + self.weight * (duration - previous)
+
+
+def get_rss():
+    """Returns the resident memory size of this process, in bytes"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except (IOError, OSError, IndexError, ValueError):
+        # Without procfs, the peak size (in KiB on most systems) must do
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_cpu_time():
+    """Returns the total CPU time used by this process, in seconds"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
 
 
 class HackLog(object):
@@ -139,7 +139,8 @@ class NetboxJobScheduler(object):
             self._start_time = datetime.datetime.now()
             deferred = self.pool.execute_job(self.job.name, self.netbox.id,
                                              plugins=self.job.plugins,
-                                             interval=self.job.interval)
+                                             interval=self.job.interval,
+                                             netbox_snapshot=self.netbox)
             self._current_job = deferred
         except Exception:
             self._log_unhandled_error(Failure())
@@ -29,7 +29,7 @@ from django.db.models import Q
 from nav.models import manage
 from nav.event2 import EventFactory
 
-from nav.ipdevpoll.storage import MetaShadow, Shadow, shadowify
+from nav.ipdevpoll.storage import MetaShadow, Shadow, BulkManager, shadowify
 from nav.ipdevpoll import descrparsers
 from nav.ipdevpoll import utils
 
@@ -578,6 +578,7 @@ class SwPortVlan(Shadow):
 
 class Arp(Shadow):
     __shadowclass__ = manage.Arp
+    manager = BulkManager
 
     def save(self, containers):
         if not self.id:
@@ -45,14 +45,15 @@ is None, and whose source attribute is a non-empty string.
 from django.utils import six
 
 from nav.models import manage
-from nav.ipdevpoll.storage import Shadow, DefaultManager
+from nav.ipdevpoll.storage import (Shadow, DefaultManager, BulkManager,
+                                   bulk_update)
 from nav.ipdevpoll.utils import is_invalid_utf8
 from .netbox import Netbox
 
 MAX_MISS_COUNT = 3
 
 
-class AdjacencyManager(DefaultManager):
+class AdjacencyManager(BulkManager):
     "Manages AdjacencyCandidate records"
 
     _existing = None
@@ -91,6 +92,10 @@ class AdjacencyManager(DefaultManager):
         self._logger.debug("missing: %r", self._missing)
         self._logger.debug("sources: %r", self._sources)
 
+    def is_bulk_saveable(self, obj):
+        "Sentinel objects are left to their own devices"
+        return bool(obj.interface)
+
     def cleanup(self):
         self._handle_missing()
         self._delete_expired()
@@ -104,10 +109,10 @@ class AdjacencyManager(DefaultManager):
         lldp candidates to be missing.
 
         """
-        missing = (c for c in self._missing if c.source in self._sources)
+        missing = [c for c in self._missing if c.source in self._sources]
         for cand in missing:
-            db_cand = manage.AdjacencyCandidate.objects.filter(id=cand.id)
-            db_cand.update(miss_count=cand.miss_count+1)
+            cand.miss_count += 1
+        bulk_update(missing, ['miss_count'])
 
     def _delete_expired(self):
         expired = manage.AdjacencyCandidate.objects.filter(
@@ -45,13 +45,14 @@ reclaimed by resetting end_time to infinity.
 """
 import datetime
 import logging
-from collections import namedtuple
+from collections import namedtuple, defaultdict
 
 from nav.models import manage
 from nav.models.fields import INFINITY
 from django.db.models import Q
 from django.db import transaction
-from nav.ipdevpoll.storage import DefaultManager
+from nav.ipdevpoll.storage import (DefaultManager, bulk_update,
+                                   BULK_SAVE_BATCH_SIZE)
 from .netbox import Netbox
 from .interface import Interface
 
@@ -118,17 +119,16 @@ class CamManager(DefaultManager):
 
     @transaction.atomic()
     def save(self):
-        # Reuse the same object over and over in an attempt to avoid the
-        # overhead of Python object creation
-        record = manage.Cam(
-            netbox_id=self.netbox.id, sysname=self.netbox.sysname,
-            start_time=datetime.datetime.now(), end_time=INFINITY)
-        for cam in self._new:
-            record.id = None
-            record.port = self._get_port_for(cam.ifindex)
-            record.ifindex = cam.ifindex
-            record.mac = cam.mac
-            record.save()
+        start_time = datetime.datetime.now()
+        records = [
+            manage.Cam(netbox_id=self.netbox.id, sysname=self.netbox.sysname,
+                       start_time=start_time, end_time=INFINITY,
+                       port=self._get_port_for(cam.ifindex),
+                       ifindex=cam.ifindex, mac=cam.mac)
+            for cam in self._new]
+        if records:
+            manage.Cam.objects.bulk_create(records,
+                                           batch_size=BULK_SAVE_BATCH_SIZE)
 
         # reclaim recently closed records
         keepers = (self._previously_open[cam] for cam in self._keepers)
@@ -161,11 +161,22 @@ class CamManager(DefaultManager):
         return self._ifnames.get(ifindex, '')
 
     def cleanup(self):
+        closing = defaultdict(list)
         for cam_detail in self._missing:
-            self._close_missing(cam_detail)
+            upd = self._get_closing_changes(cam_detail)
+            if upd:
+                record = manage.Cam(id=cam_detail.id, **upd)
+                closing[tuple(sorted(upd))].append(record)
+
+        for attrs, records in closing.items():
+            bulk_update(records, attrs)
 
     @classmethod
-    def _close_missing(cls, cam_detail):
+    def _get_closing_changes(cls, cam_detail):
+        """Returns a dict of the attribute changes needed to close a missing
+        cam record.
+
+        """
         upd = {}
         cls._logger.debug("closing %r", cam_detail)
         if cam_detail.end_time >= INFINITY:
@@ -175,9 +186,7 @@ class CamManager(DefaultManager):
             miss_count = cam_detail.miss_count + 1
             upd['miss_count'] = (miss_count if miss_count < MAX_MISS_COUNT
                                  else None)
-
-        if upd:
-            manage.Cam.objects.filter(id=cam_detail.id).update(**upd)
+        return upd
 
     @classmethod
     def add_sentinel(cls, containers):
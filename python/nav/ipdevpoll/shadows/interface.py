@@ -24,7 +24,7 @@ from nav.models.event import EventQueue as Event, EventQueueVar as EventVar
 from nav.models.event import AlertHistory
 from nav import natsort
 
-from nav.ipdevpoll.storage import Shadow, DefaultManager
+from nav.ipdevpoll.storage import Shadow, BulkManager
 
 from django.db.models import Q
 from django.db import transaction
@@ -37,7 +37,7 @@ INFINITY = datetime.datetime.max
 # pylint: disable=C0111
 
 
-class InterfaceManager(DefaultManager):
+class InterfaceManager(BulkManager):
     _found_existing_map = {}
     _db_ifcs = []
     _by_ifname = {}
@@ -0,0 +1,207 @@
+#
+# Copyright (C) 2019 Uninett AS
+#
+# This file is part of Network Administration Visualized (NAV).
+#
+# NAV is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with NAV. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Caches of database data that are shared between ipdevpoll's worker
+processes in multiprocess mode.
+
+A shared dataset is a synchronous function that loads some data from the
+database, typically cached for a while by the function itself, and which is
+decorated using shared(). When called in a worker process, the function
+isn't run by the worker itself. Instead, the worker asks the master process
+for the current version of the dataset over the AMP channel. The master runs
+the function, and if the data has changed, it writes a snapshot of the data
+to a file that is shared by all the workers. A worker only reads a snapshot
+when the version of the dataset has changed since the worker last read it.
+
+"""
+from datetime import datetime, timedelta
+from functools import wraps
+from hashlib import sha1
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+
+from twisted.internet import reactor, threads
+from twisted.internet.defer import inlineCallbacks, returnValue
+from twisted.protocols import amp
+from twisted.python import threadable
+
+from nav.ipdevpoll import db
+
+# How long a worker uses a dataset before asking the master whether it has
+# changed
+CHECK_INTERVAL = timedelta(minutes=1)
+
+_logger = logging.getLogger(__name__)
+_datasets = {}
+_client = None
+
+
+class GetDataset(amp.Command):
+    """Asks the master process for the current version of a shared dataset"""
+    arguments = [
+        (b'name', amp.Unicode()),
+    ]
+    response = [(b'version', amp.Unicode()),
+                (b'path', amp.Unicode())]
+    errors = {
+        KeyError: b'UnknownDataset',
+    }
+
+
+def shared(name):
+    """Decorates a synchronous data loading function as a shared dataset.
+
+    :param name: A name that uniquely identifies the dataset.
+
+    """
+    def _decorator(func):
+        _datasets[name] = func
+
+        @wraps(func)
+        def _wrapper():
+            if _client is None or threadable.isInIOThread():
+                return func()
+            return _client.get(name, func)
+
+        return _wrapper
+
+    return _decorator
+
+
+def install_client(master):
+    """Makes this process get its shared datasets from the master process.
+
+    :param master: The AMP protocol instance connected to the master process.
+
+    """
+    global _client
+    _client = SharedCacheClient(master)
+    return _client
+
+
+class SharedCacheService(amp.CommandLocator):
+    """The master process' provider of shared datasets to its workers"""
+
+    def __init__(self, directory=None):
+        super(SharedCacheService, self).__init__()
+        self.directory = directory or tempfile.mkdtemp(
+            prefix='ipdevpoll-cache-')
+        self._data = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    @GetDataset.responder
+    @inlineCallbacks
+    def get_dataset(self, name):
+        """Responds with the current version of a dataset, and the path of
+        the snapshot file that holds it.
+
+        """
+        if name not in _datasets:
+            raise KeyError(name)
+        version = yield db.run_in_thread(self.update_snapshot, name)
+        returnValue({'version': version, 'path': self.get_path(name)})
+
+    def update_snapshot(self, name):
+        """Loads a dataset and writes a new snapshot of it if its data has
+        changed since the last snapshot.
+
+        :returns: The current version of the dataset.
+
+        """
+        data = _datasets[name]()
+        with self._lock:
+            if name in self._data and data is self._data[name]:
+                return self._versions[name]
+            pickled = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+            version = sha1(pickled).hexdigest()
+            if version != self._versions.get(name):
+                _write_snapshot(self.get_path(name), version, pickled)
+                _logger.debug("new version of shared dataset %s: %s",
+                              name, version)
+            self._data[name] = data
+            self._versions[name] = version
+            return version
+
+    def get_path(self, name):
+        """Returns the path of the snapshot file of a dataset"""
+        return os.path.join(self.directory, name + '.pickle')
+
+    def cleanup(self):
+        """Removes all snapshot files"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class SharedCacheClient(object):
+    """A worker process' cache of the shared datasets it has used"""
+
+    def __init__(self, master):
+        self.master = master
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, loader):
+        """Returns the current data of a dataset.
+
+        Must not be called from the reactor thread.
+
+        :param loader: A function to load the dataset locally, in case the
+                       master process cannot provide it.
+
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and datetime.now() - entry.checked < CHECK_INTERVAL:
+                return entry.data
+            try:
+                response = threads.blockingCallFromThread(
+                    reactor, self.master.callRemote, GetDataset, name=name)
+                if entry and entry.version == response['version']:
+                    entry.checked = datetime.now()
+                    return entry.data
+                version, data = _read_snapshot(response['path'])
+            except Exception as error:  # pylint: disable=broad-except
+                _logger.warning("could not get shared dataset %s from the "
+                                "master process, loading it locally: %s",
+                                name, error)
+                return loader()
+            self._entries[name] = _Entry(version, data)
+            return data
+
+
+class _Entry(object):
+    def __init__(self, version, data):
+        self.version = version
+        self.data = data
+        self.checked = datetime.now()
+
+
+def _write_snapshot(path, version, pickled):
+    tempfile_ = path + '.tmp'
+    with open(tempfile_, 'wb') as snapshot:
+        pickle.dump(version, snapshot, pickle.HIGHEST_PROTOCOL)
+        snapshot.write(pickled)
+    os.rename(tempfile_, path)
+
+
+def _read_snapshot(path):
+    with open(path, 'rb') as snapshot:
+        version = pickle.load(snapshot)
+        data = pickle.load(snapshot)
+    return version, data
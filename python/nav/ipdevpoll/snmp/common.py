@@ -53,8 +53,12 @@ def throttled(func):
     def _wrapper(*args, **kwargs):
         self = args[0]
         last_request = getattr(self, '_last_request')
-        delay = (last_request + self.throttle_delay) - time.time()
-        setattr(self, '_last_request', time.time())
+        now = time.time()
+        # Requests issued concurrently must be spaced out after each other,
+        # so we record the time this request is scheduled to be sent
+        next_request = max(now, last_request + self.throttle_delay)
+        delay = next_request - now
+        setattr(self, '_last_request', next_request)
 
         if delay > 0:
             _logger.debug("%sss delay due to throttling: %r", delay, self)
@@ -132,10 +136,12 @@ class AgentProxyMixIn(object):
 
 # pylint: disable=C0103
 SNMPParameters = namedtuple('SNMPParameters',
-                            'timeout max_repetitions throttle_delay')
+                            'timeout max_repetitions throttle_delay '
+                            'max_concurrent_columns interleaved_columns')
 
 SNMP_DEFAULTS = SNMPParameters(timeout=1.5, max_repetitions=50,
-                               throttle_delay=0)
+                               throttle_delay=0, max_concurrent_columns=1,
+                               interleaved_columns=False)
 
 
 # pylint: disable=W0212
@@ -143,22 +149,30 @@ def snmp_parameter_factory(host=None):
     """Returns specific SNMP parameters for `host`, or default values from
     ipdevpoll's config if host specific values aren't available.
 
+    Host specific values are read from a config section named
+    ``snmp:<sysname>``, and override the defaults from the ``snmp`` section.
+
     :returns: An SNMPParameters namedtuple.
 
     """
-    section = 'snmp'
+    sections = ['snmp']
+    if getattr(host, 'sysname', None):
+        sections.append('snmp:%s' % host.sysname)
 
     from nav.ipdevpoll.config import ipdevpoll_conf as config
     params = SNMP_DEFAULTS._asdict()
 
-    for var, getter in [
-            ('max-repetitions', config.getint),
-            ('timeout', config.getfloat),
-            ('throttle-delay', config.getfloat),
-    ]:
-        if config.has_option(section, var):
-            key = var.replace('-', '_')
-            params[key] = getter(section, var)
+    for section in sections:
+        for var, getter in [
+                ('max-repetitions', config.getint),
+                ('timeout', config.getfloat),
+                ('throttle-delay', config.getfloat),
+                ('max-concurrent-columns', config.getint),
+                ('interleaved-columns', config.getboolean),
+        ]:
+            if config.has_option(section, var):
+                key = var.replace('-', '_')
+                params[key] = getter(section, var)
 
     return SNMPParameters(**params)
 
@@ -15,12 +15,30 @@
 #
 """Storage layer for ipdevpoll"""
 
+from collections import defaultdict
+
+import IPy
+
 import django.db.models
-from django.db import transaction
+from django.db import connection, transaction
 from django.utils import six
 
 from nav import toposort
 from nav import ipdevpoll
+from nav.models.fields import CIDRField
+
+# Max number of shadows whose lookup values are put into a single IN-query
+# when bulk resolving existing models
+BULK_LOOKUP_CHUNK_SIZE = 1000
+
+# Max number of rows written by a single multi-row INSERT or UPDATE statement
+BULK_SAVE_BATCH_SIZE = 500
+
+# Markers used while bulk resolving existing models
+_UNKNOWN = object()
+_AMBIGUOUS = object()
+# Column types of database tables, as used by bulk_update()
+_column_types = {}
 
 
 class MetaShadow(type):
@@ -80,6 +98,126 @@ class DefaultManager(object):
     def prepare(self):
         """Prepares managed shadows in containers"""
         self.cls.prepare_for_save(self.containers)
+        self.resolve_existing_models()
+
+    def resolve_existing_models(self):
+        """Resolves the existing database objects of the managed shadows using
+        a handful of bulk queries, instead of letting each shadow query the
+        database by itself during the save stage.
+
+        Each lookup field from the shadow class' __lookups__ list is
+        resolved for all the managed shadows using IN-queries, and matching
+        objects are pre-seeded into the shadows' existing model caches.
+        Shadows that are definitely not in the database are marked as such.
+
+        Any shadow whose existing object cannot be unambiguously determined
+        this way is left for get_existing_model() to resolve on its own, as
+        before. Shadow classes that override get_existing_model() are not
+        touched at all.
+
+        """
+        if self.cls.has_custom_existing_model_lookup():
+            return
+
+        unresolved = [obj for obj in self.get_managed()
+                      if isinstance(obj, self.cls)
+                      and not getattr(obj, '_cached_existing_model', None)]
+        if not unresolved:
+            return
+
+        by_pk = []
+        by_lookups = []
+        for obj in unresolved:
+            pkey_value = obj.get_primary_key()
+            if pkey_value is None:
+                by_lookups.append(obj)
+            elif pkey_value and not isinstance(pkey_value, Shadow):
+                by_pk.append(obj)
+
+        self._resolve_by_primary_key(by_pk)
+        self._resolve_by_lookups(by_lookups)
+
+    def _resolve_by_primary_key(self, shadows):
+        pkey = self.cls._meta.pk
+        for obj, model in self._match_existing((pkey.name,), shadows):
+            if model not in (None, _AMBIGUOUS):
+                obj.set_existing_model(model)
+
+    def _resolve_by_lookups(self, shadows):
+        pending = shadows
+        for lookup in self.cls.__lookups__:
+            fields = lookup if isinstance(lookup, tuple) else (lookup,)
+            remaining = []
+            for obj, model in self._match_existing(fields, pending):
+                if model is None:
+                    remaining.append(obj)
+                elif model is not _AMBIGUOUS:
+                    obj.set_existing_model(model)
+            pending = remaining
+
+        # Every lookup was tried without a match, so these are new objects
+        for obj in pending:
+            obj._cached_nonexistent = True
+
+    def _match_existing(self, fields, shadows):
+        """Matches shadows against existing database objects on the lookup
+        fields.
+
+        :returns: A generator of (shadow, model) tuples. model is None if no
+                  existing object matched, or _AMBIGUOUS if more than one
+                  did. Shadows whose lookup values cannot be compared in bulk
+                  are not included in the output.
+
+        """
+        db_fields = [self.cls._meta.get_field(name) for name in fields]
+        keyed = []
+        for obj in shadows:
+            values = [getattr(obj, name) for name in fields]
+            if len(values) == 1 and values[0] is None:
+                # a single lookup field with no value is skipped altogether
+                yield obj, None
+                continue
+            key = tuple(_normalize_lookup_value(field, value)
+                        for field, value in zip(db_fields, values))
+            if _UNKNOWN not in key:
+                keyed.append((obj, key))
+
+        for index in range(0, len(keyed), BULK_LOOKUP_CHUNK_SIZE):
+            chunk = keyed[index:index + BULK_LOOKUP_CHUNK_SIZE]
+            existing = self._load_existing_by_keys(
+                db_fields, [key for _obj, key in chunk])
+            for obj, key in chunk:
+                yield obj, existing.get(key)
+
+    def _load_existing_by_keys(self, db_fields, keys):
+        """Loads existing objects whose lookup fields match any of keys.
+
+        :returns: A dict of {key: model}. Keys matching multiple objects map
+                  to _AMBIGUOUS.
+
+        """
+        query = django.db.models.Q()
+        for position, field in enumerate(db_fields):
+            values = set(key[position] for key in keys)
+            has_null = None in values
+            values.discard(None)
+            matcher = django.db.models.Q(
+                **{'%s__in' % field.name: [_query_value(v) for v in values]})
+            if has_null:
+                matcher |= django.db.models.Q(
+                    **{'%s__isnull' % field.name: True})
+            query &= matcher
+
+        wanted = set(keys)
+        existing = {}
+        for model in self.cls.__shadowclass__.objects.filter(query):
+            key = tuple(_normalize_lookup_value(field,
+                                                getattr(model, field.attname))
+                        for field in db_fields)
+            if key not in wanted:
+                continue
+            existing[key] = _AMBIGUOUS if key in existing else model
+        return existing
 
     def save(self):
         """Saves managed shadows in containers"""
@@ -103,6 +241,193 @@ class DefaultManager(object):
                                     self.containers.__class__.__name__)
 
 
+class BulkManager(DefaultManager):
+    """A storage manager that saves its shadows using bulk operations.
+
+    New objects are inserted using multi-row INSERT statements, while changed
+    objects are written using batched UPDATE statements, one for each
+    distinct set of changed attributes.
+
+    Shadows marked for deletion, shadows not accepted by is_bulk_saveable()
+    and shadows whose existence in the database was not determined during
+    the prepare stage are saved individually, just like the DefaultManager
+    would do it.
+
+    """
+    batch_size = BULK_SAVE_BATCH_SIZE
+
+    @transaction.atomic()
+    def save(self):
+        """Saves managed shadows in containers, using bulk operations"""
+        inserts = []
+        updates = defaultdict(list)
+        for obj in self.get_managed():
+            if obj.delete or not self.is_bulk_saveable(obj):
+                obj.save(self.containers)
+                continue
+
+            pkey = obj.get_primary_key()
+            existing = getattr(obj, '_cached_existing_model', None)
+            if not existing and pkey is None:
+                existing = obj.get_existing_model(self.containers)
+
+            if existing:
+                diff = obj.get_diff_attrs(existing)
+                if diff:
+                    model = obj.convert_to_model(self.containers)
+                    updates[tuple(sorted(diff))].append((obj, model))
+            elif pkey is None:
+                model = obj.convert_to_model(self.containers)
+                if model:
+                    inserts.append((obj, model))
+            else:
+                obj.save(self.containers)
+
+        for attrs, changed in updates.items():
+            self._update(attrs, changed)
+        if inserts:
+            self._insert(inserts)
+
+    def is_bulk_saveable(self, obj):
+        """Returns True if obj can be saved using bulk operations.
+
+        Override this in subclasses to have special objects saved
+        individually, using their own save() implementation.
+
+        """
+        return True
+
+    def _update(self, attrs, changed):
+        self._logger.debug("bulk updating %s for %d %s objects",
+                           ", ".join(attrs), len(changed), self.cls.__name__)
+        bulk_update([model for _obj, model in changed], attrs,
+                    batch_size=self.batch_size)
+        for obj, _model in changed:
+            obj._touched.clear()
+
+    def _insert(self, inserts):
+        self._logger.debug("bulk inserting %d new %s objects",
+                           len(inserts), self.cls.__name__)
+        models = [model for _obj, model in inserts]
+        if getattr(connection.features, 'can_return_ids_from_bulk_insert',
+                   False):
+            self.cls.__shadowclass__.objects.bulk_create(
+                models, batch_size=self.batch_size)
+        else:
+            # We need the new primary keys, which the database backend
+            # won't give us from a bulk insert
+            for model in models:
+                model.save()
+
+        for obj, model in inserts:
+            # Ensure other shadows referring to this one will know about its
+            # newly allocated primary key
+            if not obj.get_primary_key():
+                obj.set_primary_key(model.pk)
+            obj._touched.clear()
+
+
+def bulk_update(models, attrs, batch_size=BULK_SAVE_BATCH_SIZE):
+    """Updates the given attributes of multiple model objects of the same
+    class in the database, using a few UPDATE ... FROM (VALUES ...)
+    statements.
+
+    :param models: A list of Django model objects, all of the same class,
+                   whose primary keys identify existing database rows.
+    :param attrs: The names of the model fields to update from the objects.
+    :param batch_size: The max number of rows to update per statement.
+
+    """
+    if not models:
+        return
+    meta = models[0]._meta
+    fields = [meta.pk] + [meta.get_field(attr) for attr in attrs]
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    columns = ", ".join(quote(field.column) for field in fields)
+    assignments = ", ".join(
+        "{column} = changed.{column}".format(column=quote(field.column))
+        for field in fields[1:])
+    sql = ("UPDATE {table} AS target SET {assignments} "
+           "FROM (VALUES {values}) AS changed ({columns}) "
+           "WHERE target.{pkey} = changed.{pkey}")
+    # PostgreSQL would otherwise type VALUES columns of only quoted strings
+    # or NULLs as text, which cannot be assigned to e.g. inet, macaddr or
+    # integer columns. The Django field types don't necessarily match the
+    # table, so the casts use the column types of the table itself.
+    column_types = get_column_types(table)
+    row = "(%s)" % ", ".join(
+        "CAST(%s AS {type})".format(type=column_types[field.column])
+        for field in fields)
+
+    cursor = connection.cursor()
+    for index in range(0, len(models), batch_size):
+        batch = models[index:index + batch_size]
+        params = []
+        for model in batch:
+            params.extend(
+                field.get_db_prep_value(getattr(model, field.attname),
+                                        connection)
+                for field in fields)
+        cursor.execute(
+            sql.format(table=table, assignments=assignments, columns=columns,
+                       values=", ".join([row] * len(batch)),
+                       pkey=quote(meta.pk.column)),
+            params)
+
+
+def get_column_types(table):
+    """Returns the database types of a table's columns.
+
+    :param table: A quoted table name.
+    :returns: A dict of {column_name: type_name}.
+
+    """
+    if table not in _column_types:
+        cursor = connection.cursor()
+        cursor.execute("SELECT attname, format_type(atttypid, atttypmod) "
+                       "FROM pg_attribute "
+                       "WHERE attrelid = %s::regclass "
+                       "AND attnum > 0 AND NOT attisdropped", [table])
+        _column_types[table] = dict(cursor.fetchall())
+    return _column_types[table]
+
+
+def _normalize_lookup_value(field, value):
+    """Normalizes a shadow or database lookup value, so that equal values can
+    be matched in Python the same way the database would.
+
+    :returns: A normalized, hashable value, or _UNKNOWN if the value cannot
+              be safely compared outside the database.
+
+    """
+    if value is None:
+        return None
+    if isinstance(value, Shadow):
+        # only trust references to objects known to exist in the database
+        existing = getattr(value, '_cached_existing_model', None)
+        if not existing:
+            return _UNKNOWN
+        value = existing.pk
+    elif isinstance(value, django.db.models.Model):
+        value = value.pk
+
+    if isinstance(field, (CIDRField,
+                          django.db.models.GenericIPAddressField)):
+        try:
+            return IPy.IP(six.text_type(value))
+        except ValueError:
+            return _UNKNOWN
+    return value
+
+
+def _query_value(value):
+    """Converts a normalized lookup value into something usable in a query"""
+    if isinstance(value, IPy.IP):
+        return six.text_type(value)
+    return value
+
+
 @six.add_metaclass(MetaShadow)
 class Shadow(object):
     """Base class to shadow Django model classes.
@@ -159,6 +484,7 @@ class Shadow(object):
         self.update_only = False
         self._cached_converted_model = None
         self._cached_existing_model = None
+        self._cached_nonexistent = False
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
@@ -337,6 +663,9 @@ class Shadow(object):
         if hasattr(self, '_cached_existing_model') and \
                 self._cached_existing_model:
             return self._cached_existing_model
+        if getattr(self, '_cached_nonexistent', False) and \
+                self.get_primary_key() is None:
+            return None
         if containers is None:
             containers = {}
 
@@ -402,6 +731,17 @@ class Shadow(object):
                     self._cached_existing_model = model
                     return model
 
+    @classmethod
+    def has_custom_existing_model_lookup(cls):
+        """Returns True if this class overrides the default get_existing_model
+        implementation.
+
+        """
+        method = cls.get_existing_model
+        default = Shadow.get_existing_model
+        return (getattr(method, '__func__', method) is not
+                getattr(default, '__func__', default))
+
     def set_existing_model(self, django_object):
         """Explicitly sets the existing Django model instance this shadow
         instance represents.
@@ -26,6 +26,7 @@ from twisted.internet import defer
 from twisted.internet.defer import Deferred
 from twisted.internet import reactor
 
+from nav.iptrie import PrefixTrie
 from nav.oids import get_enterprise_id
 from nav.enterprise.ids import VENDOR_ID_CISCOSYSTEMS
 from nav.enterprise.ids import VENDOR_ID_ARUBA_NETWORKS_INC
@@ -78,15 +79,24 @@ def truncate_mac(mac):
 def find_prefix(ip, prefix_list):
     """Takes an IPy.IP object and a list of manage.Prefix and returns the most
     precise prefix the IP matches.
+
+    To look up many addresses in the same list of prefixes, make a
+    PrefixTrie of the prefixes once using make_prefix_trie(), and supply it
+    instead of the list.
+    """
+    if not isinstance(prefix_list, PrefixTrie):
+        prefix_list = make_prefix_trie(prefix_list)
+    return prefix_list.longest_match(ip)
+
+
+def make_prefix_trie(prefix_list):
+    """Makes a PrefixTrie that maps the net addresses of a list of
+    manage.Prefix objects to the objects themselves.
+
+    If the list contains duplicate net addresses, the first one wins.
     """
-    ret = None
-    for pfx in prefix_list:
-        sub = IP(pfx.net_address)
-        if ip in sub:
-            # Return the most precise prefix, ie the longest prefix
-            if not ret or IP(ret.net_address).prefixlen() < sub.prefixlen():
-                ret = pfx
-    return ret
+    return PrefixTrie((IP(pfx.net_address), pfx)
+                      for pfx in reversed(list(prefix_list)))
 
 
 def is_invalid_utf8(string):
@@ -0,0 +1,117 @@
+#
+# Copyright (C) 2019 Uninett AS
+#
+# This file is part of Network Administration Visualized (NAV).
+#
+# NAV is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.  You should have received a copy of the GNU General Public License
+# along with NAV. If not, see <http://www.gnu.org/licenses/>.
+#
+"""A binary radix trie for longest-prefix-match lookups of IP addresses.
+
+Looking up an address in a PrefixTrie takes time proportional to the prefix
+length of the address family, regardless of how many prefixes the trie
+contains. This makes it a far better fit than linear scans of prefix lists
+when matching large numbers of addresses against large numbers of prefixes:
+
+>>> trie = PrefixTrie([('10.0.0.0/8', 'big'), ('10.0.1.0/24', 'small')])
+>>> trie.longest_match('10.0.1.42')
+'small'
+>>> trie.longest_match('10.1.0.1')
+'big'
+>>> trie.longest_match('192.168.0.1') is None
+True
+
+"""
+from IPy import IP
+
+ADDRESS_BITS = {4: 32, 6: 128}
+
+# Indexes into trie node lists. A node is a list of [zero, one, value], where
+# zero and one are child nodes, and value is the value stored for the prefix
+# the node represents (or _EMPTY)
+_ZERO, _ONE, _VALUE = 0, 1, 2
+_EMPTY = object()
+
+
+class PrefixTrie(object):
+    """A longest-prefix-match index of IPv4 and IPv6 prefixes"""
+
+    def __init__(self, prefixes=None):
+        """Initializes a trie.
+
+        :param prefixes: An optional iterable of (prefix, value) tuples to add
+                         to the trie.
+
+        """
+        self._roots = dict((version, _make_node()) for version in ADDRESS_BITS)
+        self._count = 0
+        if prefixes:
+            for prefix, value in prefixes:
+                self.add(prefix, value)
+
+    def __len__(self):
+        return self._count
+
+    def add(self, prefix, value):
+        """Adds a prefix to the trie, replacing any value previously stored
+        for the same prefix.
+
+        :param prefix: An IPy.IP object or a string representation of a
+                       prefix.
+        :param value: The value to associate with this prefix.
+
+        """
+        address, prefixlen, bits = _parse(prefix)
+        node = self._roots[bits]
+        for bit in _iter_bits(address, prefixlen, ADDRESS_BITS[bits]):
+            child = node[bit]
+            if child is None:
+                child = node[bit] = _make_node()
+            node = child
+
+        if node[_VALUE] is _EMPTY:
+            self._count += 1
+        node[_VALUE] = value
+
+    def longest_match(self, address, default=None):
+        """Returns the value of the longest prefix containing address.
+
+        :param address: An IPy.IP object or a string representation of an IP
+                        address. If address is a network, only prefixes
+                        containing the entire network will match.
+        :param default: The value to return if no prefix matched.
+
+        """
+        address, prefixlen, bits = _parse(address)
+        node = self._roots[bits]
+        match = node[_VALUE]
+        for bit in _iter_bits(address, prefixlen, ADDRESS_BITS[bits]):
+            node = node[bit]
+            if node is None:
+                break
+            if node[_VALUE] is not _EMPTY:
+                match = node[_VALUE]
+        return default if match is _EMPTY else match
+
+
+def _make_node():
+    return [None, None, _EMPTY]
+
+
+def _parse(prefix):
+    if not isinstance(prefix, IP):
+        prefix = IP(prefix)
+    return prefix.int(), prefix.prefixlen(), prefix.version()
+
+
+def _iter_bits(address, prefixlen, address_bits):
+    """Yields the first prefixlen bits of address, most significant first"""
+    for shift in range(address_bits - 1, address_bits - prefixlen - 1, -1):
+        yield (address >> shift) & 1
@@ -15,13 +15,21 @@
 #
 """
 This module implements various common API to send metrics to a
-Graphite/Carbon backend. It currently only supports the UDP line protocol,
-as it's the easiest to implement, and will also work without vodoo in
+Graphite/Carbon backend. By default, it uses the UDP line protocol, as it's
+the easiest to implement, and will also work without vodoo in
 asynchronous programs (i .e. such as ipdevpoll, which is implemented using
 Twisted).
+
+Alternatively, metrics can be sent over a persistent TCP connection using
+Carbon's pickle protocol. Metrics are then queued in a bounded memory buffer
+while the Carbon backend is unreachable, and delivered once the connection
+is re-established.
 """
+from collections import deque
 import logging
+import pickle
 import socket
+import struct
 import time
 import warnings
 from nav.metrics import CONFIG
@@ -38,6 +46,18 @@ MAX_UDP_PAYLOAD = 1400
 # Minimum interval between socket error log entries, in seconds
 SOCKET_ERROR_MESSAGE_INTERVAL = 1
 
+# Maximum number of metrics to send in a single pickle protocol frame. Carbon
+# refuses frames larger than 1 MiB.
+MAX_PICKLE_BATCH = 1000
+
+# Minimum interval between attempts to reconnect to Carbon, in seconds
+RECONNECT_INTERVAL = 10
+
+# Timeout for TCP connections to Carbon, in seconds
+TCP_TIMEOUT = 5
+
+_sender = None
+
 
 class CarbonWarning(UserWarning):
     """Custom warning class for Carbon connection related warnings"""
@@ -116,9 +136,168 @@ def send_metrics(metric_tuples):
                           [(path, (timestamp, value)), ...]
 
     """
-    host = CONFIG.get("carbon", "host")
-    port = CONFIG.getint("carbon", "port")
-    return send_metrics_to(metric_tuples, host, port)
+    return get_sender().send(metric_tuples)
+
+
+def get_sender():
+    """Returns the metric sender for the pre-configured carbon backend.
+
+    The configuration is only read once; the same sender instance is returned
+    on every subsequent call.
+
+    """
+    global _sender  # pylint: disable=W0603
+    if _sender is None:
+        _sender = make_sender_from_config(CONFIG)
+    return _sender
+
+
+def set_sender(sender):
+    """Replaces the metric sender used by send_metrics() in this process.
+
+    :param sender: Any object with a send(metric_tuples) method.
+
+    """
+    global _sender  # pylint: disable=W0603
+    _sender = sender
+
+
+def make_sender_from_config(config):
+    """Creates a metric sender as described by the carbon section of config"""
+    host = config.get("carbon", "host")
+    port = config.getint("carbon", "port")
+    protocol = config.get("carbon", "protocol").strip().lower()
+    if protocol == "pickle":
+        queue_size = config.getint("carbon", "queue_size")
+        return PickleSender(host, port, queue_size)
+    elif protocol != "udp":
+        _logger.error("unknown carbon protocol %r, using udp", protocol)
+    return UdpSender(host, port)
+
+
+class UdpSender(object):
+    """Sends metrics to a Carbon backend using the UDP line protocol.
+
+    Metrics that cannot be sent are dropped.
+
+    """
+    def __init__(self, host, port=2003):
+        self.host = host
+        self.port = port
+        self.sent = 0
+        self.dropped = 0
+        self._socket = None
+
+    def send(self, metric_tuples):
+        """Sends a list of metric tuples to the carbon backend"""
+        if not isinstance(metric_tuples, list):
+            metric_tuples = list(metric_tuples)
+        _logger.debug("sending carbon metrics to [%s]:%s: %r",
+                      self.host, self.port, metric_tuples)
+        try:
+            if self._socket is None:
+                self._socket = socket.socket(_socktype_from_addr(self.host),
+                                             socket.SOCK_DGRAM)
+                self._socket.connect((self.host, self.port))
+            for packet in metrics_to_packets(metric_tuples):
+                self._socket.send(packet)
+        except socket.error as error:
+            self.dropped += len(metric_tuples)
+            _handle_error(error, self.host, self.port)
+        else:
+            self.sent += len(metric_tuples)
+
+
+class PickleSender(object):
+    """Sends metrics to a Carbon backend over a persistent TCP connection,
+    using the pickle protocol.
+
+    Metrics are queued and sent in large batches. If the connection to Carbon
+    fails, metrics stay queued until a new connection can be made, at most
+    once every RECONNECT_INTERVAL seconds. Once the queue holds more than
+    queue_size metrics, the oldest metrics are dropped.
+
+    """
+    def __init__(self, host, port=2004, queue_size=100000):
+        self.host = host
+        self.port = port
+        self.sent = 0
+        self.dropped = 0
+        self._queue = deque()
+        self._queue_size = queue_size
+        self._socket = None
+        self._next_connect = 0
+
+    @property
+    def queued(self):
+        """The number of metrics currently waiting to be sent"""
+        return len(self._queue)
+
+    def send(self, metric_tuples):
+        """Queues a list of metric tuples and sends as much of the queue as
+        possible to the carbon backend.
+
+        """
+        self.enqueue(metric_tuples)
+        self.flush()
+
+    def enqueue(self, metric_tuples):
+        """Adds metric tuples to the send queue, dropping the oldest queued
+        metrics if the queue is full.
+
+        """
+        self.dropped += enqueue_metrics(self._queue, metric_tuples,
+                                        self._queue_size)
+
+    def flush(self):
+        """Sends queued metrics to the carbon backend until the queue is empty
+        or the connection fails.
+
+        """
+        while self._queue:
+            if not self._connect():
+                return
+            batch = [self._queue.popleft()
+                     for _ in range(min(MAX_PICKLE_BATCH, len(self._queue)))]
+            try:
+                self._socket.sendall(metrics_to_pickle_frame(batch))
+            except socket.error as error:
+                # If parts of the batch were received before the error,
+                # resending it merely overwrites the same data points.
+                self._queue.extendleft(reversed(batch))
+                self._disconnect()
+                _handle_error(error, self.host, self.port)
+                return
+            self.sent += len(batch)
+
+    def _connect(self):
+        if self._socket is not None:
+            return True
+        if time.time() < self._next_connect:
+            return False
+
+        self._next_connect = time.time() + RECONNECT_INTERVAL
+        try:
+            self._socket = socket.create_connection((self.host, self.port),
+                                                    timeout=TCP_TIMEOUT)
+        except socket.error as error:
+            _handle_error(error, self.host, self.port)
+            return False
+        _logger.debug("connected to carbon pickle receiver at [%s]:%s",
+                      self.host, self.port)
+        return True
+
+    def _disconnect(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except socket.error:
+                pass
+            self._socket = None
+
+    def close(self):
+        """Closes the connection to the carbon backend"""
+        self._disconnect()
 
 
 def _socktype_from_addr(addr):
@@ -127,6 +306,58 @@ def _socktype_from_addr(addr):
     return socktype
 
 
+def normalize_metric(metric_tuple):
+    """Normalizes a metric tuple to the basic types accepted by Carbon's
+    pickle receiver.
+
+    :raises: TypeError or ValueError if the metric value is not numeric.
+
+    """
+    path, (timestamp, value) = metric_tuple
+    return str(path), (int(timestamp), float(value))
+
+
+def enqueue_metrics(queue, metric_tuples, max_size):
+    """Appends normalized metric tuples to a bounded metric queue.
+
+    Malformed metrics are dropped, as are the oldest queued metrics if the
+    queue would otherwise grow beyond max_size.
+
+    :param queue: A collections.deque of metric tuples.
+    :returns: The number of dropped metrics.
+
+    """
+    dropped = 0
+    for metric in metric_tuples:
+        try:
+            queue.append(normalize_metric(metric))
+        except (TypeError, ValueError):
+            _logger.debug("dropping malformed metric: %r", metric)
+            dropped += 1
+
+    overflow = len(queue) - max_size
+    if overflow > 0:
+        for _ in range(overflow):
+            queue.popleft()
+        _logger.warning("carbon send queue is full, dropped %d metrics",
+                        overflow)
+        dropped += overflow
+    return dropped
+
+
+def metrics_to_pickle_frame(metric_tuples):
+    """
+    Converts a list of metric tuples to a single Carbon pickle protocol frame,
+    ready to transmit over a TCP connection to a Carbon backend.
+
+    :param metric_tuples: A list of metric tuples in the form
+                          [(path, (timestamp, value)), ...]
+
+    """
+    payload = pickle.dumps(list(metric_tuples), protocol=2)
+    return struct.pack("!L", len(payload)) + payload
+
+
 def _metric_to_line(metric_tuple):
     path, (timestamp, value) = metric_tuple
     line = "%s %s %s\n" % (path, value, int(timestamp))
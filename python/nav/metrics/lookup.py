@@ -15,15 +15,19 @@
 #
 """Functions for reverse-mapping metric names to NAV objects"""
 
+from collections import defaultdict
 import re
 
+from nav.metrics.names import escape_metric_name
 from nav.models.manage import Netbox, Interface, Prefix, Sensor
 from django.utils.lru_cache import lru_cache
 from django.utils.six import iteritems
 
 
-__all__ = ['reverses', 'lookup']
+__all__ = ['reverses', 'reverses_many', 'lookup', 'lookup_many']
 _reverse_handlers = []
+_bulk_reverse_handlers = {}
+_AMBIGUOUS = object()
 
 
 def _lookup(metric):
@@ -46,6 +50,43 @@ def _lookup(metric):
 lookup = lru_cache(maxsize=200)(_lookup)
 
 
+def lookup_many(metrics):
+    """
+    Looks up NAV objects from multiple metric paths at once.
+
+    Metrics are grouped by the reverse lookup function that handles them.
+    Groups whose lookup function has a registered bulk counterpart are
+    resolved using a few queries for the entire group, the rest are resolved
+    one by one.
+
+    :param metrics: An iterable of Graphite metric paths.
+    :return: A dict of {metric: object} items, where object is the result
+             of looking up the metric, or None if no match was found.
+
+    """
+    result = {}
+    groups = defaultdict(list)
+    for metric in metrics:
+        for pattern, func in _reverse_handlers:
+            match = pattern.search(metric)
+            if match:
+                groups[func].append((metric, match.groupdict()))
+                break
+        else:
+            result[metric] = None
+
+    for func, matches in iteritems(groups):
+        bulk_func = _bulk_reverse_handlers.get(func)
+        if bulk_func:
+            objects = bulk_func([kwargs for _metric, kwargs in matches])
+        else:
+            objects = [func(**kwargs) for _metric, kwargs in matches]
+        for (metric, _kwargs), obj in zip(matches, objects):
+            result[metric] = obj
+
+    return result
+
+
 def reverses(pattern):
     """Decorator to map regex patterns to reverse lookup functions"""
     try:
@@ -60,6 +101,21 @@ def reverses(pattern):
     return _decorator
 
 
+def reverses_many(func):
+    """Decorator to register a bulk counterpart of a reverse lookup function.
+
+    The decorated function receives a list of keyword argument dicts, as
+    would have been given to func for each metric, and must return a list of
+    lookup results in the same order.
+
+    """
+    def _decorator(bulk_func):
+        _bulk_reverse_handlers[func] = bulk_func
+        return bulk_func
+
+    return _decorator
+
+
 ### Reverse lookup functions
 
 @reverses(r'\.devices\.(?P<sysname>[^.]+)\.ports\.(?P<ifname>[^\.]+)')
@@ -102,8 +158,99 @@ def _reverse_prefix(netaddr):
     return _single_like_match(Prefix, netaddr=netaddr)
 
 
+### Bulk reverse lookup functions
+
+@reverses_many(_reverse_interface)
+def _reverse_interfaces(kwargs_list):
+    netboxes = _get_netbox_index()
+    matched = set(netboxes.get(kwargs['sysname']) for kwargs in kwargs_list)
+    matched.discard(None)
+    matched.discard(_AMBIGUOUS)
+
+    interfaces = Interface.objects.filter(
+        netbox__in=matched).select_related('netbox')
+    by_ifname = _make_unique_index(
+        interfaces, lambda ifc: (ifc.netbox_id, escape_metric_name(ifc.ifname)))
+    by_ifdescr = _make_unique_index(
+        interfaces,
+        lambda ifc: (ifc.netbox_id, escape_metric_name(ifc.ifdescr)))
+
+    result = []
+    for kwargs in kwargs_list:
+        netbox = _unique(netboxes.get(kwargs['sysname']))
+        key = (netbox.id, kwargs['ifname']) if netbox else None
+        result.append(_unique(by_ifname.get(key)) or
+                      _unique(by_ifdescr.get(key)))
+    return result
+
+
+@reverses_many(_reverse_sensor)
+def _reverse_sensors(kwargs_list):
+    netboxes = _get_netbox_index()
+    matched = set(netboxes.get(kwargs['sysname']) for kwargs in kwargs_list)
+    matched.discard(None)
+    matched.discard(_AMBIGUOUS)
+
+    sensors = _make_unique_index(
+        Sensor.objects.filter(netbox__in=matched).select_related('netbox'),
+        lambda sensor: (sensor.netbox_id,
+                        escape_metric_name(sensor.internal_name)))
+
+    result = []
+    for kwargs in kwargs_list:
+        netbox = _unique(netboxes.get(kwargs['sysname']))
+        key = (netbox.id, kwargs['name']) if netbox else None
+        result.append(_unique(sensors.get(key)))
+    return result
+
+
+@reverses_many(_reverse_uptime)
+def _reverse_uptimes(kwargs_list):
+    netboxes = _get_netbox_index()
+    return [_unique(netboxes.get(kwargs['sysname'])) or kwargs['sysname']
+            for kwargs in kwargs_list]
+
+
+@reverses_many(_reverse_device)
+def _reverse_devices(kwargs_list):
+    netboxes = _get_netbox_index()
+    return [_unique(netboxes.get(kwargs['sysname']))
+            for kwargs in kwargs_list]
+
+
+@reverses_many(_reverse_prefix)
+def _reverse_prefixes(kwargs_list):
+    prefixes = _make_unique_index(
+        Prefix.objects.all(),
+        lambda prefix: escape_metric_name(str(prefix.net_address)))
+    return [_unique(prefixes.get(kwargs['netaddr']))
+            for kwargs in kwargs_list]
+
+
 ### Helper functions
 
+def _get_netbox_index():
+    """Returns a dict mapping escaped sysnames to Netbox objects"""
+    return _make_unique_index(Netbox.objects.all(),
+                              lambda netbox: escape_metric_name(netbox.sysname))
+
+
+def _make_unique_index(objects, keyfunc):
+    """Indexes objects by keyfunc, mapping keys that are shared by multiple
+    objects to _AMBIGUOUS.
+
+    """
+    index = {}
+    for obj in objects:
+        key = keyfunc(obj)
+        index[key] = _AMBIGUOUS if key in index else obj
+    return index
+
+
+def _unique(obj):
+    return None if obj is _AMBIGUOUS else obj
+
+
 def _single_like_match(model, related=None, **kwargs):
     args = [("{field}::TEXT LIKE %s".format(field=key), value)
             for key, value in iteritems(kwargs)]
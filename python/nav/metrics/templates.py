@@ -30,6 +30,11 @@ def metric_prefix_for_ipdevpoll_job(sysname, job_name):
                        job_name=escape_metric_name(job_name))
 
 
+def metric_prefix_for_ipdevpoll_worker(hostname, slot):
+    tmpl = "nav.ipdevpoll.{hostname}.workers.{slot}"
+    return tmpl.format(hostname=escape_metric_name(hostname), slot=slot)
+
+
 def metric_path_for_bandwith(sysname, is_percent):
     tmpl = "{system}.bandwidth{percent}"
     return tmpl.format(system=metric_prefix_for_system(sysname),
@@ -59,9 +59,11 @@ This module should provide an API for evaluating threshold expressions.
 Alerting is outside of the scope of this module.
 
 """
+from collections import defaultdict
 from datetime import timedelta
 from functools import partial
 import logging
+from multiprocessing.pool import ThreadPool
 import re
 
 from django.utils.six import iteritems, iterkeys
@@ -72,7 +74,7 @@ from nav.metrics.graphs import get_metric_meta, extract_series_name
 
 # Pattern to extract the ID of a metric from a series name returned in a
 # Graphite render response.
-from nav.metrics.lookup import lookup
+from nav.metrics.lookup import lookup, lookup_many
 from nav.models.manage import Interface
 
 
@@ -87,6 +89,14 @@ YEAR = timedelta(days=365).total_seconds()
 
 MEGA = 1e6
 
+# Maximum number of targets to fetch in a single Graphite render request
+MAX_TARGETS_PER_REQUEST = 50
+# Maximum number of Graphite render requests to run concurrently
+MAX_CONCURRENT_REQUESTS = 4
+# Separates the target index tag from the series names returned from batched
+# render requests
+TAG_SEPARATOR = '|'
+
 _logger = logging.getLogger(__name__)
 
 
@@ -117,6 +127,7 @@ class ThresholdEvaluator(object):
         self.period = period
         self.raw = raw
         self.result = {}
+        self.subjects = {}
 
         if not raw:
             meta = get_metric_meta(target)
@@ -133,9 +144,25 @@ class ThresholdEvaluator(object):
         """
         Retrieves actual values from Graphite based on the evaluators target.
         """
-        start = "-{0}".format(interval_to_graphite(self.period))
         averages = get_metric_average(
-            self.target, start=start, end='now', ignore_unknown=True)
+            self.target, start=self.get_start(), end='now',
+            ignore_unknown=True)
+        return self.set_values(averages)
+
+    def get_start(self):
+        """Returns the Graphite start time specification of the period to
+        retrieve values for.
+        """
+        return "-{0}".format(interval_to_graphite(self.period))
+
+    def set_values(self, averages):
+        """
+        Sets the evaluator's values from an already retrieved Graphite
+        response.
+
+        :param averages: A dict of {series: average_value} items, as returned
+                         by get_metric_average().
+        """
         _logger.debug("retrieved %d values from graphite for %r, "
                       "period %s: %r",
                       len(averages), self.target, self.period, averages)
@@ -168,6 +195,8 @@ class ThresholdEvaluator(object):
             raise InvalidExpressionError(expression)
         value = float(match.group('value'))
         percent = bool(match.group('percent'))
+        if percent:
+            self.lookup_subjects()
         oper = match.group('operator')
         if oper == '<':
             matcher = partial(self._lt, value, percent)
@@ -189,20 +218,117 @@ class ThresholdEvaluator(object):
         if metric in self.result:
             current = self.result[metric]['value']
             if percent:
-                maximum = get_metric_maximum(metric)
+                maximum = get_metric_maximum(metric, self.subjects)
                 if not maximum:
                     return None  # cannot relatively match a maximum=0
                 self.result[metric]['max'] = maximum
                 current = (current / maximum) * 100.0
             return current
 
+    def lookup_subjects(self, metrics=None):
+        """
+        Looks up the NAV objects of metrics in bulk, caching them in the
+        subjects dict.
+
+        :param metrics: A list of metrics to look up. If omitted, all the
+                        retrieved metrics are looked up.
+        :returns: The subjects dict.
+        """
+        if metrics is None:
+            metrics = self.result
+        missing = [metric for metric in metrics
+                   if metric not in self.subjects]
+        if missing:
+            self.subjects.update(lookup_many(missing))
+        return self.subjects
+
+
+def get_values_in_bulk(evaluators, max_targets=MAX_TARGETS_PER_REQUEST,
+                       max_concurrent=MAX_CONCURRENT_REQUESTS):
+    """
+    Retrieves values from Graphite for multiple ThresholdEvaluators, using as
+    few render requests as possible.
+
+    Evaluators are grouped by period, and up to max_targets distinct targets
+    are fetched in each render request, using up to max_concurrent parallel
+    requests. Each target is wrapped in an aliasSub() call that tags the
+    returned series with the target's index in the request, so that
+    results can be distributed to the correct evaluators.
 
-def get_metric_maximum(metric):
+    :returns: A list of the evaluators whose values could not be retrieved.
+    """
+    batches = []
+    by_period = defaultdict(list)
+    for evaluator in evaluators:
+        by_period[evaluator.period].append(evaluator)
+
+    for period, group in iteritems(by_period):
+        by_target = defaultdict(list)
+        targets = []
+        for evaluator in group:
+            if evaluator.target not in by_target:
+                targets.append(evaluator.target)
+            by_target[evaluator.target].append(evaluator)
+        for index in range(0, len(targets), max_targets):
+            chunk = targets[index:index + max_targets]
+            batches.append([(target, by_target[target]) for target in chunk])
+
+    if not batches:
+        return []
+    pool = ThreadPool(min(max_concurrent, len(batches)))
+    try:
+        failures = pool.map(_get_batch_values, batches)
+    finally:
+        pool.close()
+        pool.join()
+    return [evaluator for failed in failures for evaluator in failed]
+
+
+# pylint: disable=W0703
+def _get_batch_values(batch):
+    """Retrieves values for a batch of (target, evaluators) tuples sharing the
+    same period, using a single render request.
+
+    :returns: A list of evaluators whose values could not be retrieved.
+    """
+    start = batch[0][1][0].get_start()
+    tagged_targets = ['aliasSub({target},"^","{index}{sep}")'.format(
+        target=target, index=index, sep=TAG_SEPARATOR)
+                      for index, (target, _evaluators) in enumerate(batch)]
+    try:
+        averages = get_metric_average(tagged_targets, start=start, end='now',
+                                      ignore_unknown=True)
+    except Exception as error:
+        _logger.warning("batched retrieval of %d targets failed: %s",
+                        len(batch), error)
+        return [evaluator for _target, group in batch for evaluator in group]
+
+    values = [{} for _ in batch]
+    for series, value in iteritems(averages):
+        index, _sep, series = series.partition(TAG_SEPARATOR)
+        try:
+            values[int(index)][series] = value
+        except (ValueError, IndexError):
+            _logger.debug("ignoring unexpected series: %r", series)
+
+    for (_target, group), target_values in zip(batch, values):
+        for evaluator in group:
+            evaluator.set_values(target_values)
+    return []
+
+
+def get_metric_maximum(metric, subjects=None):
     """
     Returns the maximum value of a metric, if one can be determined.
     Otherwise returns None.
+
+    :param subjects: An optional dict of pre-looked up metric objects, as
+                     returned by nav.metrics.lookup.lookup_many().
     """
-    obj = lookup(metric)
+    if subjects and metric in subjects:
+        obj = subjects[metric]
+    else:
+        obj = lookup(metric)
     if isinstance(obj, Interface):
         counter = metric.split('.')[-1]
         if 'octets' in counter.lower():
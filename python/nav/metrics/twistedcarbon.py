@@ -0,0 +1,248 @@
+#
+# Copyright (C) 2019 Uninett AS
+#
+# This file is part of Network Administration Visualized (NAV).
+#
+# NAV is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.  You should have received a copy of the GNU General Public License
+# along with NAV. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+A non-blocking metrics sink for Twisted based programs, such as ipdevpoll.
+
+Metrics handed to a ReactorSink are only queued. They are formatted and
+written to Carbon in bulk, in later iterations of the reactor loop, so that
+large batches of metrics never stall the reactor for long.
+
+Once installed using install_sink(), the sink also receives all metrics sent
+through nav.metrics.carbon.send_metrics() in the running process.
+
+"""
+from collections import deque
+import logging
+import socket
+
+from twisted.internet import reactor
+from twisted.internet.interfaces import IPushProducer
+from twisted.internet.protocol import (DatagramProtocol, Protocol,
+                                       ReconnectingClientFactory)
+from zope.interface import implementer
+
+from nav.metrics import carbon
+from nav.metrics import CONFIG
+
+_logger = logging.getLogger(__name__)
+
+# Maximum number of metrics to format and write in a single reactor iteration
+FLUSH_BATCH_SIZE = carbon.MAX_PICKLE_BATCH
+
+
+class CarbonUdpProtocol(DatagramProtocol):
+    """Writes line protocol packets to a Carbon UDP line receiver"""
+    def __init__(self, address, port):
+        self.address = address
+        self.port = port
+
+    def startProtocol(self):
+        self.transport.connect(self.address, self.port)
+
+    def connectionRefused(self):
+        _logger.debug("carbon at [%s]:%s refused UDP packet",
+                      self.address, self.port)
+
+    def write_metrics(self, metric_tuples):
+        """Writes metric tuples to Carbon in as few packets as possible"""
+        for packet in carbon.metrics_to_packets(metric_tuples):
+            self.transport.write(packet)
+
+
+class CarbonPickleProtocol(Protocol):
+    """Writes pickle protocol frames to a Carbon pickle receiver"""
+    def connectionMade(self):
+        self.factory.sink.connected(self)
+
+    def connectionLost(self, reason=None):
+        self.factory.sink.disconnected(self, reason)
+
+    def write_metrics(self, metric_tuples):
+        """Writes metric tuples to Carbon as a single pickle frame"""
+        self.transport.write(carbon.metrics_to_pickle_frame(metric_tuples))
+
+
+class CarbonPickleClientFactory(ReconnectingClientFactory):
+    """Keeps a CarbonPickleProtocol connected to Carbon for a ReactorSink"""
+    protocol = CarbonPickleProtocol
+    maxDelay = carbon.RECONNECT_INTERVAL * 6
+
+    def __init__(self, sink):
+        self.sink = sink
+
+    def buildProtocol(self, addr):
+        self.resetDelay()
+        return ReconnectingClientFactory.buildProtocol(self, addr)
+
+
+@implementer(IPushProducer)
+class ReactorSink(object):
+    """Queues metrics and writes them to Carbon asynchronously.
+
+    The sink writes to Carbon's UDP line receiver, or to Carbon's pickle
+    receiver over a persistent TCP connection. In the latter case, writing
+    pauses whenever the TCP send buffers are full, or while Carbon is
+    unreachable. Once the queue holds more than queue_size metrics, the
+    oldest metrics are dropped.
+
+    """
+    def __init__(self, host, port=2003, protocol='udp', queue_size=100000):
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.sent = 0
+        self.dropped = 0
+        self._queue = deque()
+        self._queue_size = queue_size
+        self._writer = None
+        self._factory = None
+        self._paused = False
+        self._flush_call = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates a sink as described by the carbon section of config"""
+        protocol = config.get("carbon", "protocol").strip().lower()
+        if protocol not in ('udp', 'pickle'):
+            _logger.error("unknown carbon protocol %r, using udp", protocol)
+            protocol = 'udp'
+        return cls(config.get("carbon", "host"),
+                   config.getint("carbon", "port"),
+                   protocol=protocol,
+                   queue_size=config.getint("carbon", "queue_size"))
+
+    @property
+    def queued(self):
+        """The number of metrics currently waiting to be written"""
+        return len(self._queue)
+
+    def install(self):
+        """Starts the sink and makes it the receiver of all metrics sent
+        through nav.metrics.carbon.send_metrics() in this process.
+
+        """
+        self.start()
+        carbon.set_sender(self)
+
+    def start(self):
+        """Starts listening for or connecting to Carbon"""
+        if self.protocol == 'pickle':
+            self._factory = CarbonPickleClientFactory(self)
+            reactor.connectTCP(self.host, self.port, self._factory,
+                               timeout=carbon.TCP_TIMEOUT)
+        else:
+            family, address = _resolve(self.host, self.port)
+            interface = '::' if family == socket.AF_INET6 else ''
+            self._writer = CarbonUdpProtocol(address, self.port)
+            reactor.listenUDP(0, self._writer, interface=interface)
+        reactor.addSystemEventTrigger("before", "shutdown", self.stop)
+
+    def stop(self):
+        """Writes out any remaining queued metrics and stops the sink"""
+        if self._flush_call and self._flush_call.active():
+            self._flush_call.cancel()
+        self._flush_call = None
+        while self._queue and self._writer and not self._paused:
+            self._write_batch()
+        if self._factory:
+            self._factory.stopTrying()
+
+    def send(self, metric_tuples):
+        """Queues a list of metric tuples for writing to Carbon.
+
+        :param metric_tuples: A list of metric tuples in the form
+                              [(path, (timestamp, value)), ...]
+
+        """
+        self.dropped += carbon.enqueue_metrics(self._queue, metric_tuples,
+                                               self._queue_size)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_call is None and self._writer and not self._paused:
+            self._flush_call = reactor.callLater(0, self._flush)
+
+    def _flush(self):
+        self._flush_call = None
+        if self._queue and self._writer and not self._paused:
+            self._write_batch()
+        if self._queue:
+            self._schedule_flush()
+
+    def _write_batch(self):
+        batch = [self._queue.popleft()
+                 for _ in range(min(FLUSH_BATCH_SIZE, len(self._queue)))]
+        try:
+            self._writer.write_metrics(batch)
+        except socket.error as error:
+            self.dropped += len(batch)
+            # pylint: disable=protected-access
+            carbon._handle_error(error, self.host, self.port)
+        else:
+            self.sent += len(batch)
+
+    # Pickle protocol connection callbacks
+
+    def connected(self, writer):
+        """Called when a connection to Carbon has been established"""
+        _logger.debug("connected to carbon pickle receiver at [%s]:%s",
+                      self.host, self.port)
+        self._writer = writer
+        self._paused = False
+        writer.transport.registerProducer(self, True)
+        self._schedule_flush()
+
+    def disconnected(self, writer, reason=None):
+        """Called when the connection to Carbon has been lost"""
+        if writer is self._writer:
+            _logger.warning("lost connection to carbon at [%s]:%s: %s",
+                            self.host, self.port,
+                            reason.getErrorMessage() if reason else "")
+            self._writer = None
+
+    # IPushProducer implementation
+
+    def pauseProducing(self):
+        """Pauses writing while the transport's send buffer is full"""
+        self._paused = True
+
+    def resumeProducing(self):
+        """Resumes writing once the transport's send buffer has drained"""
+        self._paused = False
+        self._schedule_flush()
+
+    def stopProducing(self):
+        """Stops writing to a closed transport"""
+        self._paused = False
+        self._writer = None
+
+
+def _resolve(host, port):
+    family, _, _, _, sockaddr = socket.getaddrinfo(host, port, 0,
+                                                   socket.SOCK_DGRAM)[0]
+    return family, sockaddr[0]
+
+
+def install_sink(config=CONFIG):
+    """Creates, starts and installs a ReactorSink for the pre-configured
+    carbon backend.
+
+    :returns: The installed ReactorSink.
+
+    """
+    sink = ReactorSink.from_config(config)
+    sink.install()
+    return sink
@@ -2,10 +2,11 @@ from twisted.internet import defer
 from nav.mibs import reduce_index
 from nav.mibs.mibretriever import MibRetriever
 from nav.models.manage import Sensor
+from nav.smidumps import get_mib
 
 
 class CD6CMib(MibRetriever):
-    from nav.smidumps.cd6c_mib import MIB as mib
+    mib = get_mib('cd6c_mib')
     sensors = {
         'uptime': 'cduStatusUpTime',  # Number of minutes since CDU power-up
         'temp': [
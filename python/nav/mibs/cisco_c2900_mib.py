@@ -14,10 +14,11 @@
 # along with NAV. If not, see <http://www.gnu.org/licenses/>.
 #
 from nav.mibs import esswitch_mib
+from nav.smidumps import get_mib
 
 
 class CiscoC2900Mib(esswitch_mib.ESSwitchMib):
-    from nav.smidumps.cisco_c2900_mib import MIB as mib
+    mib = get_mib('cisco_c2900_mib')
 
     BANDWIDTH_USAGE_CURRENT = 'c2900BandwidthUsageCurrent'
     BANDWIDTH_USAGE_CURRENT_PEAK_ENTRY = 'c2900BandwidthUsageCurrentPeakEntry'
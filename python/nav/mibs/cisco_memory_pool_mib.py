@@ -15,6 +15,7 @@
 #
 from twisted.internet import defer
 from nav.mibs import mibretriever
+from nav.smidumps import get_mib
 
 NAME = 'ciscoMemoryPoolName'
 FREE = 'ciscoMemoryPoolFree'
@@ -23,7 +24,7 @@ VALID = 'ciscoMemoryPoolValid'
 
 
 class CiscoMemoryPoolMib(mibretriever.MibRetriever):
-    from nav.smidumps.cisco_memory_pool_mib import MIB as mib
+    mib = get_mib('cisco_memory_pool_mib')
 
     @defer.inlineCallbacks
     def get_memory_usage(self):
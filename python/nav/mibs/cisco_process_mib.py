@@ -18,6 +18,7 @@ from twisted.internet import defer
 from nav.mibs import mibretriever, reduce_index
 from nav.mibs.entity_mib import EntityMib
 from nav.oids import OID
+from nav.smidumps import get_mib
 
 PHYSICAL_INDEX = 'cpmCPUTotalPhysicalIndex'
 TOTAL_5_MIN_REV = 'cpmCPUTotal5minRev'
@@ -25,7 +26,7 @@ TOTAL_1_MIN_REV = 'cpmCPUTotal1minRev'
 
 
 class CiscoProcessMib(mibretriever.MibRetriever):
-    from nav.smidumps.cisco_process_mib import MIB as mib
+    mib = get_mib('cisco_process_mib')
 
     @defer.inlineCallbacks
     def get_cpu_loadavg(self):
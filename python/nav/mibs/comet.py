@@ -27,6 +27,7 @@ from twisted.internet.defer import returnValue
 from nav.Snmp import safestring
 from nav.mibs.mibretriever import MibRetriever
 from nav.models.manage import Sensor
+from nav.smidumps import get_mib
 
 DEGREES_CELSIUS = "\xb0C"
 DEGREES_FAHRENHEIT = "\xb0F"
@@ -38,7 +39,7 @@ UNIT_MAP = {
 
 class Comet(MibRetriever):
     """MibRetriever for Comet Web Sensors"""
-    from nav.smidumps.p8652_mib import MIB as mib
+    mib = get_mib('p8652_mib')
 
     @defer.inlineCallbacks
     def get_all_sensors(self):
@@ -125,7 +126,7 @@ class Comet(MibRetriever):
 
 class CometMS(MibRetriever):
     """MibRetriever for Comet Web Sensors"""
-    from nav.smidumps.cometms_mib import MIB as mib
+    mib = get_mib('cometms_mib')
 
     @defer.inlineCallbacks
     def get_all_sensors(self):
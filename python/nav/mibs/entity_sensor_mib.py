@@ -21,6 +21,7 @@ from nav.mibs import reduce_index
 from nav.mibs.entity_mib import EntityMib
 from nav.mibs import mibretriever
 from nav.models.manage import Sensor
+from nav.smidumps import get_mib
 
 UNITS_OF_MEASUREMENTS = {
     1: Sensor.UNIT_OTHER,
@@ -61,7 +62,7 @@ DATA_SCALE = {
 
 
 class EntitySensorMib(mibretriever.MibRetriever):
-    from nav.smidumps.entity_sensor_mib import MIB as mib
+    mib = get_mib('entity_sensor_mib')
     TYPE_COLUMN = 'entPhySensorType'
     SCALE_COLUMN = 'entPhySensorScale'
     PRECISION_COLUMN = 'entPhySensorPrecision'
@@ -19,10 +19,11 @@ Grand Junction Networks)
 """
 from twisted.internet import defer
 from nav.mibs import mibretriever
+from nav.smidumps import get_mib
 
 
 class ESSwitchMib(mibretriever.MibRetriever):
-    from nav.smidumps.esswitch_mib import MIB as mib
+    mib = get_mib('esswitch_mib')
 
     BANDWIDTH_USAGE_CURRENT = 'bandwidthUsageCurrent'
     BANDWIDTH_USAGE_CURRENT_PEAK_ENTRY = 'bandwidthUsageCurrentPeakEntry'
@@ -18,11 +18,12 @@ from __future__ import absolute_import
 from . import mibretriever
 from nav.mibs.qbridge_mib import portlist
 from nav.mibs import reduce_index
+from nav.smidumps import get_mib
 
 
 class ExtremeVlanMib(mibretriever.MibRetriever):
     """Gets data from the EXTREME-VLAN-MIB"""
-    from nav.smidumps.extreme_vlan_mib import MIB as mib
+    mib = get_mib('extreme_vlan_mib')
 
     def get_vlan_ports(self):
         """Retrieves the VLAN port configurations.
@@ -15,11 +15,12 @@
 #
 from twisted.internet import defer
 from nav.mibs.mibretriever import MibRetriever
+from nav.smidumps import get_mib
 
 
 class HPHTTPManageableMib(MibRetriever):
     """HP-httpManageable-MIB (SEMI-MIB) MibRetriever"""
-    from nav.smidumps.hp_httpmanageable_mib import MIB as mib
+    mib = get_mib('hp_httpmanageable_mib')
 
     @defer.inlineCallbacks
     def get_serial_number(self):
@@ -20,11 +20,12 @@ from twisted.internet import defer
 
 from nav.mibs import reduce_index
 from nav.mibs import mibretriever
+from nav.smidumps import get_mib
 
 
 class HpIcfFanMib(mibretriever.MibRetriever):
     """ A class for collecting fan states from HP netboxes."""
-    from nav.smidumps.hpicf_fan_mib import MIB as mib
+    mib = get_mib('hpicf_fan_mib')
 
     def __init__(self, agent_proxy):
         """Just a constructor..."""
@@ -29,6 +29,7 @@ from nav.mibs import reduce_index
 from nav.mibs import mibretriever
 from nav.models.manage import Sensor
 from nav.oids import OID
+from nav.smidumps import get_mib
 
 
 def for_table(table_name):
@@ -48,7 +49,7 @@ def for_table(table_name):
 
 class ItWatchDogsMib(mibretriever.MibRetriever):
     """A class that tries to retrieve all sensors from WeatherGoose I"""
-    from nav.smidumps.itw_mib import MIB as mib
+    mib = get_mib('itw_mib')
 
     oid_name_map = dict((OID(attrs['oid']), name)
                         for name, attrs in mib['nodes'].items())
@@ -27,13 +27,14 @@ from nav.mibs import reduce_index
 from nav.mibs import mibretriever
 from nav.models.manage import Sensor
 from nav.oids import OID
+from nav.smidumps import get_mib
 
 from .itw_mib import for_table
 
 
 class ItWatchDogsMibV3(mibretriever.MibRetriever):
     """A class that tries to retrieve all sensors from WeatherGoose II"""
-    from nav.smidumps.itw_mibv3 import MIB as mib
+    mib = get_mib('itw_mibv3')
 
     oid_name_map = dict((OID(attrs['oid']), name)
                         for name, attrs in mib['nodes'].items())
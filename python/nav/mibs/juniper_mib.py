@@ -16,6 +16,7 @@
 """JUNIPER-MIB MibRetriever"""
 from twisted.internet import defer
 from nav.mibs.mibretriever import MibRetriever
+from nav.smidumps import get_mib
 
 OPERATING_DESCR = 'jnxOperatingDescr'
 OPERATING_CPU = 'jnxOperatingCPU'
@@ -26,7 +27,7 @@ LOAD_AVG_15MIN = 'jnxOperating1MinLoadAvg'
 
 class JuniperMib(MibRetriever):
     """JUNIPER-MIB MibRetriever"""
-    from nav.smidumps.juniper_mib import MIB as mib
+    mib = get_mib('juniper_mib')
 
     @defer.inlineCallbacks
     def get_serial_number(self):
@@ -21,7 +21,8 @@ definitions and dump them as Python data structures.
 
 To create a new MIB-aware retriever class, inherit from the
 MibRetriever class and set the class-variable "mib" to point to a MIB
-data structure as dumped by libsmi's smidump command.
+data structure as dumped by libsmi's smidump command, usually as loaded by
+nav.smidumps.get_mib().
 
 The class will be imbued with knowledge of the MIB in question, and
 several convenience methods to work with data retrieval.  An instance
@@ -42,7 +43,7 @@ from nav.Snmp import safestring
 from nav.ipdevpoll import ContextLogger
 from nav.ipdevpoll.utils import fire_eventually
 from nav.errors import GeneralException
-from nav.oids import OID
+from nav.oids import OID, SuffixParser
 
 _logger = logging.getLogger(__name__)
 TEXT_TYPES = ("DisplayString", "SnmpAdminString")
@@ -258,8 +259,30 @@ class MibRetrieverMaker(type):
             # This may be the MibRetriever base class or a MixIn of some sort
             return
 
+        # The MIB is only processed once the class is first used, so that
+        # MIBs that are never used need not even be loaded
+        cls._is_prepared = False
+        for attr in ('nodes', 'tables', 'text_columns'):
+            setattr(cls, attr, PreparedAttribute(attr))
+
+        MibRetrieverMaker.modules[mib['moduleName']] = cls
+
+    def __call__(cls, *args, **kwargs):
+        cls.prepare()
+        return super(MibRetrieverMaker, cls).__call__(*args, **kwargs)
+
+    def prepare(cls):
+        """Imbues a new retriever class with knowledge of its MIB.
+
+        This is done automatically the first time the class is instantiated,
+        or one of its MIB-derived attributes is accessed.
+
+        """
+        if cls.__dict__.get('_is_prepared', True):
+            return
+
         # modify mib data to slightly optimize later OID manipulation
-        convert_oids(mib)
+        convert_oids(cls.mib)
 
         MibRetrieverMaker.__make_node_objects(cls)
         cls.tables = dict((t.table.name, t)
@@ -268,8 +291,7 @@ class MibRetrieverMaker(type):
         MibRetrieverMaker.__make_scalar_getters(cls)
         MibRetrieverMaker.__make_table_getters(cls)
         MibRetrieverMaker.__prepopulate_text_columns(cls)
-
-        MibRetrieverMaker.modules[mib['moduleName']] = cls
+        cls._is_prepared = True
 
     # following is a collection of helper methods to modify the
     # MIB-aware retriever class that is being created.
@@ -351,6 +373,19 @@ class MibRetrieverMaker(type):
         cls.text_columns = nodes
 
 
+class PreparedAttribute(object):
+    """Descriptor for MIB-derived attributes of a MibRetriever class, that
+    prepares the class on first access.
+
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        owner.prepare()
+        return owner.__dict__[self.name]
+
+
 @six.add_metaclass(MibRetrieverMaker)
 class MibRetriever(object):
     """Base class for functioning MIB retriever classes."""
@@ -394,7 +429,6 @@ class MibRetriever(object):
             self._logger.debug("%s is not a table column", column_name)
 
         def _result_formatter(result):
-            formatted_result = {}
             # result keys may be OID objects/tuples or strings, depending on
             # snmp library used
             if node.oid not in result and str(node.oid) not in result:
@@ -403,15 +437,7 @@ class MibRetriever(object):
                                    column_name, node.oid, result.keys())
                 return {}
             varlist = result.get(node.oid, result.get(str(node.oid), None))
-
-            for oid, value in varlist.items():
-                # Extract index information from oid
-                row_index = OID(oid).strip_prefix(node.oid)
-                if column_name in self.text_columns:
-                    value = safestring(value)
-                formatted_result[row_index] = value
-
-            return formatted_result
+            return self._format_column(column_name, varlist)
 
         def _valueerror_handler(failure):
             failure.trap(ValueError)
@@ -425,12 +451,36 @@ class MibRetriever(object):
         deferred.addCallbacks(_result_formatter, _valueerror_handler)
         return deferred
 
+    def _format_column(self, column_name, varlist):
+        """Formats the raw varlist of a column as a dict of
+        { row_index: column_value }.
+
+        """
+        parser = SuffixParser(self.nodes[column_name].oid)
+        is_text = column_name in self.text_columns
+        formatted_result = {}
+        for oid, value in varlist.items():
+            # Extract index information from oid
+            row_index = parser.parse(oid)
+            if row_index is None:
+                row_index = OID(oid)
+            if is_text:
+                value = safestring(value)
+            formatted_result[row_index] = value
+
+        return formatted_result
+
     def retrieve_columns(self, column_names):
         """Retrieve a set of table columns.
 
         The table columns may come from different tables, as long as
         the table rows are indexed the same way.
 
+        Depending on the SNMP parameters of the agent proxy, columns are
+        either walked one at a time, several at a time in parallel
+        (max_concurrent_columns), or all together in a single stream of
+        interleaved GET-BULK requests (interleaved_columns).
+
         Returns a deferred whose result is a dictionary:
 
           { row_index: MibTableResultRow instance }
@@ -438,10 +488,9 @@ class MibRetriever(object):
         """
         def _sortkey(col):
             return self.nodes[col].oid
-        columns = iter(sorted(column_names, key=_sortkey))
+        column_names = sorted(column_names, key=_sortkey)
 
         final_result = {}
-        my_deferred = defer.Deferred()
 
         def _result_aggregate(result, column):
             for row_index, value in result.items():
@@ -451,21 +500,106 @@ class MibRetriever(object):
                 final_result[row_index][column] = value
             return True
 
+        def _aggregate_all(results):
+            for column, result in results.items():
+                _result_aggregate(result, column)
+            return final_result
+
+        interleaved = self._get_snmp_parameter('interleaved_columns', False)
+        if interleaved and self._can_getbulk():
+            deferred = self._retrieve_columns_interleaved(column_names)
+            deferred.addCallback(_aggregate_all)
+            return deferred
+
+        columns = iter(column_names)
+        my_deferred = defer.Deferred()
+        concurrency = self._get_snmp_parameter('max_concurrent_columns', 1)
+        concurrency = max(1, min(concurrency, len(column_names)))
+        active = [concurrency]
+
         # schedule the next iteration (i.e. collect next column)
         def _schedule_next(_result=None):
+            if my_deferred.called:
+                return
             try:
                 column = next(columns)
             except StopIteration:
-                my_deferred.callback(final_result)
+                active[0] -= 1
+                if not active[0]:
+                    my_deferred.callback(final_result)
                 return
             deferred = self.retrieve_column(column)
             deferred.addCallback(_result_aggregate, column)
-            deferred.addCallback(_schedule_next)
-            deferred.addErrback(my_deferred.errback)
+            deferred.addCallbacks(_schedule_next, _fail)
+
+        def _fail(failure):
+            if not my_deferred.called:
+                my_deferred.errback(failure)
 
-        reactor.callLater(0, _schedule_next)
+        for _ in range(concurrency):
+            reactor.callLater(0, _schedule_next)
         return my_deferred
 
+    def _get_snmp_parameter(self, name, default):
+        """Returns the named SNMP parameter of the agent proxy, if it has one,
+        otherwise default.
+
+        """
+        params = getattr(self.agent_proxy, 'snmp_parameters', None)
+        return getattr(params, name, default)
+
+    def _can_getbulk(self):
+        """Returns True if the agent proxy can issue GET-BULK requests"""
+        version = str(getattr(self.agent_proxy, 'snmpVersion', '1'))
+        return '1' not in version and hasattr(self.agent_proxy, '_getbulk')
+
+    @defer.inlineCallbacks
+    def _retrieve_columns_interleaved(self, column_names):
+        """Retrieves multiple columns in a single stream of GET-BULK requests,
+        each of which retrieves the next batch of rows from every column that
+        isn't exhausted yet.
+
+        Returns a deferred whose result is a dictionary:
+
+          { column_name: { row_index: column_value } }
+
+        """
+        oids = dict((column, self.nodes[column].oid)
+                    for column in column_names)
+        varlists = dict((column, {}) for column in column_names)
+        last_oids = dict(oids)
+        max_repetitions = self._get_snmp_parameter('max_repetitions', 50)
+
+        pending = list(column_names)
+        while pending:
+            repetitions = max(1, max_repetitions // len(pending))
+            response = yield self.agent_proxy._getbulk(
+                0, repetitions, [last_oids[column] for column in pending])
+
+            finished = set()
+            # Response varbinds come in repetitions of one varbind per
+            # requested column, in the same order as requested
+            for position, (oid, value) in enumerate(response or []):
+                column = pending[position % len(pending)]
+                if column in finished:
+                    continue
+                oid = OID(oid)
+                if not oids[column].is_a_prefix_of(oid) or \
+                        oid <= last_oids[column]:
+                    finished.add(column)
+                    continue
+                varlists[column][oid] = value
+                last_oids[column] = oid
+
+            if not response:
+                break
+            pending = [column for column in pending
+                       if column not in finished]
+
+        returnValue(dict(
+            (column, self._format_column(column, varlists[column]))
+            for column in column_names))
+
     def retrieve_table(self, table_name):
         """Table retriever and formatter.
 
@@ -480,19 +614,20 @@ class MibRetriever(object):
 
         """
         table = self.tables[table_name]
+        parser = SuffixParser(table.row.oid)
 
         def _result_formatter(result):
             formatted_result = {}
             for varlist in result.values():
                 # Build a table structure
                 for oid in sorted(varlist.keys()):
-                    if not table.table.oid.is_a_prefix_of(oid):
+                    # Extract table position of value
+                    oid_suffix = parser.parse(oid)
+                    if oid_suffix is None:
                         raise MibRetrieverError(
                             "Received wrong response from client,"
                             "%s is not in %s" % (oid, table.table.oid))
 
-                    # Extract table position of value
-                    oid_suffix = OID(oid).strip_prefix(table.row.oid)
                     column_no = oid_suffix[0]
                     row_index = oid_suffix[1:]
                     if column_no not in table.reverse_column_index:
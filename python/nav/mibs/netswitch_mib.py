@@ -15,6 +15,7 @@
 #
 from twisted.internet import defer
 from nav.mibs import mibretriever
+from nav.smidumps import get_mib
 
 LOCAL_SLOT = 'hpLocalMemSlotIndex'
 LOCAL_FREE = 'hpLocalMemFreeBytes'
@@ -31,7 +32,7 @@ MEMORY_OIDS = {
 
 
 class NetswitchMib(mibretriever.MibRetriever):
-    from nav.smidumps.netswitch_mib import MIB as mib
+    mib = get_mib('netswitch_mib')
 
     @defer.inlineCallbacks
     def get_memory_usage(self):
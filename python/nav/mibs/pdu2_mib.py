@@ -20,6 +20,7 @@ from twisted.internet import defer
 from twisted.internet.defer import returnValue
 from nav.mibs.mibretriever import MibRetriever
 from nav.models.manage import Sensor
+from nav.smidumps import get_mib
 
 UNIT_MAP = {
     'none': Sensor.UNIT_UNKNOWN,
@@ -63,7 +64,7 @@ SENSOR_COLUMNS = [
 
 class PDU2Mib(MibRetriever):
     """MibRetriever for Raritan PDU2"""
-    from nav.smidumps.pdu2_mib import MIB as mib
+    mib = get_mib('pdu2_mib')
 
     @defer.inlineCallbacks
     def get_all_sensors(self):
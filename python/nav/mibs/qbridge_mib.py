@@ -20,10 +20,11 @@ from twisted.internet import defer
 
 import nav.bitvector
 from nav.mibs import mibretriever, reduce_index
+from nav.smidumps import get_mib
 
 
 class QBridgeMib(mibretriever.MibRetriever):
-    from nav.smidumps.qbridge_mib import MIB as mib
+    mib = get_mib('qbridge_mib')
 
     juniper_hack = False
 
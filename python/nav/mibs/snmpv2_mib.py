@@ -21,12 +21,13 @@ from twisted.internet import defer
 
 from nav.Snmp import safestring
 from nav.oids import OID
+from nav.smidumps import get_mib
 from . import mibretriever
 
 
 class Snmpv2Mib(mibretriever.MibRetriever):
     """A MibRetriever for SNMPv2-MIB"""
-    from nav.smidumps.snmpv2_mib import MIB as mib
+    mib = get_mib('snmpv2_mib')
 
     @defer.inlineCallbacks
     def _get_sysvariable(self, var):
@@ -29,6 +29,7 @@ from twisted.internet import defer
 from nav.mibs import reduce_index
 from nav.mibs.mibretriever import MibRetriever
 from nav.models.manage import Sensor
+from nav.smidumps import get_mib
 
 
 SENSOR_TABLES = {
@@ -78,7 +79,7 @@ SENSOR_TABLES = {
 
 class SPAgentMib(MibRetriever):
     """SPAGENT-MIB MibRetriever"""
-    from nav.smidumps.spagent_mib import MIB as mib
+    mib = get_mib('spagent_mib')
 
     @defer.inlineCallbacks
     def get_all_sensors(self):
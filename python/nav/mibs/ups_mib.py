@@ -20,11 +20,12 @@ from twisted.internet import defer
 from nav.mibs import reduce_index
 from nav.mibs import mibretriever
 from nav.models.manage import Sensor
+from nav.smidumps import get_mib
 
 
 class UpsMib(mibretriever.MibRetriever):
     """ A class for retrieveing sensors from RFC1628-compatible UPSes."""
-    from nav.smidumps.ups_mib import MIB as mib
+    mib = get_mib('ups_mib')
 
     sensor_columns = {
         # battery group
@@ -28,10 +28,12 @@ import json
 
 from django.utils import six
 from django.views.decorators.debug import sensitive_variables
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.core.urlresolvers import reverse
 from django.db import models, transaction
 from django.utils.encoding import python_2_unicode_compatible
 from django.forms.models import model_to_dict
+from IPy import IP
 
 from nav.adapters import HStoreField
 import nav.buildconf
@@ -45,7 +47,7 @@ from nav.models.manage import Arp, Cam, Category, Device, Location
 from nav.models.manage import Memory, Netbox, NetboxInfo, NetboxType
 from nav.models.manage import Organization, Prefix, Room, NetboxGroup
 from nav.models.manage import Interface, Usage, Vlan, Vendor
-from nav.models.fields import VarcharField, DictAsJsonField
+from nav.models.fields import VarcharField, DictAsJsonField, PointField
 
 
 # This should be the authorative source as to which models alertengine
@@ -790,6 +792,187 @@ class Expression(models.Model):
         """Returns the Django query operator represented by this expression."""
         return Operator(type=self.operator).get_operator_mapping()
 
+    def compile(self):
+        """Compiles this expression into a Python predicate.
+
+        :returns: A (lookup, predicate, values) tuple, where lookup is the
+                  alert attribute this expression matches on, as accepted by
+                  AlertQueue.objects.values(), and predicate is a function
+                  that takes the value of this attribute and returns True if
+                  it matches this expression. NOT_EQUAL expressions that are
+                  handled as exclusions compile to an equality predicate.
+
+                  If the predicate only matches a set of distinct attribute
+                  values, values is that set, otherwise it is None.
+
+                  If the expression cannot be evaluated in Python, None is
+                  returned.
+        """
+        match_field = self.match_field
+        if (match_field.data_type != MatchField.IP
+                and match_field.name == 'Location'):
+            locations = Location.objects.filter(pk__in=self.value.split('|'))
+            location_ids = set(
+                location.pk for location in itertools.chain(
+                    *[l.get_descendants(include_self=True)
+                      for l in locations]))
+            return (MatchField.FOREIGN_MAP[MatchField.LOCATION],
+                    lambda value: value in location_ids, location_ids)
+
+        lookup = match_field.get_lookup_mapping()
+        if not lookup or not _is_single_valued_lookup(lookup):
+            return None
+
+        values = None
+        if match_field.data_type == MatchField.IP:
+            predicate = _compile_ip_operator(self.operator, self.value)
+        else:
+            model, attname = MatchField.MODEL_MAP[match_field.value_id]
+            field = model._meta.get_field(attname)
+            predicate = _compile_operator(self.operator, self.value, field)
+            if predicate and self.operator in (Operator.EQUALS, Operator.IN):
+                if field.is_relation:
+                    field = field.target_field
+                values = set(
+                    field.to_python(value)
+                    for value in (self.value.split('|')
+                                  if self.operator == Operator.IN
+                                  else [self.value]))
+        if predicate:
+            return lookup, predicate, values
+
+
+def _is_single_valued_lookup(lookup):
+    """Returns True if lookup refers to a single value for any alert, i.e. if
+    it only follows forward foreign keys from AlertQueue.
+
+    """
+    model = AlertQueue
+    parts = lookup.split('__')
+    try:
+        for part in parts[:-1]:
+            field = model._meta.get_field(part)
+            if not (field.many_to_one or field.one_to_one):
+                return False
+            model = field.related_model
+        field = model._meta.get_field(parts[-1])
+    except FieldDoesNotExist:
+        return False
+    return not (field.one_to_many or field.many_to_many)
+
+
+_NUMERIC_FIELDS = (models.AutoField, models.IntegerField, models.FloatField,
+                   models.DecimalField)
+_TEXT_FIELDS = (models.CharField, models.TextField)
+_NON_TEXT_FIELDS = (PointField, DictAsJsonField)
+
+
+def _compile_operator(operator, value, field):
+    """Compiles a predicate for a plain ORM field lookup"""
+    if field.is_relation:
+        field = field.target_field
+
+    if isinstance(field, _NUMERIC_FIELDS):
+        try:
+            values = [field.to_python(v) for v in value.split('|')]
+        except ValidationError:
+            return None
+        return _compile_comparison(operator, values)
+
+    elif (isinstance(field, _TEXT_FIELDS)
+          and not isinstance(field, _NON_TEXT_FIELDS)):
+        if operator in (Operator.STARTSWITH, Operator.ENDSWITH,
+                        Operator.CONTAINS):
+            return _compile_text_search(operator, value.lower())
+        elif operator == Operator.REGEXP:
+            return _compile_regexp(value, re.IGNORECASE)
+        elif operator == Operator.WILDCARD:
+            return _compile_regexp(_like_pattern_to_regexp(value),
+                                   re.IGNORECASE | re.DOTALL)
+        elif operator == Operator.IN:
+            return _compile_comparison(operator, value.split('|'))
+        elif operator in (Operator.EQUALS, Operator.NOT_EQUAL):
+            return _compile_comparison(operator, [value])
+        # Ordering of strings is left to the database collation
+
+
+def _compile_comparison(operator, values):
+    value = values[0]
+    if operator == Operator.IN:
+        values = set(values)
+        return lambda x: x in values
+    elif operator in (Operator.EQUALS, Operator.NOT_EQUAL):
+        # exclusions are compiled to their positive counterparts
+        return lambda x: x == value
+    elif operator == Operator.GREATER:
+        return lambda x: x is not None and x > value
+    elif operator == Operator.GREATER_EQ:
+        return lambda x: x is not None and x >= value
+    elif operator == Operator.LESS:
+        return lambda x: x is not None and x < value
+    elif operator == Operator.LESS_EQ:
+        return lambda x: x is not None and x <= value
+
+
+def _compile_text_search(operator, value):
+    if operator == Operator.STARTSWITH:
+        return lambda x: x is not None and x.lower().startswith(value)
+    elif operator == Operator.ENDSWITH:
+        return lambda x: x is not None and x.lower().endswith(value)
+    else:
+        return lambda x: x is not None and value in x.lower()
+
+
+def _compile_regexp(pattern, flags):
+    try:
+        regexp = re.compile(pattern, flags | re.UNICODE)
+    except re.error:
+        return None
+    return lambda x: x is not None and regexp.search(x) is not None
+
+
+def _like_pattern_to_regexp(pattern):
+    """Translates an SQL LIKE pattern to an anchored regular expression"""
+    regexp = []
+    chars = iter(pattern)
+    for char in chars:
+        if char == '\\':
+            regexp.append(re.escape(next(chars, '\\')))
+        elif char == '%':
+            regexp.append('.*')
+        elif char == '_':
+            regexp.append('.')
+        else:
+            regexp.append(re.escape(char))
+    return '^%s$' % ''.join(regexp)
+
+
+def _compile_ip_operator(operator, value):
+    """Compiles a predicate for one of the special cased IP operators"""
+    if operator not in (Operator.EQUALS, Operator.NOT_EQUAL,
+                        Operator.CONTAINS, Operator.IN):
+        return None
+    try:
+        values = [IP(v) for v in value.split('|')]
+    except ValueError:
+        return None
+
+    if operator == Operator.EQUALS:
+        return lambda x: x is not None and IP(x) == values[0]
+    elif operator == Operator.NOT_EQUAL:
+        return lambda x: x is not None and IP(x) != values[0]
+    elif operator == Operator.CONTAINS:
+        return lambda x: x is not None and any(
+            _ip_contains(IP(x), v) for v in values)
+    else:
+        return lambda x: x is not None and any(
+            _ip_contains(v, IP(x)) for v in values)
+
+
+def _ip_contains(network, address):
+    return (network.version() == address.version()
+            and address in network)
+
 
 @python_2_unicode_compatible
 class Filter(models.Model):
@@ -807,7 +990,7 @@ class Filter(models.Model):
     def __str__(self):
         return self.name
 
-    def verify(self, alert):
+    def verify(self, alert, expressions=None):
         """Combines expressions to an ORM query that will tell us if an alert
         matched.
 
@@ -818,6 +1001,8 @@ class Filter(models.Model):
         Running alertengine in debug mode will print the dicts to the logs.
 
         :type alert: nav.models.event.AlertQueue
+        :param expressions: The expressions to verify the alert against.
+                            Defaults to all of this filter's expressions.
         """
         logger = logging.getLogger('nav.alertengine.filter.check')
 
@@ -825,7 +1010,10 @@ class Filter(models.Model):
         exclude = {}
         extra = {'where': [], 'params': []}
 
-        for expression in self.expression_set.all():
+        if expressions is None:
+            expressions = self.expression_set.all()
+
+        for expression in expressions:
             # Handle IP datatypes:
             if expression.match_field.data_type == MatchField.IP:
                 # Trick the ORM into joining the tables we want
@@ -911,6 +1099,109 @@ class Filter(models.Model):
         logger.debug('alert %d: did not match filter %d', alert.id, self.id)
         return False
 
+    def compile(self, expressions=None):
+        """Compiles this filter for evaluation in Python.
+
+        :param expressions: This filter's expressions, if already fetched
+                            from the database.
+        :returns: A CompiledFilter instance.
+        """
+        if expressions is None:
+            expressions = self.expression_set.select_related('match_field')
+        return CompiledFilter(self, expressions)
+
+
+class CompiledFilter(object):
+    """A Filter compiled into a list of Python predicates that are
+    evaluated against a dict of alert attributes, as returned by
+    AlertQueue.objects.values(*compiled_filter.lookups).
+
+    Expressions that cannot be evaluated in Python, typically those that
+    match on attributes of which an alert may have multiple values (such as
+    modules or prefixes), are still verified using an SQL query, but only if
+    all the compiled predicates matched.
+
+    """
+    def __init__(self, filtr, expressions):
+        self.filter = filtr
+        self.lookups = set()
+        self.predicates = []
+        self.remaining = []
+        # maps lookups to the only attribute values this filter can match
+        self.equalities = {}
+        self._compile(expressions)
+
+    def _compile(self, expressions):
+        # The query built by Filter.verify() puts plain lookups in dicts,
+        # where later expressions replace earlier ones using the same lookup,
+        # and all NOT_EQUAL expressions make up a single exclusion.
+        lookups = {}
+        exclusions = {}
+        extras = []
+        for expression in expressions:
+            match_field = expression.match_field
+            if match_field.data_type == MatchField.IP:
+                extras.append(expression)
+            elif match_field.name == 'Location':
+                lookups[MatchField.LOCATION] = expression
+            elif expression.operator == Operator.WILDCARD:
+                extras.append(expression)
+            else:
+                lookup = (match_field.get_lookup_mapping(),
+                          expression.get_operator_mapping())
+                if expression.operator == Operator.NOT_EQUAL:
+                    exclusions[lookup] = expression
+                else:
+                    lookups[lookup] = expression
+
+        for expression in itertools.chain(lookups.values(), extras):
+            compiled = expression.compile()
+            if compiled:
+                self._add_predicate([compiled])
+                lookup, _predicate, values = compiled
+                if values is not None:
+                    self.equalities[lookup] = values
+            else:
+                self.remaining.append(expression)
+
+        compiled = [expression.compile() for expression in exclusions.values()]
+        if not all(compiled):
+            self.remaining.extend(exclusions.values())
+        elif compiled:
+            self._add_predicate(compiled, exclude=True)
+
+    def _add_predicate(self, compiled, exclude=False):
+        def _predicate(attributes):
+            matches = all(predicate(attributes[lookup])
+                          for lookup, predicate, _values in compiled)
+            return matches != exclude
+
+        self.lookups.update(lookup for lookup, _predicate, _values in compiled)
+        self.predicates.append(_predicate)
+
+    def verify(self, alert, attributes):
+        """Verifies whether alert matches this filter.
+
+        :type alert: nav.models.event.AlertQueue
+        :param attributes: A dict of the alert's attribute values, containing
+                           at least the lookups of this filter.
+        """
+        logger = logging.getLogger('nav.alertengine.filter.check')
+        try:
+            matches = all(predicate(attributes)
+                          for predicate in self.predicates)
+        except ValueError as error:
+            logger.debug('alert %d: cannot evaluate filter %d in Python, '
+                         'using SQL: %s', alert.id, self.filter.id, error)
+            return self.filter.verify(alert)
+
+        if matches and self.remaining:
+            return self.filter.verify(alert, self.remaining)
+        logger.debug('alert %d: %s filter %d', alert.id,
+                     'matches' if matches else 'did not match',
+                     self.filter.id)
+        return matches
+
 
 @python_2_unicode_compatible
 class FilterGroup(models.Model):
@@ -29,6 +29,9 @@ class NetbiosTrackerConfig(NAVConfigParser):
     DEFAULT_CONFIG = u"""
 [main]
 encoding = cp850
+workers = 4
+shard_size = 1024
+bandwidth = 0
 """
 
     def get_exceptions(self):
@@ -44,6 +47,24 @@ encoding = cp850
         """Get the encoding option"""
         return self.get('main', 'encoding')
 
+    def get_workers(self):
+        """Get the maximum number of concurrent scanner processes"""
+        return self.getint('main', 'workers')
+
+    def get_shard_size(self):
+        """Get the maximum number of addresses to scan in a single scanner
+        process
+
+        """
+        return self.getint('main', 'shard_size')
+
+    def get_bandwidth(self):
+        """Get the maximum total scanning bandwidth in bits per second, or
+        None if unlimited
+
+        """
+        return self.getint('main', 'bandwidth') or None
+
 
 def create_list(exceptions):
     """Create a list of single ip-adresses from a list of IP instances"""
@@ -17,9 +17,10 @@
 #
 """Module for doing netbios scans"""
 import logging
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from datetime import datetime
 from functools import wraps
+from multiprocessing.pool import ThreadPool
 from time import time
 from subprocess import Popen, PIPE
 from nav.models.manage import Arp, Netbios
@@ -28,6 +29,10 @@ from django.db import transaction
 from django.utils import six
 
 SPLITCHAR = '!'
+# Default maximum number of addresses to scan in a single nbtscan process
+SHARD_SIZE = 1024
+# Maximum number of rows to write in a single database statement
+BATCH_SIZE = 1000
 
 # pylint: disable=C0103
 NetbiosResult = namedtuple('NetbiosResult',
@@ -72,19 +77,88 @@ def get_addresses_to_scan(exclude_list=None):
     return [str(ip) for ip in addresses if not _is_excluded(ip)]
 
 
+def shard_addresses(addresses, shard_size=SHARD_SIZE):
+    """Splits a list of IPv4 addresses into shards that can be scanned
+    separately.
+
+    Addresses are grouped by /24 prefix, and prefixes are kept together in a
+    single shard of at most shard_size addresses whenever possible.
+
+    :param addresses: A list of IPv4 address strings.
+    :returns: A generator of lists of IPv4 address strings.
+    """
+    by_prefix = defaultdict(list)
+    for address in addresses:
+        by_prefix[address.rsplit('.', 1)[0]].append(address)
+
+    shard = []
+    for prefix in sorted(by_prefix):
+        group = by_prefix[prefix]
+        if shard and len(shard) + len(group) > shard_size:
+            yield shard
+            shard = []
+        shard.extend(group)
+        while len(shard) >= shard_size:
+            yield shard[:shard_size]
+            shard = shard[shard_size:]
+    if shard:
+        yield shard
+
+
+def scan_in_parallel(addresses, workers=1, bandwidth=None,
+                     shard_size=SHARD_SIZE):
+    """Scans a list of ip-addresses for netbios names, using several
+    concurrent nbtscan processes.
+
+    The addresses are sharded by prefix, and each shard is scanned by a
+    separate nbtscan process. Results are parsed and yielded as soon as each
+    shard has been scanned.
+
+    :param addresses: A list of IPv4 address strings.
+    :param workers: The maximum number of concurrent nbtscan processes.
+    :param bandwidth: The maximum total bandwidth to use for scanning, in bits
+                      per second, or None for no limit. The bandwidth is
+                      divided evenly between the nbtscan processes.
+    :returns: A generator of NetbiosResult tuples.
+    """
+    shards = list(shard_addresses(addresses, shard_size))
+    workers = max(1, min(workers, len(shards)))
+    if bandwidth:
+        bandwidth = max(1, bandwidth // workers)
+    _logger.debug('Scanning %s addresses in %s shards using %s processes',
+                  len(addresses), len(shards), workers)
+
+    def _scan_shard(shard):
+        return scan(shard, bandwidth=bandwidth)
+
+    pool = ThreadPool(workers)
+    try:
+        for output in pool.imap_unordered(_scan_shard, shards):
+            for result in parse(output):
+                yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
 @timed
-def scan(addresses, ignore_failed_sendto=True):
+def scan(addresses, ignore_failed_sendto=True, bandwidth=None):
     """Scan a list of ip-addresses for netbios names
 
     :param addresses: A list of IP address strings.
     :param ignore_failed_sendto: Whether to ignore "sendto" failures, which may
                                  sometimes be a low-level OS error reported for
                                  individual addresses.
+    :param bandwidth: If set, limits the bandwidth used by nbtscan to this
+                      number of bits per second.
     """
 
     _logger.debug('Scanning %s addresses', len(addresses))
+    command = ['nbtscan', '-f-', '-s', SPLITCHAR]
+    if bandwidth:
+        command.extend(['-b', str(int(bandwidth))])
     proc = Popen(
-        ['nbtscan', '-f-', '-s', SPLITCHAR],
+        command,
         stdin=PIPE,
         stdout=PIPE,
         stderr=PIPE,
@@ -166,14 +240,13 @@ def fetch_database_entries():
     """Fetch current active entries from netbios table
 
     Create a structure that is suitable for comparing as a set with other
-    structures
+    structures, mapping each entry to its id
 
     """
-    database_entries = {}
-    for entry in Netbios.objects.filter(end_time=datetime.max):
-        database_entries[(entry.ip, entry.name, entry.server, entry.username,
-                          entry.mac)] = entry
-    return database_entries
+    entries = Netbios.objects.filter(end_time=datetime.max).values_list(
+        'id', 'ip', 'name', 'server', 'username', 'mac')
+    return {(ip, name, server, username, mac): netbiosid
+            for netbiosid, ip, name, server, username, mac in entries}
 
 
 @timed
@@ -181,10 +254,11 @@ def fetch_database_entries():
 def set_end_time(database_entries, entries_to_end):
     """End the entries given"""
     _logger.debug('Ending %s entries', len(entries_to_end))
-    for key in entries_to_end:
-        entry = database_entries[key]
-        entry.end_time = datetime.now()
-        entry.save()
+    ids = [database_entries[key] for key in entries_to_end]
+    now = datetime.now()
+    for start in range(0, len(ids), BATCH_SIZE):
+        Netbios.objects.filter(id__in=ids[start:start + BATCH_SIZE]).update(
+            end_time=now)
 
 
 @timed
@@ -192,7 +266,8 @@ def set_end_time(database_entries, entries_to_end):
 def create_entries(entries_to_create):
     """Create new netbios entries for the data given"""
     _logger.debug('Creating %s new entries', len(entries_to_create))
-    for entry in entries_to_create:
-        netbios = Netbios(ip=entry.ip, mac=entry.mac or None, name=entry.name,
-                          server=entry.server, username=entry.username)
-        netbios.save()
+    Netbios.objects.bulk_create(
+        (Netbios(ip=entry.ip, mac=entry.mac or None, name=entry.name,
+                 server=entry.server, username=entry.username)
+         for entry in entries_to_create),
+        batch_size=BATCH_SIZE)
@@ -42,6 +42,8 @@ class OID(tuple):
       (1, 3, 6)
 
     """
+    __slots__ = ()
+
     def __new__(cls, oid):
         if isinstance(oid, six.string_types):
             oid = map(int, oid.strip(SEPARATOR).split(SEPARATOR))
@@ -77,6 +79,50 @@ class OID(tuple):
             return self
 
 
+class SuffixParser(object):
+    """Extracts the suffixes of OIDs that share a common prefix, such as the
+    row indexes from the OIDs of the varbinds of a table column response.
+
+    OIDs may be given either as strings or as tuples. Since SNMP responses
+    typically consist of many OIDs that share a long prefix, only the part of
+    a string OID that follows the prefix is actually parsed, and tuple OIDs
+    are only sliced once.
+
+      >>> ifName = SuffixParser('.1.3.6.1.2.1.31.1.1.1.1')
+      >>> ifName.parse('.1.3.6.1.2.1.31.1.1.1.1.42')
+      OID('.42')
+      >>> ifName.parse((1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 1, 42))
+      OID('.42')
+      >>> ifName.parse('.1.3.6.1.2.1.31.1.1.1.10.42') is None
+      True
+
+    """
+    def __init__(self, prefix):
+        self.prefix = OID(prefix)
+        self._prefix_str = str(self.prefix) + SEPARATOR
+        self._prefix_len = len(self.prefix)
+
+    def parse(self, oid):
+        """Returns the suffix of oid as an OID, or None if oid doesn't
+        start with the prefix of this parser.
+
+        """
+        if isinstance(oid, six.string_types):
+            if not oid.startswith(SEPARATOR):
+                oid = SEPARATOR + oid
+            if not oid.startswith(self._prefix_str):
+                return None
+            suffix = oid[len(self._prefix_str):]
+            if not suffix:
+                return None
+            return tuple.__new__(OID, map(int, suffix.split(SEPARATOR)))
+        else:
+            if (len(oid) <= self._prefix_len
+                    or oid[:self._prefix_len] != self.prefix):
+                return None
+            return tuple.__new__(OID, oid[self._prefix_len:])
+
+
 def get_enterprise_id(sysobjectid):
     "Returns the enterprise ID number from a sysObjectID"
     if not sysobjectid:
@@ -31,6 +31,7 @@ from nav.enterprise.ids import (VENDOR_ID_CISCOSYSTEMS,
                                 VENDOR_ID_H3C,
                                 VENDOR_ID_DELL_INC,
                                 VENDOR_ID_HEWLETT_PACKARD)
+from nav.smidumps import get_mib
 
 
 _logger = logging.getLogger("nav.portadmin.snmputils")
@@ -74,7 +75,7 @@ class FantasyVlan(object):
 class SNMPHandler(object):
     """A basic class for SNMP-read and -write to switches."""
 
-    from nav.smidumps.qbridge_mib import MIB as qbridgemib
+    qbridgemib = get_mib('qbridge_mib')
     QBRIDGENODES = qbridgemib['nodes']
 
     SYSOBJECTID = '.1.3.6.1.2.1.1.2.0'
@@ -555,7 +556,7 @@ class SNMPHandler(object):
 class Cisco(SNMPHandler):
     """A specialized class for handling ports in CISCO switches."""
 
-    from nav.smidumps.cisco_vtp_mib import MIB as vtp_mib
+    vtp_mib = get_mib('cisco_vtp_mib')
     VTPNODES = vtp_mib['nodes']
 
     VTPVLANSTATE = VTPNODES['vtpVlanState']['oid']
@@ -825,7 +826,7 @@ class Dell(SNMPHandler):
     Uses DNOS-SWITCHING-MIB
     """
 
-    from nav.smidumps.dnos_switching_mib import MIB as mib
+    mib = get_mib('dnos_switching_mib')
 
     PORT_MODE_ACCESS = 1
     PORT_MODE_TRUNK = 2
@@ -15,52 +15,100 @@
 #
 """Represents the meta information and result from a database query."""
 
+from uuid import uuid4
+
 from nav import db
 import psycopg2
 
+# The number of rows to fetch at a time when streaming report rows
+STREAM_BATCH_SIZE = 2000
+
 
 class DatabaseResult(object):
     """The results obtained from the database"""
 
-    def __init__(self, report_config):
+    def __init__(self, report_config, limit=None, offset=None, stream=False):
         """Does everything in the constructor. queries and returns the values
         from the database, according to the configuration
 
         :param report_config: a ReportConfig object containing the SQL query.
+        :param limit: the maximum number of rows to fetch, or None for all.
+        :param offset: the number of rows to skip.
+        :param stream: if True, no rows are fetched up front. Instead, rows
+                       are fetched in batches from a server side cursor while
+                       iterating over the stream attribute.
 
         """
         self.sql = ""
         self.result = []
+        self.stream = iter(())
         self.rowcount = 0
         self.sums = {}
         self.error = ""
         self.hidden = []
 
         connection = db.getConnection('default')
-        cursor = connection.cursor()
 
-        self.sql, self.parameters = report_config.make_sql()
+        self.sql, self.parameters = report_config.make_sql(limit, offset)
 
         # Make a dictionary of which columns to summarize
         self.sums = {sum_key: '' for sum_key in report_config.sum}
 
         try:
-            cursor.execute(self.sql, self.parameters or None)
-            self.result = cursor.fetchall()
+            if stream:
+                cursor = connection.cursor('report_%s' % uuid4().hex)
+                cursor.itersize = STREAM_BATCH_SIZE
+                cursor.execute(self.sql, self.parameters or None)
+                first_batch = cursor.fetchmany(STREAM_BATCH_SIZE)
+                self.stream = _stream_rows(cursor, first_batch)
+            else:
+                cursor = connection.cursor()
+                cursor.execute(self.sql, self.parameters or None)
+                self.result = cursor.fetchall()
 
             # A list of the column headers.
             report_config.sql_select = [col.name for col in cursor.description]
 
-            # Total count of the rows returned.
-            self.rowcount = len(self.result)
+            if not stream:
+                self._fetch_totals(connection.cursor(), report_config)
 
         except psycopg2.ProgrammingError as error:
+            connection.rollback()
             self.error = ("There was an unhandled SQL error! There may be "
                           "something wrong with the definition of the '{}' "
                           "report: {}".format(report_config.title, error))
 
         except psycopg2.DataError as error:
+            connection.rollback()
             self.error = ("Data error! Some of your input data is of an "
                           "invalid type: {}".format(error))
         else:
             self.error = report_config.error
+
+    def _fetch_totals(self, cursor, report_config):
+        """Counts all the rows of the report, not just the fetched ones, and
+        sums the columns that should be summed.
+
+        """
+        sql, parameters = report_config.make_totals_sql()
+        cursor.execute(sql, parameters or None)
+        totals = cursor.fetchone()
+
+        # Total count of the rows matched by the report query.
+        self.rowcount = totals[0]
+        sum_keys = [key for key in report_config.sum if key.strip()]
+        self.sums.update(zip(sum_keys, totals[1:]))
+
+
+def _stream_rows(cursor, first_batch):
+    """Yields the first batch of rows, then the remaining rows of a server
+    side cursor, closing the cursor when done.
+
+    """
+    try:
+        for row in first_batch:
+            yield row
+        for row in cursor:
+            yield row
+    finally:
+        cursor.close()
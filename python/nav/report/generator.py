@@ -21,13 +21,16 @@ import re
 from nav.report.dbresult import DatabaseResult
 from nav.report.report import Report
 
+# The maximum number of rows shown when no limit argument is given
+DEFAULT_LIMIT = 100000
+
 
 class Generator(object):
     """The maker and controller of the generating of a report"""
     sql = None
 
     def make_report(self, report_name, config_file, config_file_local,
-                    query_dict, config, dbresult):
+                    query_dict, config, dbresult, page=None, stream=False):
         """Makes a report
 
         :param report_name: the name of the report that will be represented
@@ -37,6 +40,11 @@ class Generator(object):
         :param queryDict: mutable QueryDict
         :param config: the parsed configuration object, if cached
         :param dbresult: the database result, if cached
+        :param page: a (page_number, page_size) tuple. If given, only the rows
+                     of this page are fetched from the database.
+        :param stream: if True, the rows are not fetched up front, but are
+                       streamed from a server side cursor through
+                       dbresult.stream
 
         :returns: a formatted report object and search parameters. Also returns
                   a parsed ReportConfig object and a DatabaseResult object to
@@ -83,7 +91,11 @@ class Generator(object):
             return report, contents, neg, operator, advanced
 
         else:  # Not cached
-            dbresult = DatabaseResult(config)
+            if page:
+                offset, limit = config.get_page_window(*page)
+            else:
+                offset, limit = config.get_window()
+            dbresult = DatabaseResult(config, limit, offset, stream=stream)
             self.sql = dbresult.sql
 
             report = Report(config, dbresult, query_dict)
@@ -374,12 +386,63 @@ class ReportConfig(object):
         return template.format(self.sql, self.sql_select, self.where,
                                self.parameters, self.order_by)
 
-    def make_sql(self):
+    def make_sql(self, limit=None, offset=None):
+        """Makes the SQL query for the report rows.
+
+        :param limit: the maximum number of rows to return, or None for all
+        :param offset: the number of rows to skip
+
+        """
+        paginated = limit is not None or bool(offset)
         sql = "SELECT * FROM (%s) AS foo %s%s" % (self.sql,
                                                   self.wherestring(),
-                                                  self.orderstring())
+                                                  self.orderstring(paginated))
+        if limit is not None:
+            sql += " LIMIT %d" % int(limit)
+        if offset:
+            sql += " OFFSET %d" % int(offset)
+        return sql, self.parameters
+
+    def make_totals_sql(self):
+        """Makes an SQL query that counts all the report rows and totals the
+        columns that should be summed.
+
+        """
+        columns = ["COUNT(*)"] + ["SUM(%s)" % _quote_identifier(field)
+                                  for field in self.sum if field.strip()]
+        sql = "SELECT %s FROM (%s) AS foo %s" % (", ".join(columns),
+                                                 self.sql,
+                                                 self.wherestring())
         return sql, self.parameters
 
+    def get_window(self):
+        """Returns the window of report rows requested by the offset and limit
+        arguments.
+
+        :returns: an (offset, limit) tuple, where a limit of None means all
+                  rows.
+
+        """
+        offset = int(self.offset or 0)
+        if self.limit or self.limit == 0:
+            limit = int(self.limit) or None
+        else:
+            limit = DEFAULT_LIMIT
+        return offset, limit
+
+    def get_page_window(self, page_number, page_size):
+        """Returns the window of report rows shown on a single page.
+
+        :returns: an (offset, limit) tuple
+        """
+        offset, limit = self.get_window()
+        start = (page_number - 1) * page_size
+        if limit is None:
+            size = page_size
+        else:
+            size = max(0, min(page_size, limit - start))
+        return offset + start, size
+
     def wherestring(self):
         where = self.where
         if where:
@@ -389,11 +452,24 @@ class ReportConfig(object):
         else:
             return ""
 
-    def orderstring(self):
+    def orderstring(self, stable=False):
+        """Makes the ORDER BY clause of the report query.
+
+        :param stable: if True, the first column is added as the last sort
+                       key, so that separate queries for different pages of
+                       the report sort the rows the same way.
+
+        """
         def _transform(arg):
             if arg.startswith("-"):
                 arg = "%s DESC" % arg.replace("-", "")
             return arg
 
         sort = [_transform(s) for s in self.order_by]
+        if stable:
+            sort.append("1")
         return " ORDER BY %s" % ",".join(sort) if sort else ""
+
+
+def _quote_identifier(name):
+    return '"%s"' % name.strip().replace('"', '""')
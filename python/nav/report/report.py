@@ -38,25 +38,22 @@ class Report(object):
 
         :param configuration: a ReportConfig object containing all the
                               configuration
-        :param database: a DatabaseResult object that will be modified
-                         according to the configuration
+        :param database: a DatabaseResult object containing the rows to
+                         present, already limited according to the
+                         configuration
         :param query_dict: mutable Query Dict
 
         """
-
-        self.rowcount = database.rowcount
         self.sums = database.sums
         self.report_id = configuration.report_id
 
-        self.limit = int(str((self.set_limit(configuration.limit))))
-        self.offset = int(str(self.set_offset(configuration.offset)))
+        self.offset, self.limit = configuration.get_window()
+        # The number of rows in the window selected by offset and limit
+        self.rowcount = max(0, database.rowcount - self.offset)
+        if self.limit is not None:
+            self.rowcount = min(self.rowcount, self.limit)
 
-        # oh, the smell, it kills me!
-        if self.limit:
-            self.formatted = database.result[self.offset:self.limit+self.offset]
-        else:
-            self.formatted = database.result
-        self.dbresult = database.result
+        self.formatted = database.result
 
         self.query_args = self.strip_pagination_arguments(query_dict)
 
@@ -87,29 +84,6 @@ class Report(object):
         self.form = self.make_form(self.name)
         self.database_error = database.error
 
-    def set_limit(self, limit):
-        """Returns the limit according to the configuration, or the default.
-
-        :param limit: the configured limit or None
-        :returns: the configured limit or 1000
-
-        """
-        if limit or limit == 0:
-            return limit
-        else:
-            return 100000
-
-    def set_offset(self, offset):
-        """Returns the offset according to the configuration, or the default.
-
-        :param offset: the configured offset or None
-        :returns: the configured offset or 0
-        """
-        if offset:
-            return offset
-        else:
-            return 0
-
     def strip_pagination_arguments(self, query_dict):
         """removes the 'limit' and 'offset' arguments from the query_dict
 
@@ -201,8 +175,8 @@ class Report(object):
     def make_table_footers(self, sums):
         """Makes the table footers. ie. the sums of the columns if specified.
 
-        :param sums: a list containing the numbers of the fields that will be
-                     summed.
+        :param sums: a dict mapping the names of the fields that will be
+                     summed to their totals.
 
         :returns: a list of cells that later will represent the footers of the
                   table
@@ -226,17 +200,12 @@ class Report(object):
                     if fmt[footer] is not None:
                         part_sum += int(str(fmt[footer]))
 
-                total_sum = 0
-                for res in self.dbresult:
-                    if res[footer] is not None:
-                        total_sum += int(str(res[footer]))
+                ## The total of all rows is summed by the database
+                total_sum = sums[title] or 0
 
                 if part_sum == total_sum:
                     this_sum.set_sum(str(part_sum))
 
-                elif sums[title] == 0:
-                    this_sum.set_sum("0")
-
                 else:
                     this_sum.set_sum(str(part_sum) + "/" + str(total_sum))
 
@@ -264,11 +233,21 @@ class Report(object):
         :returns: a table containing the data of the report (without header
                   and footer etc)
 
+        """
+        newtable = Table()
+        newtable.extend(self.make_rows(self.formatted))
+        return newtable
+
+    def make_rows(self, lines):
+        """Formats database result lines as table rows.
+
+        :param lines: an iterable of result tuples from the database
+        :returns: a generator of Row objects
+
         """
         link_pattern = re.compile(r"\$(.+?)(?:$|\$|&|\"|\'|\s|;|/)", re.M)
 
-        newtable = Table()
-        for line in self.formatted:
+        for line in lines:
 
             newline = Row()
             for field in self.shown:
@@ -304,9 +283,7 @@ class Report(object):
 
                 newline.append(newfield)
 
-            newtable.append(newline)
-
-        return newtable
+            yield newline
 
     def make_form(self, name):
         form = []
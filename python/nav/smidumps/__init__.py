@@ -2,4 +2,210 @@
 
 As dumped by smidump dump using the python format option.
 
+Importing a dump module gives the full MIB definition, including all of its
+descriptive texts. Most of NAV only needs the names, OIDs, syntaxes and table
+structures of a MIB, and should use get_mib() instead, which gives a compact
+version of a dump that is only loaded once it is actually used.
+
+The compact versions can be precompiled into pickle files using
+compile_all(), which is done when NAV is built. Without precompiled files, the
+compact versions are built from the dump modules at runtime.
+
 """
+import logging
+import os
+import pickle
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+DUMP_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILED_SUFFIX = '.pickle'
+INDEX_NAME = 'index'
+PICKLE_PROTOCOL = 2
+
+# Keys of textual items that are of no use to NAV at runtime
+STRIPPED_KEYS = frozenset((
+    'description',
+    'reference',
+    'organization',
+    'contact',
+    'revisions',
+    'imports',
+))
+
+_logger = logging.getLogger(__name__)
+_mibs = {}
+_index = {}
+
+
+def get_mib(name):
+    """Returns the compact MIB definition of a dump module.
+
+    :param name: The name of a dump module in this package, e.g. 'if_mib'.
+    :returns: A LazyMib instance, which loads the definition on first use.
+
+    """
+    try:
+        return _mibs[name]
+    except KeyError:
+        mib = _mibs[name] = LazyMib(name)
+        return mib
+
+
+class LazyMib(Mapping):
+    """A read-only mapping of a compact MIB definition, which is loaded the
+    first time any item other than the moduleName is accessed.
+
+    """
+    def __init__(self, name, directory=DUMP_DIR):
+        self.name = name
+        self.directory = directory
+        self._mib = None
+
+    @property
+    def loaded(self):
+        """True if the MIB definition has been loaded"""
+        return self._mib is not None
+
+    def _get_mib(self):
+        if self._mib is None:
+            self._mib = load_mib(self.name, self.directory)
+        return self._mib
+
+    def __getitem__(self, key):
+        if key == 'moduleName' and self._mib is None:
+            module_name = get_module_name(self.name, self.directory)
+            if module_name:
+                return module_name
+        return self._get_mib()[key]
+
+    def __iter__(self):
+        return iter(self._get_mib())
+
+    def __len__(self):
+        return len(self._get_mib())
+
+    def __repr__(self):
+        return '<%s %r%s>' % (self.__class__.__name__, self.name,
+                              '' if self.loaded else ' (not loaded)')
+
+
+def load_mib(name, directory=DUMP_DIR):
+    """Loads the compact MIB definition of a dump module, from its
+    precompiled file if that is up to date, otherwise from the dump module
+    itself.
+
+    """
+    source = _get_source_path(name, directory)
+    compiled = _get_compiled_path(name, directory)
+    if _is_up_to_date(compiled, source):
+        try:
+            with open(compiled, 'rb') as handle:
+                return pickle.load(handle)
+        except Exception as error:  # pylint: disable=broad-except
+            _logger.warning("ignoring unreadable precompiled MIB %s: %s",
+                            compiled, error)
+    _logger.debug("no precompiled MIB for %s, reading %s", name, source)
+    return compact(read_dump(source))
+
+
+def get_module_name(name, directory=DUMP_DIR):
+    """Returns the MIB module name of a dump module from the precompiled
+    index, or None if the index has no up to date entry for it.
+
+    """
+    if directory not in _index:
+        _index[directory] = _load_index(directory)
+    index_path, index = _index[directory]
+    if name in index and _is_up_to_date(
+            index_path, _get_source_path(name, directory)):
+        return index[name]
+
+
+def _load_index(directory):
+    index_path = _get_compiled_path(INDEX_NAME, directory)
+    try:
+        with open(index_path, 'rb') as handle:
+            return index_path, pickle.load(handle)
+    except Exception:  # pylint: disable=broad-except
+        return index_path, {}
+
+
+def read_dump(path):
+    """Reads and returns the full MIB definition from a dump module file,
+    without importing the file as a module.
+
+    """
+    with open(path, 'rb') as handle:
+        code = compile(handle.read(), path, 'exec')
+    namespace = {}
+    exec(code, namespace)  # pylint: disable=exec-used
+    return namespace['MIB']
+
+
+def compact(definition):
+    """Returns a copy of a MIB definition with all the textual items that NAV
+    doesn't use removed.
+
+    """
+    if isinstance(definition, dict):
+        return dict((key, compact(value))
+                    for key, value in definition.items()
+                    if not (key in STRIPPED_KEYS
+                            and not isinstance(value, dict)))
+    elif isinstance(definition, (list, tuple)):
+        return type(definition)(compact(value) for value in definition)
+    return definition
+
+
+def compile_all(directory=DUMP_DIR):
+    """Precompiles the compact MIB definitions of all the dump modules in
+    directory, and an index of their MIB module names.
+
+    :returns: The number of dump modules compiled.
+
+    """
+    index = {}
+    for name in get_dump_names(directory):
+        mib = compact(read_dump(_get_source_path(name, directory)))
+        _write_pickle(mib, _get_compiled_path(name, directory))
+        index[name] = mib['moduleName']
+    _write_pickle(index, _get_compiled_path(INDEX_NAME, directory))
+    _index.pop(directory, None)
+    return len(index)
+
+
+def get_dump_names(directory=DUMP_DIR):
+    """Returns a sorted list of the names of the dump modules in directory"""
+    return sorted(filename[:-3] for filename in os.listdir(directory)
+                  if filename.endswith('.py')
+                  and not filename.startswith('_'))
+
+
+def _write_pickle(data, path):
+    tempfile = path + '.tmp'
+    with open(tempfile, 'wb') as handle:
+        pickle.dump(data, handle, PICKLE_PROTOCOL)
+    os.rename(tempfile, path)
+
+
+def _get_source_path(name, directory):
+    return os.path.join(directory, name + '.py')
+
+
+def _get_compiled_path(name, directory):
+    return os.path.join(directory, name + COMPILED_SUFFIX)
+
+
+def _is_up_to_date(compiled, source):
+    try:
+        compiled_mtime = os.path.getmtime(compiled)
+    except OSError:
+        return False
+    try:
+        return compiled_mtime >= os.path.getmtime(source)
+    except OSError:
+        return True
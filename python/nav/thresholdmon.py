@@ -28,6 +28,7 @@ from nav.models.manage import Netbox, Interface, Sensor
 from nav.models.thresholds import ThresholdRule
 from nav.models.event import EventQueue as Event, AlertHistory
 from nav.metrics.lookup import lookup
+from nav.metrics.thresholds import get_values_in_bulk
 
 import django
 from django.db import transaction
@@ -69,22 +70,54 @@ def scan():
     alerts = get_unresolved_threshold_alerts()
 
     _logger.info("evaluating %d rules", len(rules))
+    evaluators = get_prefetched_evaluators(rules)
     for rule in rules:
-        evaluate_rule(rule, alerts)
+        evaluate_rule(rule, alerts, evaluators.get(rule.id))
     _logger.info("done")
 
 
 # pylint: disable=W0703
-def evaluate_rule(rule, alerts):
+def get_prefetched_evaluators(rules):
+    """
+    Creates evaluators for a list of rules and retrieves their values from
+    Graphite in bulk.
+
+    :returns: A dict of {rule_id: evaluator} items, for the rules whose values
+              were successfully retrieved.
+    """
+    evaluators = {}
+    for rule in rules:
+        try:
+            evaluators[rule.id] = rule.get_evaluator()
+        except Exception:
+            _logger.exception("Unhandled exception while creating evaluator "
+                              "for rule: %r", rule)
+    failed = get_values_in_bulk(list(evaluators.values()))
+    if failed:
+        _logger.info("bulk retrieval failed for %d rules, retrying them "
+                     "individually", len(failed))
+    failed = set(failed)
+    return dict((ruleid, evaluator)
+                for ruleid, evaluator in six.iteritems(evaluators)
+                if evaluator not in failed)
+
+
+def evaluate_rule(rule, alerts, evaluator=None):
     """
     Evaluates the current status of a single rule and posts events if
     necessary.
+
+    :param evaluator: An evaluator for this rule whose values have already
+                      been retrieved. If omitted, the rule's values will be
+                      retrieved from Graphite before evaluation.
     """
     _logger.debug("evaluating rule %r", rule)
 
-    evaluator = rule.get_evaluator()
     try:
-        if not evaluator.get_values():
+        if evaluator is None:
+            evaluator = rule.get_evaluator()
+            evaluator.get_values()
+        if not evaluator.result:
             _logger.warning(
                 "did not find any matching values for rule %r %s",
                 rule.target, rule.alert
@@ -103,12 +136,15 @@ def evaluate_rule(rule, alerts):
                           rule)
         return
 
+    subjects = evaluator.lookup_subjects(
+        [metric for metric, _value in exceeded
+         if metric not in alerts.get(rule.id, {})])
     for metric, value in exceeded:
         alert = alerts.get(rule.id, {}).get(metric, None)
         _logger.info("%s: %s %s (=%s)",
                      "old" if alert else "new", metric, rule.alert, value)
         if not alert:
-            start_event(rule, metric, value)
+            start_event(rule, metric, value, subjects)
 
     # try to clear any existing threshold alerts
     if rule.id in alerts:
@@ -123,11 +159,13 @@ def evaluate_rule(rule, alerts):
                 "Unhandled exception while evaluating rule clear: %r", rule)
             return
 
+        cleared = [(metric, value) for metric, value in cleared
+                   if metric in clearable]
+        subjects = evaluator.lookup_subjects(
+            [metric for metric, _value in cleared])
         for metric, value in cleared:
-            if metric in clearable:
-                _logger.info("cleared: %s %s (=%s)",
-                             metric, rule.clear, value)
-                end_event(rule, metric, value)
+            _logger.info("cleared: %s %s (=%s)", metric, rule.clear, value)
+            end_event(rule, metric, value, subjects)
 
 
 def get_unresolved_threshold_alerts():
@@ -150,23 +188,27 @@ def get_unresolved_threshold_alerts():
     return dict(alert_map)
 
 
-def start_event(rule, metric, value):
+def start_event(rule, metric, value, subjects=None):
     """Makes and posts a threshold start event"""
-    event = make_event(True, rule, metric, value)
+    event = make_event(True, rule, metric, value, subjects)
     _logger.debug("posted start event: %r", event)
     return event
 
 
-def end_event(rule, metric, value):
+def end_event(rule, metric, value, subjects=None):
     """Makes and posts a threshold end event"""
-    event = make_event(False, rule, metric, value)
+    event = make_event(False, rule, metric, value, subjects)
     _logger.debug("posted end event: %r", event)
     return event
 
 
 @transaction.atomic()
-def make_event(start, rule, metric, value):
-    """Makes and posts a threshold event"""
+def make_event(start, rule, metric, value, subjects=None):
+    """Makes and posts a threshold event
+
+    :param subjects: An optional dict of pre-looked up subject objects, as
+                     returned by nav.metrics.lookup.lookup_many().
+    """
     event = _event_template()
     event.state = event.STATE_START if start else event.STATE_END
     event.subid = "{rule}:{metric}".format(rule=rule.id, metric=metric)
@@ -176,7 +218,7 @@ def make_event(start, rule, metric, value):
                   measured_value=six.text_type(value))
     if rule.clear:
         varmap['clear'] = six.text_type(rule.clear)
-    _add_subject_details(event, metric, varmap)
+    _add_subject_details(event, metric, varmap, subjects)
 
     event.save()
     if varmap:
@@ -184,8 +226,11 @@ def make_event(start, rule, metric, value):
     return event
 
 
-def _add_subject_details(event, metric, varmap):
-    obj = lookup(metric)
+def _add_subject_details(event, metric, varmap, subjects=None):
+    if subjects and metric in subjects:
+        obj = subjects[metric]
+    else:
+        obj = lookup(metric)
     if obj:
         try:
             varmap['subject'] = "{table}:{pk}".format(
@@ -45,6 +45,7 @@ from itertools import chain
 import networkx as nx
 from nav.models.manage import (AdjacencyCandidate, InterfaceAggregate,
                                InterfaceStack)
+from nav.topology.cache import fingerprint
 
 import logging
 _logger = logging.getLogger(__name__)
@@ -271,6 +272,62 @@ class AdjacencyReducer(AdjacencyAnalyzer):
         self.result.add_edge(i, j)
         self.result.add_edge(j, i)
 
+
+def reduce_candidate_graph(graph, aggregates=None, cache=None):
+    """Reduces a candidate graph into a list of physical links, one weakly
+    connected component at a time.
+
+    Since the reduction of a component is never affected by other components,
+    the result is the same as when reducing the entire graph at once. If a
+    TopologyCache is given, the cached links of components whose candidates
+    and aggregates are unchanged since the previous run are reused, instead of
+    reducing those components again.
+
+    :returns: A list of edges from ports, as returned by
+              AdjacencyReducer.get_single_edges_from_ports()
+
+    """
+    aggregates = aggregates or {}
+    links = []
+    for nodes in nx.weakly_connected_components(graph):
+        component = graph.subgraph(nodes).copy()
+        key = cached = None
+        if cache is not None:
+            key = _get_component_fingerprint(component, aggregates)
+            cached = cache.get('layer2', key)
+
+        if cached is not None:
+            links.extend(_deserialize_link(link) for link in cached)
+        else:
+            reducer = AdjacencyReducer(component, aggregates)
+            reducer.reduce()
+            component_links = reducer.get_single_edges_from_ports()
+            if key:
+                cache.set('layer2', key, [_serialize_link(link)
+                                          for link in component_links])
+            links.extend(component_links)
+    return links
+
+
+def _get_component_fingerprint(component, aggregates):
+    edges = sorted(repr(edge) for edge in component.edges(keys=True))
+    component_aggregates = sorted(
+        repr((aggregator, sorted(aggregates[aggregator])))
+        for aggregator in aggregates if aggregator in component)
+    return fingerprint(edges, component_aggregates)
+
+
+def _serialize_link(link):
+    source, dest = link
+    return [list(source), list(dest) if isinstance(dest, Port) else dest]
+
+
+def _deserialize_link(link):
+    source, dest = link
+    return (Port(source),
+            Port(dest) if isinstance(dest, list) else Box(dest))
+
+
 # Graph builder functions
 
 
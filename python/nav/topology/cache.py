@@ -0,0 +1,99 @@
+#
+# Copyright (C) 2019 Uninett AS
+#
+# This file is part of Network Administration Visualized (NAV).
+#
+# NAV is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.  You should have received a copy of the GNU General Public License
+# along with NAV. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Persistent caching of topology analysis results between navtopology runs.
+
+Analysis results are cached using a fingerprint of the analysis inputs as
+key. On the next run, only those parts of the topology whose inputs have
+changed, and therefore have new fingerprints, need to be analyzed again.
+
+"""
+from hashlib import sha1
+import json
+import logging
+import os
+
+from nav import buildconf
+
+CACHE_FILE = os.path.join(buildconf.localstatedir, 'navtopology-cache.json')
+
+_logger = logging.getLogger(__name__)
+
+
+class TopologyCache(object):
+    """A cache of topology analysis results, divided into named sections.
+
+    Only the entries that were looked up or stored since the cache was loaded
+    are saved, so that results for inputs that no longer exist are expired
+    after a single run.
+
+    """
+    def __init__(self, filename=CACHE_FILE):
+        self.filename = filename
+        self._previous = {}
+        self._current = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """Loads the results saved by the previous run, if any"""
+        try:
+            with open(self.filename) as cachefile:
+                self._previous = json.load(cachefile)
+        except (IOError, OSError, ValueError) as error:
+            _logger.info("starting with an empty topology cache: %s", error)
+            self._previous = {}
+        return self
+
+    def save(self):
+        """Saves the results of this run, replacing the results of the
+        previous run.
+
+        """
+        tempfile = self.filename + '.tmp'
+        with open(tempfile, 'w') as cachefile:
+            json.dump(self._current, cachefile)
+        os.rename(tempfile, self.filename)
+        _logger.info("topology cache saved: %d hits, %d misses",
+                     self.hits, self.misses)
+
+    def get(self, section, key):
+        """Returns the cached result for key in section, or None if there
+        is no such result.
+
+        """
+        value = self._current.get(section, {}).get(key)
+        if value is None:
+            value = self._previous.get(section, {}).get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.set(section, key, value)
+        return value
+
+    def set(self, section, key, value):
+        """Stores a JSON serializable result for key in section"""
+        self._current.setdefault(section, {})[key] = value
+
+
+def fingerprint(*inputs):
+    """Returns a fingerprint string of the analysis inputs.
+
+    The inputs must have deterministic repr() values; sets and dicts should
+    therefore be sorted before being passed to this function.
+
+    """
+    return sha1(repr(inputs).encode('utf-8')).hexdigest()
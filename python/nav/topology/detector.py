@@ -29,8 +29,10 @@ from nav import daemon
 from nav.debug import log_stacktrace, log_last_django_query
 from nav.logs import init_generic_logging
 from nav.topology.layer2 import update_layer2_topology
-from nav.topology.analyze import (AdjacencyReducer, build_candidate_graph_from_db,
-                                  get_aggregate_mapping)
+from nav.topology.analyze import (build_candidate_graph_from_db,
+                                  get_aggregate_mapping,
+                                  reduce_candidate_graph)
+from nav.topology.cache import TopologyCache
 from nav.topology.vlan import VlanGraphAnalyzer, VlanTopologyUpdater
 
 from nav.models.manage import Vlan, Prefix
@@ -57,16 +59,19 @@ def main():
     if options.l2 or options.vlan:
         # protect against multiple invocations of long-running jobs
         verify_singleton()
+    cache = TopologyCache().load() if options.incremental else None
     if options.l2:
-        do_layer2_detection()
+        do_layer2_detection(cache)
     if options.vlan:
         if options.include_vlans:
             vlans = [int(v) for v in options.include_vlans]
         else:
             vlans = []
-        do_vlan_detection(vlans)
+        do_vlan_detection(vlans, cache, options.processes)
         delete_unused_prefixes()
         delete_unused_vlans()
+    if cache and (options.l2 or options.vlan):
+        cache.save()
 
 
 def int_list(value):
@@ -88,6 +93,12 @@ def make_option_parser():
     parser.add_argument("-i", dest="include_vlans", type=int_list,
                         metavar="vlan[,...]",
                         help="Only analyze the VLANs included in this list")
+    parser.add_argument("-p", "--processes", type=int, default=1,
+                        metavar="N",
+                        help="Analyze routed VLANs in N parallel processes")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-analyze the parts of the topology whose "
+                             "inputs changed since the last incremental run")
     parser.add_argument("-s", "--stderr", action="store_true",
                         help="Log to stderr (even if not a tty)")
     return parser
@@ -111,23 +122,21 @@ def with_exception_logging(func):
 
 
 @with_exception_logging
-def do_layer2_detection():
+def do_layer2_detection(cache=None):
     """Detect and update layer 2 topology"""
     candidates = build_candidate_graph_from_db()
     aggregates = get_aggregate_mapping(include_stacks=True)
-    reducer = AdjacencyReducer(candidates, aggregates)
-    reducer.reduce()
-    links = reducer.get_single_edges_from_ports()
+    links = reduce_candidate_graph(candidates, aggregates, cache)
     update_layer2_topology(links)
 
 
 @with_exception_logging
-def do_vlan_detection(vlans):
-    analyzer = VlanGraphAnalyzer()
+def do_vlan_detection(vlans, cache=None, processes=1):
+    analyzer = VlanGraphAnalyzer(cache)
     if vlans:
         analyzer.analyze_vlans_by_id(vlans)
     else:
-        analyzer.analyze_all()
+        analyzer.analyze_all(processes)
     ifc_vlan_map = analyzer.add_access_port_vlans()
     update = VlanTopologyUpdater(ifc_vlan_map)
     update()
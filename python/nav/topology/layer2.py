@@ -19,12 +19,15 @@ import logging
 from nav.topology.analyze import Port
 
 from nav.models.manage import Interface, Netbox
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models import Q
 
 
 _logger = logging.getLogger(__name__)
 
+# Maximum number of interfaces to update in a single statement
+UPDATE_BATCH_SIZE = 1000
+
 
 @transaction.atomic()
 def update_layer2_topology(links):
@@ -33,37 +36,56 @@ def update_layer2_topology(links):
     :param links: a list of edges from an adjacency graph
 
     """
-    for source, dest in links:
-        _update_interface_topology(source, dest)
+    _update_interface_topology(links)
 
     touched_ifc_ids = [source[1] for source, _dest in links]
     _clear_topology_for_nontouched(touched_ifc_ids)
     _clear_topology_for_mismatched_state_links()
 
 
-def _update_interface_topology(source_node, dest_node):
-    """Updates topology information for the source_node Interface.
+def _update_interface_topology(links):
+    """Updates topology information for the source Interfaces of links.
 
-    The interface's topology will _only_ be updated if its netbox is up, it is
+    An interface's topology will _only_ be updated if its netbox is up, it is
     administratively up, is not missing, and its current topology information
-    differs from what we want to set it to.
+    differs from what we want to set it to. All changed interfaces are updated
+    using a single statement.
 
     """
-    _netboxid, interfaceid = source_node
-    ifc = Interface.objects.filter(id=interfaceid,
-                                   ifadminstatus=Interface.ADM_UP,
-                                   netbox__up=Netbox.UP_UP,
-                                   gone_since__isnull=True)
-
-    if isinstance(dest_node, Port):
-        kwargs = {'to_netbox': int(dest_node[0]),
-                  'to_interface': int(dest_node[1])}
-    else:
-        kwargs = {'to_netbox': int(dest_node),
-                  'to_interface': None}
-
-    ifc = ifc.exclude(**kwargs)
-    ifc.update(**kwargs)
+    wanted = {}
+    for (_netboxid, interfaceid), dest_node in links:
+        if isinstance(dest_node, Port):
+            wanted[int(interfaceid)] = (int(dest_node[0]), int(dest_node[1]))
+        else:
+            wanted[int(interfaceid)] = (int(dest_node), None)
+
+    current = Interface.objects.filter(
+        id__in=list(wanted),
+        ifadminstatus=Interface.ADM_UP,
+        netbox__up=Netbox.UP_UP,
+        gone_since__isnull=True,
+    ).values_list('id', 'to_netbox_id', 'to_interface_id')
+    changed = [(ifc_id,) + wanted[ifc_id]
+               for ifc_id, to_netbox, to_interface in current
+               if wanted[ifc_id] != (to_netbox, to_interface)]
+    if not changed:
+        return
+
+    _logger.debug("updating layer 2 topology of %d interfaces", len(changed))
+    cursor = connection.cursor()
+    for start in range(0, len(changed), UPDATE_BATCH_SIZE):
+        batch = changed[start:start + UPDATE_BATCH_SIZE]
+        values = ", ".join(["(%s, %s::integer, %s::integer)"] * len(batch))
+        cursor.execute(
+            """
+            UPDATE interface
+            SET to_netboxid = new.to_netboxid,
+                to_interfaceid = new.to_interfaceid
+            FROM (VALUES {values}) AS new(interfaceid, to_netboxid,
+                                          to_interfaceid)
+            WHERE interface.interfaceid = new.interfaceid
+            """.format(values=values),
+            [value for row in batch for value in row])
 
 
 def _clear_topology_for_nontouched(touched_ifc_ids):
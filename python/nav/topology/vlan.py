@@ -16,33 +16,47 @@
 """Analysis of VLAN topology as subset of layer 2 topology"""
 
 import logging
+import multiprocessing
 import networkx as nx
 from IPy import IP
 from django.utils import six
 
 from nav.models.manage import (GwPortPrefix, Interface, SwPortVlan,
-                               SwPortBlocked, Prefix, Vlan)
+                               SwPortAllowedVlan, SwPortBlocked, Prefix, Vlan)
 
 from django.db.models import Q
-from django.db import transaction
+from django.db import connection, connections, transaction
 from itertools import groupby, chain
 from operator import attrgetter
 from collections import defaultdict
 from nav.netmap import stubs
+from nav.topology.cache import fingerprint
 
 _LOGGER = logging.getLogger(__name__)
 NO_TRUNK = Q(trunk=False) | Q(trunk__isnull=True)
+# Maximum number of swportvlan records to delete in a single statement
+DELETE_BATCH_SIZE = 1000
+# The analyzer and VLANs that forked worker processes analyze
+_worker_state = None
 
 
 class VlanGraphAnalyzer(object):
-    """Analyzes VLAN topologies as a subset of the layer 2 topology"""
-    def __init__(self):
+    """Analyzes VLAN topologies as a subset of the layer 2 topology.
+
+    If a TopologyCache is given, the topology of a VLAN is only analyzed if
+    the part of the layer 2 topology it can reach has changed since the
+    previous run.
+
+    """
+    def __init__(self, cache=None):
         self.routed_vlans = self._build_vlan_router_dict()
         self.unrouted_vlans = self._build_unrouted_vlan_seed_dict()
         self.layer2 = build_layer2_graph()
         self.stp_blocked = get_stp_blocked_ports()
         _LOGGER.debug("blocked ports: %r", self.stp_blocked)
         self.ifc_vlan_map = {}
+        self.cache = cache
+        self._component_fingerprints = None
 
     @staticmethod
     def _build_vlan_router_dict():
@@ -63,11 +77,25 @@ class VlanGraphAnalyzer(object):
         return {x for x in Vlan.objects.filter(prefix__isnull=True,
                                                netbox__isnull=False).iterator()}
 
-    def analyze_all(self):
-        """Analyze all VLAN topologies"""
-        for vlan in sorted(self.routed_vlans, key=lambda x: x.vlan):
-            _LOGGER.debug("Analyzing routed VLAN %s", vlan)
-            self.analyze_vlan(vlan)
+    def analyze_all(self, processes=1):
+        """Analyze all VLAN topologies.
+
+        :param processes: The number of processes to analyze routed VLANs
+                          in. When larger than 1, a pool of worker processes
+                          is forked after the layer 2 graph has been built,
+                          and each worker analyzes a share of the routed
+                          VLANs. Unrouted VLANs are always analyzed in this
+                          process, as they depend on the results of the
+                          preceding analyses.
+
+        """
+        routed_vlans = sorted(self.routed_vlans, key=lambda x: x.vlan)
+        if processes > 1:
+            self._analyze_vlans_in_parallel(routed_vlans, processes)
+        else:
+            for vlan in routed_vlans:
+                _LOGGER.debug("Analyzing routed VLAN %s", vlan)
+                self.analyze_vlan(vlan)
         while self.unrouted_vlans:
             vlan = min(self.unrouted_vlans, key=_unrouted_vlan_sort)
             self.unrouted_vlans.remove(vlan)
@@ -89,19 +117,146 @@ class VlanGraphAnalyzer(object):
 
     def analyze_vlan(self, vlan):
         """Analyzes a single vlan"""
+        key = self._get_cache_key(vlan)
+        topology = self._get_cached_topology(key)
+        if topology is None:
+            topology = self._make_topology_analyzer(vlan).analyze()
+            self._cache_topology(key, topology)
+        self._add_vlan_topology(vlan, topology)
+
+    def _analyze_vlans_in_parallel(self, vlans, processes):
+        """Analyzes VLANs that have no cached topology in a pool of forked
+        worker processes.
+
+        """
+        global _worker_state  # pylint: disable=global-statement
+        pending = []
+        for vlan in vlans:
+            key = self._get_cache_key(vlan)
+            topology = self._get_cached_topology(key)
+            if topology is None:
+                pending.append((vlan, key))
+            else:
+                self._add_vlan_topology(vlan, topology)
+        if not pending:
+            return
+
+        _LOGGER.debug("Analyzing %d routed VLANs in %d processes",
+                      len(pending), processes)
+        # Database connections cannot be shared with the forked workers,
+        # each of them must open its own
+        connections.close_all()
+        _worker_state = (self, [vlan for vlan, _key in pending])
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.imap_unordered(
+                _analyze_vlan_in_worker, range(len(pending)),
+                chunksize=max(1, len(pending) // (processes * 4)))
+            interfaces = self._get_interfaces_by_id()
+            for index, directions in results:
+                vlan, key = pending[index]
+                topology = {interfaces[ifc_id]: direction
+                            for ifc_id, direction in directions.items()}
+                self._cache_topology(key, topology)
+                self._add_vlan_topology(vlan, topology)
+        except BaseException:
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+        finally:
+            _worker_state = None
+            pool.join()
+
+    def _make_topology_analyzer(self, vlan):
         if vlan in self.routed_vlans:
-            addr = self.routed_vlans[vlan]
-            analyzer = RoutedVlanTopologyAnalyzer(addr, self.layer2,
-                                                  self.stp_blocked)
+            return RoutedVlanTopologyAnalyzer(self.routed_vlans[vlan],
+                                              self.layer2, self.stp_blocked)
         else:
-            seed_netbox = vlan.netbox
-            analyzer = UnroutedVlanTopologyAnalyzer(vlan, seed_netbox,
-                                                    self.layer2,
-                                                    self.stp_blocked)
-        topology = analyzer.analyze()
+            return UnroutedVlanTopologyAnalyzer(vlan, vlan.netbox,
+                                                self.layer2, self.stp_blocked)
+
+    def _add_vlan_topology(self, vlan, topology):
         self._integrate_vlan_topology(vlan, topology)
         self._prune_unrouted_vlans(vlan, topology)
 
+    def _get_interfaces_by_id(self):
+        """Returns a dict of the Interface objects of the layer 2 graph, keyed
+        by their ids.
+
+        """
+        return {ifc.pk: ifc for _u, _v, ifc in self.layer2.edges(keys=True)}
+
+    def _get_cache_key(self, vlan):
+        if self.cache is None:
+            return None
+        if vlan in self.routed_vlans:
+            addr = self.routed_vlans[vlan]
+            seed = (addr.interface.netbox, addr.interface_id,
+                    addr.interface.to_netbox_id)
+        else:
+            seed = (vlan.netbox, None, None)
+        seed_netbox, seed_ifc_id, to_netbox_id = seed
+        return fingerprint(vlan in self.routed_vlans, vlan.pk, vlan.vlan,
+                           seed_netbox.pk, seed_ifc_id, to_netbox_id,
+                           self._get_component_fingerprint(seed_netbox))
+
+    def _get_cached_topology(self, key):
+        """Returns a cached VLAN topology as a dict of {Interface: direction},
+        or None if there is no usable cached topology.
+
+        """
+        if not key:
+            return None
+        cached = self.cache.get('vlan', key)
+        if cached is None:
+            return None
+        interfaces = self._get_interfaces_by_id()
+        try:
+            return {interfaces[int(ifc_id)]: direction
+                    for ifc_id, direction in cached.items()}
+        except KeyError:
+            return None
+
+    def _cache_topology(self, key, topology):
+        if key:
+            self.cache.set('vlan', key, {str(ifc.pk): direction
+                                         for ifc, direction
+                                         in topology.items()})
+
+    def _get_component_fingerprint(self, netbox):
+        """Returns a fingerprint of all the inputs to a VLAN analysis seeded
+        at netbox, i.e. of the weakly connected component of the layer 2
+        graph that netbox is part of.
+
+        """
+        if self._component_fingerprints is None:
+            self._component_fingerprints = self._fingerprint_components()
+        return self._component_fingerprints.get(netbox)
+
+    def _fingerprint_components(self):
+        access_ports = defaultdict(list)
+        for netboxid, ifcid, vlan in Interface.objects.filter(
+                vlan__isnull=False).filter(NO_TRUNK).values_list(
+                    'netbox_id', 'id', 'vlan'):
+            access_ports[netboxid].append((ifcid, vlan))
+        allowed_vlans = dict(SwPortAllowedVlan.objects.values_list(
+            'interface_id', 'hex_string'))
+
+        fingerprints = {}
+        for nodes in nx.weakly_connected_components(self.layer2):
+            edges = sorted(
+                (source.pk, dest.pk, ifc.pk, ifc.to_interface_id, ifc.vlan,
+                 bool(ifc.trunk), allowed_vlans.get(ifc.pk),
+                 sorted(self.stp_blocked.get(ifc.pk, [])))
+                for source, dest, ifc
+                in self.layer2.subgraph(nodes).edges(keys=True))
+            ports = sorted((node.pk, sorted(access_ports.get(node.pk, [])))
+                           for node in nodes)
+            component = fingerprint(edges, ports)
+            fingerprints.update((node, component) for node in nodes)
+        return fingerprints
+
     def _prune_unrouted_vlans(self, vlan, topology):
         for ifc in topology:
             for cand in list(self.unrouted_vlans):
@@ -149,6 +304,19 @@ class VlanGraphAnalyzer(object):
                 yield ifc, {active_vlans[ifc.vlan]: 'down'}
 
 
+def _analyze_vlan_in_worker(index):
+    """Analyzes a VLAN in a forked worker process.
+
+    :returns: The index of the VLAN and its topology, as a dict of
+              {interfaceid: direction}.
+
+    """
+    analyzer, vlans = _worker_state
+    # pylint: disable=protected-access
+    topology = analyzer._make_topology_analyzer(vlans[index]).analyze()
+    return index, {ifc.pk: direction for ifc, direction in topology.items()}
+
+
 class RoutedVlanTopologyAnalyzer(object):
     """Analyzer of a single routed VLAN topology"""
 
@@ -369,24 +537,44 @@ class VlanTopologyUpdater(object):
 
     @transaction.atomic()
     def update(self):
-        """Updates the VLAN topology in the NAV database"""
+        """Updates the VLAN topology in the NAV database.
+
+        The existing VLAN topology is compared to the new one, and only the
+        differences are written, using bulk inserts, updates and deletes.
+
+        """
+        wanted = {}
         for ifc, vlans in self.ifc_vlan_map.items():
             for vlan, dirstr in vlans.items():
-                self._update_or_create_new_swportvlan_entry(ifc, vlan, dirstr)
-            self._remove_dead_swpvlan_records_for_ifc(ifc)
+                wanted[(ifc.pk, vlan.pk)] = self._direction_from_string(dirstr)
+
+        dead = []
+        changed = defaultdict(list)
+        existing = SwPortVlan.objects.values_list(
+            'id', 'interface_id', 'vlan_id', 'direction')
+        for swpvlan_id, ifc_id, vlan_id, direction in existing.iterator():
+            key = (ifc_id, vlan_id)
+            if key not in wanted:
+                dead.append(swpvlan_id)
+                continue
+            new_direction = wanted.pop(key)
+            if new_direction != direction:
+                changed[new_direction].append(swpvlan_id)
 
-        self._delete_swportvlans_from_untouched_ifcs()
+        self._create_swportvlans(wanted)
+        for direction, ids in changed.items():
+            SwPortVlan.objects.filter(id__in=ids).update(direction=direction)
+        self._delete_swportvlans(dead)
+        self._notify_topology_changed()
 
-    @classmethod
-    def _update_or_create_new_swportvlan_entry(cls, ifc, vlan, dirstr):
-        direction = cls._direction_from_string(dirstr)
-        obj, created = SwPortVlan.objects.get_or_create(
-            interface=ifc, vlan=vlan,
-            defaults={'direction': direction})
-        if not created and obj.direction != direction:
-            obj.direction = direction
-            obj.save()
-        return object
+    @staticmethod
+    def _create_swportvlans(new):
+        if new:
+            _LOGGER.debug("creating %d swpvlan records", len(new))
+            SwPortVlan.objects.bulk_create(
+                SwPortVlan(interface_id=ifc_id, vlan_id=vlan_id,
+                           direction=direction)
+                for (ifc_id, vlan_id), direction in new.items())
 
     DIRECTION_MAP = {
         'up': SwPortVlan.DIRECTION_UP,
@@ -401,27 +589,30 @@ class VlanTopologyUpdater(object):
                 if string in cls.DIRECTION_MAP
                 else SwPortVlan.DIRECTION_UNDEFINED)
 
-    def _remove_dead_swpvlan_records_for_ifc(self, ifc):
-        records_for_ifc = SwPortVlan.objects.filter(interface=ifc)
-        active_vlans = self.ifc_vlan_map[ifc].keys()
-        dead = records_for_ifc.exclude(vlan__in=active_vlans)
-        dead.delete()
-
-    def _delete_swportvlans_from_untouched_ifcs(self):
-        """Deletes old swportvlan entries that weren't touched by this update"""
-        # this can turn into a rather huge, and surprisingly inefficient SQL
-        # statement if we let PostgreSQL do all the work, so we calculate the
-        # set difference using Python instead
-        touched_interfaceids = set(ifc.pk for ifc in self.ifc_vlan_map)
-        existing_interfaceids = set(
-            SwPortVlan.objects.distinct().values_list('interface__id',
-                                                      flat=True)
-        )
-        to_delete = existing_interfaceids.difference(touched_interfaceids)
-        if to_delete:
-            _LOGGER.debug("deleting obsolete swpvlan records for these ifcs: "
-                          "%s", to_delete)
-            SwPortVlan.objects.filter(interface__id__in=to_delete).delete()
+    @staticmethod
+    def _delete_swportvlans(dead):
+        """Deletes swportvlan records that are no longer part of the VLAN
+        topology.
+
+        """
+        # Deleting in batches of explicit ids avoids the huge and surprisingly
+        # inefficient SQL statements we would get by letting PostgreSQL
+        # calculate the set difference
+        if dead:
+            _LOGGER.debug("deleting %d obsolete swpvlan records", len(dead))
+        for start in range(0, len(dead), DELETE_BATCH_SIZE):
+            batch = dead[start:start + DELETE_BATCH_SIZE]
+            SwPortVlan.objects.filter(id__in=batch).delete()
+
+    @staticmethod
+    def _notify_topology_changed():
+        """Notifies listeners, such as the event engine, that the VLAN
+        topology has changed. The notification is delivered by PostgreSQL
+        once the update transaction is committed.
+
+        """
+        cursor = connection.cursor()
+        cursor.execute('NOTIFY topology_changed')
 
 
 def build_layer2_graph(related_extra=None):
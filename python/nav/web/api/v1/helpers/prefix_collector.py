@@ -47,10 +47,16 @@ class UsageResult(object):
 
 
 def fetch_usages(prefixes, starttime, endtime):
-    """Fetch usage for a list of prefixes"""
+    """Fetch usage for a list of prefixes.
+
+    The active addresses of all the prefixes are counted using a single
+    database query.
+    """
     if prefixes is None:
         prefixes = []
-    return [fetch_usage(prefix, starttime, endtime) for prefix in prefixes]
+    active = collect_active_ips(prefixes, starttime, endtime)
+    return [UsageResult(prefix, active[prefix.pk], starttime, endtime)
+            for prefix in prefixes]
 
 
 def fetch_usage(prefix, starttime, endtime):
@@ -82,26 +88,47 @@ def collect_active_ip(prefix, starttime=None, endtime=None):
 
     :returns: int -- an integer representing the active addresses
     """
+    return collect_active_ips([prefix], starttime, endtime)[prefix.pk]
 
-    cursor = connection.cursor()
-    basequery = "SELECT COUNT(DISTINCT ip) AS ipcount FROM arp"
-    prefix = prefix.net_address
+
+def collect_active_ips(prefixes, starttime=None, endtime=None):
+    """Collects the number of active ip addresses of several prefixes in a
+    single query, based on optional starttime and endtime
+
+    :param prefixes: the prefixes to find active ip addresses for
+    :type prefixes: list[manage.Prefix]
+
+    :param starttime: see collect_active_ip()
+    :param endtime: see collect_active_ip()
+
+    :returns: dict -- the number of active addresses of each prefix, keyed
+              by prefix id
+    """
+    prefixids = tuple(prefix.pk for prefix in prefixes)
+    if not prefixids:
+        return {}
 
     if starttime and endtime:
-        query = basequery + """
-        WHERE (ip << %s AND (start_time, end_time) OVERLAPS (%s, %s))
-        """
-        cursor.execute(query, (prefix, starttime, endtime))
+        condition = "(arp.start_time, arp.end_time) OVERLAPS (%s, %s)"
+        params = [starttime, endtime]
     elif starttime:
-        query = basequery + """
-        WHERE (ip << %s AND %s BETWEEN start_time AND end_time)
-        """
-        cursor.execute(query, (prefix, starttime))
+        condition = "%s BETWEEN arp.start_time AND arp.end_time"
+        params = [starttime]
     else:
-        query = basequery + """
-        WHERE (ip << %s AND end_time = 'infinity')
-        """
-        cursor.execute(query, (prefix,))
+        condition = "arp.end_time = 'infinity'"
+        params = []
+
+    query = """
+        SELECT prefix.prefixid, COUNT(DISTINCT arp.ip) AS ipcount
+        FROM prefix
+        LEFT JOIN arp ON (arp.ip << prefix.netaddr AND {condition})
+        WHERE prefix.prefixid IN %s
+        GROUP BY prefix.prefixid
+    """.format(condition=condition)
 
-    result = cursor.fetchone()
-    return int(result[0])
+    cursor = connection.cursor()
+    cursor.execute(query, params + [prefixids])
+    result = {prefixid: 0 for prefixid in prefixids}
+    result.update((prefixid, int(count))
+                  for prefixid, count in cursor.fetchall())
+    return result
@@ -801,8 +801,7 @@ class PrefixUsageList(NAVAPIMixin, ListAPIView):
         """Filter for ip family"""
         if 'scope' in self.request.GET:
             queryset = manage.Prefix.objects.within(
-                self.request.GET.get('scope')
-            ).order_by('net_address')
+                self.request.GET.get('scope'))
         elif self.request.GET.get('family'):
             queryset = manage.Prefix.objects.extra(
                 where=['family(netaddr)=%s'],
@@ -810,11 +809,15 @@ class PrefixUsageList(NAVAPIMixin, ListAPIView):
         else:
             queryset = manage.Prefix.objects.all()
 
-        # Filter prefixes that is smaller than minimum prefix length
-        results = [p for p in queryset
-                   if IP(p.net_address).len() >= MINIMUMPREFIXLENGTH]
+        # Filter prefixes that is smaller than minimum prefix length in the
+        # database, so that only a single page of prefixes is ever fetched
+        minimum_host_bits = (MINIMUMPREFIXLENGTH - 1).bit_length()
+        queryset = queryset.extra(
+            where=["masklen(netaddr) <= "
+                   "CASE family(netaddr) WHEN 4 THEN 32 ELSE 128 END - %s"],
+            params=[minimum_host_bits])
 
-        return results
+        return queryset.select_related('vlan').order_by('net_address')
 
     def get_serializer(self, data, *args, **kwargs):
         """Populate the serializer with usages based on the prefix list"""
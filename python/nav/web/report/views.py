@@ -33,7 +33,8 @@ from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.core.paginator import Paginator, InvalidPage
 from django.shortcuts import render
-from django.http import HttpResponse, Http404, HttpResponseRedirect
+from django.http import (HttpResponse, Http404, HttpResponseRedirect,
+                         StreamingHttpResponse)
 from django.utils.six import PY2, iteritems, text_type
 
 from nav.models.manage import Prefix
@@ -272,112 +273,120 @@ def make_report(request, report_name, export_delimiter, query_dict,
     :param paginate: Introduced to be able to toggle display of the paginate
                      elements. Used in the widget rendering.
     """
-    # Initiating variables used when caching
-    report = contents = neg = operator = adv = result_time = None
-
     if not report_name:
         return None
 
+    if export_delimiter:
+        return generate_export(report_name, export_delimiter, query_dict)
+
     # Pagination related variables
-    page_number = query_dict.get('page_number', 1)
-    page_size = get_page_size(request)
+    try:
+        page_number = int(query_dict.get('page_number', 1))
+        page_size = int(get_page_size(request))
+    except ValueError:
+        page_number, page_size = 1, DEFAULT_PAGE_SIZE
 
     query_string = "&".join(["%s=%s" % (x, y)
                              for x, y in iteritems(query_dict)
                              if x != 'page_number'])
 
-    @report_cache((request.account.login, report_name,
-                   os.stat(CONFIG_FILE_PACKAGE).st_mtime,
-                   os.stat(CONFIG_FILE_LOCAL).st_mtime),
-                  query_dict)
-    def _fetch_data_from_db():
-        (report, contents, neg, operator, adv, config, dbresult) = (
-            gen.make_report(report_name, CONFIG_FILE_PACKAGE,
-                            CONFIG_FILE_LOCAL, query_dict, None, None))
-        if not report:
-            raise Http404
-        result_time = strftime("%H:%M:%S", localtime())
-        return report, contents, neg, operator, adv, result_time
-
-    gen = Generator()
+    def _fetch_data_from_db(page):
+        # Only the rows of the requested page are fetched from the database,
+        # so each page is cached separately
+        @report_cache((request.account.login, report_name,
+                       os.stat(CONFIG_FILE_PACKAGE).st_mtime,
+                       os.stat(CONFIG_FILE_LOCAL).st_mtime, page),
+                      query_dict)
+        def _fetch():
+            (report, contents, neg, operator, adv, config, dbresult) = (
+                Generator().make_report(report_name, CONFIG_FILE_PACKAGE,
+                                        CONFIG_FILE_LOCAL, query_dict.copy(),
+                                        None, None, page=page))
+            if not report:
+                raise Http404
+            result_time = strftime("%H:%M:%S", localtime())
+            return report, contents, neg, operator, adv, result_time
+        return _fetch()
+
+    # Only a single page is shown, even when the paginate elements are hidden
+    report, contents, neg, operator, adv, result_time = (
+        _fetch_data_from_db((page_number, page_size)))
+    paginator = Paginator(PageRows(report, page_number, page_size),
+                          page_size)
+    try:
+        page = paginator.page(page_number)
+    except InvalidPage:
+        page_number = 1
+        report, contents, neg, operator, adv, result_time = (
+            _fetch_data_from_db((page_number, page_size)))
+        paginator = Paginator(PageRows(report, page_number, page_size),
+                              page_size)
+        page = paginator.page(page_number)
 
-    report, contents, neg, operator, adv, result_time = _fetch_data_from_db()
+    context = {
+        'heading': 'Report',
+        'result_time': result_time,
+        'report': report,
+        'paginate': paginate,
+        'page': page,
+        'current_page_range': find_page_range(page_number,
+                                              paginator.page_range),
+        'query_string': query_string,
+        'contents': contents,
+        'operator': operator,
+        'neg': neg,
+    }
 
-    if export_delimiter:
-        return generate_export(report, report_name, export_delimiter)
-    else:
+    if report:
+        # A maintainable list of variables sent to the template
+
+        context['operators'] = {
+            'eq': '=',
+            'like': '~',
+            'gt': '&gt;',
+            'lt': '&lt;',
+            'geq': '&gt;=',
+            'leq': '&lt;=',
+            'between': '[:]',
+            'in': '(,,)',
+        }
 
-        paginator = Paginator(report.table.rows, page_size)
-        try:
-            page = paginator.page(page_number)
-        except InvalidPage:
-            page_number = 1
-            page = paginator.page(page_number)
-
-        context = {
-            'heading': 'Report',
-            'result_time': result_time,
-            'report': report,
-            'paginate': paginate,
-            'page': page,
-            'current_page_range': find_page_range(page_number,
-                                                  paginator.page_range),
-            'query_string': query_string,
-            'contents': contents,
-            'operator': operator,
-            'neg': neg,
+        context['operatorlist'] = [
+            'eq', 'like', 'gt', 'lt',
+            'geq', 'leq', 'between', 'in'
+        ]
+
+        context['descriptions'] = {
+            'eq': 'equals',
+            'like': 'contains substring (case-insensitive)',
+            'gt': 'greater than',
+            'lt': 'less than',
+            'geq': 'greater than or equals',
+            'leq': 'less than or equals',
+            'between': 'between (colon-separated)',
+            'in': 'is one of (comma separated)',
         }
 
-        if report:
-            # A maintainable list of variables sent to the template
-
-            context['operators'] = {
-                'eq': '=',
-                'like': '~',
-                'gt': '&gt;',
-                'lt': '&lt;',
-                'geq': '&gt;=',
-                'leq': '&lt;=',
-                'between': '[:]',
-                'in': '(,,)',
-            }
-
-            context['operatorlist'] = [
-                'eq', 'like', 'gt', 'lt',
-                'geq', 'leq', 'between', 'in'
-            ]
-
-            context['descriptions'] = {
-                'eq': 'equals',
-                'like': 'contains substring (case-insensitive)',
-                'gt': 'greater than',
-                'lt': 'less than',
-                'geq': 'greater than or equals',
-                'leq': 'less than or equals',
-                'between': 'between (colon-separated)',
-                'in': 'is one of (comma separated)',
-            }
-
-            context['delimiters'] = (',', ';', ':', '|')
-
-            page_name = report.title or report_name
-            page_link = '/report/{0}'.format(report_name)
-        else:
-            page_name = "Error"
-            page_link = False
+        context['delimiters'] = (',', ';', ':', '|')
 
-        navpath = [('Home', '/'),
-                   ('Report', '/report/'),
-                   (page_name, page_link)]
-        adv_block = bool(adv)
+        page_name = report.title or report_name
+        page_link = '/report/{0}'.format(report_name)
+    else:
+        page_name = "Error"
+        page_link = False
 
-        context.update({
-            'title': 'Report - {0}'.format(page_name),
-            'navpath': navpath,
-            'adv_block': adv_block,
-        })
+    navpath = [('Home', '/'),
+               ('Report', '/report/'),
+               (page_name, page_link)]
+    adv_block = bool(adv)
 
-        return context
+    context.update({
+        'title': 'Report - {0}'.format(page_name),
+        'navpath': navpath,
+        'adv_block': adv_block,
+    })
+
+    return context
 
 
 def get_page_size(request):
@@ -422,34 +431,79 @@ def find_page_range(page_number, page_range, visible_pages=5):
     return page_range[start:end]
 
 
-def generate_export(report, report_name, export_delimiter):
-    """Generates a CSV export version of a report"""
+class PageRows(object):
+    """The table rows of a single page of a report, posing as the rows of the
+    entire report to a Paginator.
+
+    Only the rows of the current page are fetched from the database, so only
+    those rows can be sliced out of a PageRows object.
+
+    """
+    def __init__(self, report, page_number, page_size):
+        self.report = report
+        self.offset = (page_number - 1) * page_size
+
+    def count(self):
+        """Returns the number of rows in the entire report"""
+        return self.report.rowcount
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        start = (key.start or 0) - self.offset
+        stop = key.stop - self.offset if key.stop is not None else None
+        return self.report.table.rows[max(start, 0):stop]
+
+
+def generate_export(report_name, export_delimiter, query_dict):
+    """Generates a CSV export version of a report.
+
+    The rows are streamed from the database using a server side cursor, and
+    written to the client as they are formatted.
+
+    """
     def _cellformatter(cell):
         if PY2 and isinstance(cell.text, text_type):
             return cell.text.encode('utf-8')
         else:
             return cell.text
 
-    response = HttpResponse(content_type="text/x-csv; charset=utf-8")
+    (report, _contents, _neg, _operator, _adv, _config, dbresult) = (
+        Generator().make_report(report_name, CONFIG_FILE_PACKAGE,
+                                CONFIG_FILE_LOCAL, query_dict, None, None,
+                                stream=True))
+    if not report:
+        raise Http404
+
+    writer = csv.writer(_Echo(), delimiter=str(export_delimiter))
+
+    def _write_rows():
+        # Make a list of headers
+        yield writer.writerow(
+            [_cellformatter(cell) for cell in report.table.header.cells])
+        # Write each row of cells. Considers the 'hidden' option from the
+        # config.
+        for row in report.make_rows(dbresult.stream):
+            yield writer.writerow([_cellformatter(cell) for cell in row.cells])
+
+    response = StreamingHttpResponse(
+        _write_rows(), content_type="text/x-csv; charset=utf-8")
     response["Content-Type"] = "application/force-download"
     response["Content-Disposition"] = (
         "attachment; filename=report-%s-%s.csv" %
         (report_name, strftime("%Y%m%d", localtime()))
         )
-    writer = csv.writer(response, delimiter=str(export_delimiter))
+    return response
 
-    # Make a list of headers
-    header_row = [_cellformatter(cell) for cell in report.table.header.cells]
-    writer.writerow(header_row)
 
-    # Make a list of lists containing each cell. Considers the 'hidden' option
-    # from the config.
-    rows = []
-    for row in report.table.rows:
-        rows.append([_cellformatter(cell) for cell in row.cells])
-    writer.writerows(rows)
+class _Echo(object):
+    """A file-like object that returns what is written to it, letting a CSV
+    writer format rows for a streaming response.
 
-    return response
+    """
+    def write(self, value):
+        return value
 
 
 def add_report_widget(request):
@@ -1,6 +1,7 @@
 import os
+import sys
 from glob import glob
-from setuptools import setup, find_packages
+from setuptools import setup, find_packages, Command
 from distutils.command.build import build
 
 TOP_SRCDIR = os.path.abspath(os.path.dirname(__file__))
@@ -22,8 +23,31 @@ def find_scripts():
                 yield candidate
 
 
-# Ensure CSS files are built every time build is invoked
-build.sub_commands = [('build_sass', None)] + build.sub_commands
+class build_smidumps(Command):
+    """Precompiles compact MIB definitions from the built nav.smidumps"""
+    description = "precompile MIB definitions"
+    user_options = []
+
+    def initialize_options(self):
+        pass
+
+    def finalize_options(self):
+        pass
+
+    def run(self):
+        build_lib = self.get_finalized_command('build_py').build_lib
+        sys.path.insert(0, os.path.join(TOP_SRCDIR, 'python'))
+        from nav.smidumps import compile_all
+        directory = os.path.join(build_lib, 'nav', 'smidumps')
+        count = compile_all(directory)
+        self.announce("precompiled %d MIB definitions in %s"
+                      % (count, directory), level=2)
+
+
+# Ensure CSS files are built every time build is invoked, and MIB definitions
+# are precompiled after the Python modules have been built
+build.sub_commands = ([('build_sass', None)] + build.sub_commands +
+                      [('build_smidumps', None)])
 
 
 setup(
@@ -63,5 +87,9 @@ setup(
         },
     },
 
+    cmdclass={
+        'build_smidumps': build_smidumps,
+    },
+
     zip_safe=False,
 )
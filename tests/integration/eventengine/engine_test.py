@@ -0,0 +1,36 @@
+from django.db import connection
+from mock import patch
+
+from nav.eventengine.alerts import AlertGenerator, delete_event
+from nav.eventengine.engine import EventEngine
+from nav.models.event import AlertHistory, AlertQueue, EventQueue
+
+
+def test_failing_event_should_leave_nothing_behind(db, localhost):
+    failing = _make_event(localhost, 'failing')
+    succeeding = _make_event(localhost, 'succeeding')
+    event_ids = [failing.id, succeeding.id]
+
+    def _handle_event(event):
+        AlertGenerator(event).post()
+        if event is failing:
+            # aborts the transaction, unless it is confined to a savepoint
+            connection.cursor().execute("SELECT no_such_column FROM netbox")
+        delete_event(event)
+
+    engine = EventEngine()
+    with patch.object(engine, 'handle_event', side_effect=_handle_event):
+        engine._handle_event_batch([failing, succeeding])
+
+    assert not AlertHistory.objects.filter(subid='failing').exists()
+    assert not AlertQueue.objects.filter(subid='failing').exists()
+    assert AlertHistory.objects.filter(subid='succeeding').exists()
+    assert AlertQueue.objects.filter(subid='succeeding').exists()
+    assert not EventQueue.objects.filter(id__in=event_ids).exists()
+
+
+def _make_event(netbox, subid):
+    event = EventQueue(source_id='ipdevpoll', target_id='eventEngine',
+                       event_type_id='info', netbox=netbox, subid=subid)
+    event.save()
+    return event
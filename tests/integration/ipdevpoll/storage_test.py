@@ -0,0 +1,52 @@
+import datetime
+
+from nav.ipdevpoll.storage import bulk_update
+from nav.models.manage import Arp, Cam, Interface
+
+
+def test_bulk_update_should_set_inet_and_macaddr_columns(db, localhost):
+    arps = [Arp(netbox=localhost, sysname=localhost.sysname,
+                ip='10.0.0.%d' % i, mac='00:00:00:00:00:0%d' % i,
+                end_time=datetime.datetime.max)
+            for i in range(1, 3)]
+    for arp in arps:
+        arp.save()
+        arp.ip = arp.ip.replace('10.0.0.', '10.0.1.')
+        arp.mac = arp.mac.replace('00:00:00', '00:00:01')
+
+    bulk_update(arps, ['ip', 'mac'])
+
+    assert sorted(Arp.objects.filter(netbox=localhost).values_list(
+        'ip', 'mac')) == [('10.0.1.1', '00:00:01:00:00:01'),
+                          ('10.0.1.2', '00:00:01:00:00:02')]
+
+
+def test_bulk_update_should_set_integer_columns_to_null(db, localhost):
+    cam = Cam(netbox=localhost, sysname=localhost.sysname, ifindex=1,
+              port='1', mac='00:00:00:00:00:01',
+              end_time=datetime.datetime.max, miss_count=1)
+    cam.save()
+    cam.miss_count = None
+    cam.ifindex = 2
+
+    bulk_update([cam], ['miss_count', 'ifindex'])
+
+    cam = Cam.objects.get(id=cam.id)
+    assert cam.miss_count is None
+    assert cam.ifindex == 2
+
+
+def test_bulk_update_should_set_macaddr_columns_to_null(db, localhost):
+    interfaces = [Interface(netbox=localhost, ifindex=i, ifname=str(i),
+                            ifphysaddress='00:00:00:00:00:0%d' % i)
+                  for i in range(1, 3)]
+    for interface in interfaces:
+        interface.save()
+    interfaces[0].ifphysaddress = None
+    interfaces[1].ifphysaddress = '00:00:01:00:00:02'
+
+    bulk_update(interfaces, ['ifphysaddress'])
+
+    assert sorted(Interface.objects.filter(netbox=localhost).values_list(
+        'ifname', 'ifphysaddress')) == [('1', None),
+                                        ('2', '00:00:01:00:00:02')]
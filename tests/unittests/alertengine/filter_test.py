@@ -0,0 +1,108 @@
+from unittest import TestCase
+from mock import Mock, patch
+
+from nav.models.profiles import (CompiledFilter, Expression, Filter,
+                                 MatchField, Operator)
+
+
+def make_expression(value_id, operator, value, data_type=MatchField.STRING,
+                    name=''):
+    match_field = MatchField(value_id=value_id, data_type=data_type,
+                             name=name)
+    return Expression(match_field=match_field, operator=operator, value=value)
+
+
+class CompiledFilterTest(TestCase):
+    def setUp(self):
+        self.filter = Filter(id=1, name='test')
+        self.alert = Mock(id=42)
+
+    def compile(self, *expressions):
+        return CompiledFilter(self.filter, expressions)
+
+    def test_empty_filter_should_match(self):
+        compiled = self.compile()
+        self.assertTrue(compiled.verify(self.alert, {}))
+
+    def test_numeric_comparison_should_be_compiled(self):
+        compiled = self.compile(
+            make_expression('alertq.severity', Operator.GREATER, '50'))
+        self.assertEqual(compiled.lookups, set(['severity']))
+        self.assertFalse(compiled.remaining)
+        self.assertTrue(compiled.verify(self.alert, {'severity': 70}))
+        self.assertFalse(compiled.verify(self.alert, {'severity': 50}))
+
+    def test_expressions_should_be_combined_with_and(self):
+        compiled = self.compile(
+            make_expression('alertq.severity', Operator.GREATER, '50'),
+            make_expression('netbox.sysname', Operator.STARTSWITH, 'GW'))
+        self.assertTrue(compiled.verify(
+            self.alert, {'severity': 70, 'netbox__sysname': 'gw.example.org'}))
+        self.assertFalse(compiled.verify(
+            self.alert, {'severity': 70, 'netbox__sysname': 'sw.example.org'}))
+
+    def test_wildcard_should_match_like_pattern(self):
+        compiled = self.compile(
+            make_expression('netbox.sysname', Operator.WILDCARD, 'gw_.%.org'))
+        self.assertTrue(compiled.verify(
+            self.alert, {'netbox__sysname': 'GW1.example.org'}))
+        self.assertFalse(compiled.verify(
+            self.alert, {'netbox__sysname': 'gw.example.org'}))
+
+    def test_in_should_match_any_value(self):
+        compiled = self.compile(
+            make_expression('alerttype.alerttype', Operator.IN,
+                            'boxDown|boxUp'))
+        self.assertTrue(compiled.verify(
+            self.alert, {'alert_type__name': 'boxUp'}))
+        self.assertFalse(compiled.verify(
+            self.alert, {'alert_type__name': 'boxShadow'}))
+
+    def test_ip_in_should_match_contained_address(self):
+        compiled = self.compile(
+            make_expression('netbox.ip', Operator.IN, '10.0.0.0/8|fe80::/64',
+                            data_type=MatchField.IP))
+        self.assertTrue(compiled.verify(self.alert, {'netbox__ip': '10.1.2.3'}))
+        self.assertFalse(compiled.verify(
+            self.alert, {'netbox__ip': '192.168.0.1'}))
+        self.assertFalse(compiled.verify(self.alert, {'netbox__ip': None}))
+
+    def test_not_equal_should_match_missing_value(self):
+        compiled = self.compile(
+            make_expression('netbox.sysname', Operator.NOT_EQUAL, 'gw'))
+        self.assertTrue(compiled.verify(self.alert, {'netbox__sysname': None}))
+        self.assertFalse(compiled.verify(
+            self.alert, {'netbox__sysname': 'gw'}))
+
+    def test_multiple_not_equals_should_exclude_like_orm(self):
+        compiled = self.compile(
+            make_expression('alertq.severity', Operator.NOT_EQUAL, '50'),
+            make_expression('netbox.sysname', Operator.NOT_EQUAL, 'gw'))
+        self.assertTrue(compiled.verify(
+            self.alert, {'severity': 50, 'netbox__sysname': 'sw'}))
+        self.assertFalse(compiled.verify(
+            self.alert, {'severity': 50, 'netbox__sysname': 'gw'}))
+
+    def test_multi_valued_lookup_should_be_verified_using_sql(self):
+        module = make_expression('module.module', Operator.EQUALS, '1')
+        compiled = self.compile(
+            make_expression('alertq.severity', Operator.GREATER, '50'),
+            module)
+        self.assertEqual(compiled.remaining, [module])
+        with patch.object(Filter, 'verify', return_value=True) as verify:
+            self.assertFalse(compiled.verify(self.alert, {'severity': 10}))
+            self.assertFalse(verify.called)
+            self.assertTrue(compiled.verify(self.alert, {'severity': 70}))
+            verify.assert_called_once_with(self.alert, [module])
+
+    def test_string_ordering_should_be_verified_using_sql(self):
+        compiled = self.compile(
+            make_expression('netbox.sysname', Operator.GREATER, 'a'))
+        self.assertEqual(len(compiled.remaining), 1)
+        self.assertFalse(compiled.predicates)
+
+    def test_equalities_should_contain_values_of_in_expressions(self):
+        compiled = self.compile(
+            make_expression('alertq.severity', Operator.IN, '50|70'),
+            make_expression('netbox.sysname', Operator.STARTSWITH, 'gw'))
+        self.assertEqual(compiled.equalities, {'severity': set([50, 70])})
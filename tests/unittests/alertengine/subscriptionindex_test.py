@@ -0,0 +1,72 @@
+from unittest import TestCase
+from mock import Mock
+
+from nav.alertengine.base import SubscriptionIndex
+
+
+def make_content(filter_id, include=True, positive=True):
+    return Mock(filter=Mock(id=filter_id), include=include, positive=positive)
+
+
+class FakeEvaluator(object):
+    def __init__(self, equalities, attributes):
+        self.equalities = equalities
+        self.attributes = attributes
+
+    def get_compiled(self, filtr):
+        return Mock(equalities=self.equalities.get(filtr.id, {}))
+
+    def get_attributes(self, alert, lookups=()):
+        return self.attributes[alert.id]
+
+
+class SubscriptionIndexTest(TestCase):
+    def setUp(self):
+        self.evaluator = FakeEvaluator(
+            equalities={
+                1: {'event_type': set(['boxState'])},
+                2: {'event_type': set(['moduleState']), 'severity': set([50])},
+            },
+            attributes={
+                100: {'event_type': 'boxState', 'severity': 50},
+                101: {'event_type': 'moduleState', 'severity': 50},
+                102: {'event_type': 'linkState', 'severity': 10},
+            })
+        self.box_sub = ('box', [make_content(1)])
+        self.module_sub = ('module', [make_content(2)])
+        self.accounts = [
+            ('alice', [self.box_sub, self.module_sub], []),
+            ('bob', [self.module_sub], []),
+        ]
+
+    def get_candidates(self, alert_id, accounts=None):
+        index = SubscriptionIndex(accounts or self.accounts, self.evaluator)
+        return index.get_candidates(Mock(id=alert_id))
+
+    def test_alert_should_only_get_matching_candidates(self):
+        self.assertEqual(self.get_candidates(100),
+                         [('alice', [self.box_sub], [])])
+
+    def test_candidates_should_keep_account_order(self):
+        self.assertEqual(self.get_candidates(101),
+                         [('alice', [self.module_sub], []),
+                          ('bob', [self.module_sub], [])])
+
+    def test_alert_without_matching_subscriptions_should_get_none(self):
+        self.assertEqual(self.get_candidates(102), [])
+
+    def test_inverted_filters_should_be_candidates_for_all_alerts(self):
+        inverted = ('inverted', [make_content(1, positive=False)])
+        self.assertEqual(self.get_candidates(102, [('carol', [inverted], [])]),
+                         [('carol', [inverted], [])])
+
+    def test_unindexable_filters_should_be_candidates_for_all_alerts(self):
+        unindexable = ('severe', [make_content(1), make_content(3)])
+        self.assertEqual(
+            self.get_candidates(102, [('carol', [unindexable], [])]),
+            [('carol', [unindexable], [])])
+
+    def test_exclusive_contents_should_not_affect_indexing(self):
+        excluding = ('excluding', [make_content(1), make_content(3, False)])
+        self.assertEqual(
+            self.get_candidates(102, [('carol', [excluding], [])]), [])
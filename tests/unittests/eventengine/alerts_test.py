@@ -1,8 +1,15 @@
 from unittest import TestCase
 import datetime
+import os
+import shutil
+import tempfile
+
+from mock import Mock, patch
+
 from nav.models.event import EventQueue as Event, Subsystem, EventType
 from nav.models.manage import Netbox, Device
-from nav.eventengine.alerts import AlertGenerator
+from nav.eventengine.alerts import (AlertGenerator, AlertBatch, delete_event,
+                                    TemplateRegistry)
 
 
 class MockedAlertGenerator(AlertGenerator):
@@ -65,3 +72,102 @@ class AlertHistoryFromEventTests(AlertFromEventBase):
         self.event.state = self.event.STATE_END
         alert = MockedAlertGenerator(self.event)
         self.assertTrue(alert.make_alert_history() is None)
+
+
+class AlertBatchTests(AlertFromEventBase):
+    def setUp(self):
+        super(AlertBatchTests, self).setUp()
+        self.generator = MockedAlertGenerator(self.event)
+        self.event.id = 42
+        self.event.delete = Mock()
+        self.generator._make_alert_messages = Mock(return_value=[])
+
+    def test_alerts_should_not_be_saved_until_batch_is_flushed(self):
+        with patch('nav.eventengine.alerts.Alert.save') as save:
+            with AlertBatch() as batch:
+                batch.flush = Mock()
+                self.generator.post_alert()
+                self.assertFalse(save.called)
+            self.assertTrue(batch.flush.called)
+
+    def test_deleted_event_should_appear_deleted_immediately(self):
+        with AlertBatch() as batch:
+            batch.flush = Mock()
+            delete_event(self.event)
+            self.assertFalse(self.event.id)
+        self.assertFalse(self.event.delete.called)
+
+    def test_rollback_should_restore_deleted_event(self):
+        with AlertBatch() as batch:
+            batch.flush = Mock()
+            mark = batch.mark()
+            delete_event(self.event)
+            batch.rollback(mark)
+        self.assertEqual(self.event.id, 42)
+
+    def test_flush_should_delete_events_in_bulk(self):
+        with patch('nav.eventengine.alerts.Event.objects') as objects:
+            with AlertBatch():
+                delete_event(self.event)
+            objects.filter.assert_called_once_with(id__in=[42])
+            objects.filter.return_value.delete.assert_called_once_with()
+
+    def test_delete_event_should_delete_immediately_without_batch(self):
+        delete_event(self.event)
+        self.assertTrue(self.event.delete.called)
+
+
+class TemplateRegistryTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, 'boxState'))
+        self.write('boxState/boxDown-email.txt', 'down {{ sysname }}')
+        self.write('boxState/boxDown-sms.no.txt', 'nede')
+        self.write('boxState/README', 'not a template')
+        self.registry = TemplateRegistry(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        with open(os.path.join(self.directory, name), 'w') as output:
+            output.write(content)
+
+    def test_should_find_templates_for_alert_type(self):
+        templates = self.registry.get_templates('boxState', 'boxDown')
+        details = sorted(details for details, _template in templates)
+        self.assertEqual(
+            [(d.name, d.msgtype, d.language) for d in details],
+            [('boxState/boxDown-email.txt', 'email', 'en'),
+             ('boxState/boxDown-sms.no.txt', 'sms', 'no')])
+
+    def test_should_find_details_without_compiling_templates(self):
+        details = self.registry.get_details('boxState', 'boxDown')
+        self.assertEqual(len(details), 2)
+        self.assertEqual(self.registry._compiled, {})
+
+    def test_should_render_compiled_template(self):
+        details, template = [
+            t for t in self.registry.get_templates('boxState', 'boxDown')
+            if t[0].msgtype == 'email'][0]
+        self.assertEqual(template.render({'sysname': 'gw'}), 'down gw')
+
+    def test_should_only_compile_templates_once(self):
+        first = self.registry.get_templates('boxState', 'boxDown')
+        second = self.registry.get_templates('boxState', 'boxDown')
+        self.assertEqual([t for _d, t in first], [t for _d, t in second])
+
+    def test_should_not_find_templates_for_unknown_event_type(self):
+        self.assertEqual(self.registry.get_templates('fooState'), [])
+
+    def test_should_reload_when_templates_are_added(self):
+        self.registry.get_templates('boxState', 'boxUp')
+        self.write('boxState/boxUp-email.txt', 'up')
+        self.registry._last_check = None
+        self.assertEqual(
+            len(self.registry.get_templates('boxState', 'boxUp')), 1)
+
+    def test_should_not_rescan_within_check_interval(self):
+        self.registry.get_templates('boxState', 'boxUp')
+        self.write('boxState/boxUp-email.txt', 'up')
+        self.assertEqual(self.registry.get_templates('boxState', 'boxUp'), [])
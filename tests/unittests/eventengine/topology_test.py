@@ -0,0 +1,87 @@
+from mock import Mock, patch
+import networkx
+import pytest
+
+from nav.eventengine import topology
+
+
+class FakeNetbox(object):
+    UP_UP = 'y'
+    UP_DOWN = 'n'
+
+    def __init__(self, name, up=UP_UP, vlan=None, router=None):
+        self.name = name
+        self.ip = '10.0.0.1'
+        self.up = up
+        self.prefix = None
+        if router:
+            port = Mock()
+            port.interface.netbox = router
+            self.prefix = Mock(vlan=vlan, vlan_id=vlan)
+            self.prefix.get_router_ports.return_value = [port]
+
+    def get_prefix(self):
+        return self.prefix
+
+    def __repr__(self):
+        return self.name
+
+
+@pytest.fixture
+def vlan_graph():
+    """router - switch - (box1, box2)"""
+    router = FakeNetbox('router')
+    switch = FakeNetbox('switch', up=FakeNetbox.UP_DOWN)
+    boxes = [FakeNetbox('box%d' % i, up=FakeNetbox.UP_DOWN, vlan=10,
+                        router=router)
+             for i in (1, 2)]
+    graph = networkx.MultiGraph()
+    graph.add_edge(router, switch)
+    for box in boxes:
+        graph.add_edge(switch, box)
+
+    with patch.object(topology, 'build_graph_for_vlan',
+                      return_value=graph) as build, \
+            patch.object(topology, 'refresh_netbox_states'), \
+            patch.object(topology.NAVServer, 'make_for', return_value=None):
+        yield build, switch, boxes
+    topology.invalidate_graph_cache()
+
+
+def test_netboxes_appear_reachable_should_build_one_graph_per_vlan(vlan_graph):
+    build, _switch, boxes = vlan_graph
+    assert topology.netboxes_appear_reachable(boxes) == {
+        boxes[0]: False,
+        boxes[1]: False,
+    }
+    assert build.call_count == 1
+
+
+def test_netboxes_appear_reachable_through_up_switch(vlan_graph):
+    _build, switch, boxes = vlan_graph
+    switch.up = switch.UP_UP
+    assert all(topology.netboxes_appear_reachable(boxes).values())
+
+
+def test_get_graph_for_vlan_should_return_modifiable_copy(vlan_graph):
+    build, switch, _boxes = vlan_graph
+    graph = topology.get_graph_for_vlan(10)
+    graph.remove_node(switch)
+    assert switch in topology.get_graph_for_vlan(10)
+    assert build.call_count == 1
+
+
+def test_invalidate_graph_cache_should_cause_rebuild(vlan_graph):
+    build, _switch, _boxes = vlan_graph
+    topology.get_graph_for_vlan(10)
+    topology.invalidate_graph_cache(10)
+    topology.get_graph_for_vlan(10)
+    assert build.call_count == 2
+
+
+def test_expired_graph_should_be_rebuilt(vlan_graph):
+    build, _switch, _boxes = vlan_graph
+    topology.get_graph_for_vlan(10)
+    with patch.object(topology, 'GRAPH_CACHE_TTL', -1):
+        topology.get_graph_for_vlan(10)
+    assert build.call_count == 2
@@ -0,0 +1,50 @@
+from mock import Mock, patch
+import pytest
+
+from nav.eventengine import unresolved
+
+
+def make_alert(pk, key, is_open=True):
+    alert = Mock(pk=pk)
+    alert.get_key.return_value = key
+    alert.is_open.return_value = is_open
+    return alert
+
+
+@pytest.fixture
+def alert_map():
+    alerts = [make_alert(1, (1, None, 'boxState'))]
+    with patch('nav.eventengine.unresolved.AlertHistory.objects') as objects:
+        objects.filter.return_value = alerts
+        unresolved.update()
+        yield unresolved.get_map()
+    unresolved.invalidate()
+
+
+def test_register_should_add_open_alert(alert_map):
+    alert = make_alert(2, (2, None, 'boxState'))
+    unresolved.register(alert)
+    assert unresolved.get_map()[(2, None, 'boxState')] is alert
+
+
+def test_register_should_remove_resolved_alert(alert_map):
+    unresolved.register(make_alert(1, (1, None, 'boxState'), is_open=False))
+    assert (1, None, 'boxState') not in unresolved.get_map()
+
+
+def test_register_should_not_remove_other_alert_with_same_key(alert_map):
+    unresolved.register(make_alert(3, (1, None, 'boxState'), is_open=False))
+    assert (1, None, 'boxState') in unresolved.get_map()
+
+
+def test_update_if_stale_should_not_reload_fresh_map(alert_map):
+    with patch('nav.eventengine.unresolved.update') as update:
+        unresolved.update_if_stale()
+        assert not update.called
+
+
+def test_update_if_stale_should_reload_invalidated_map(alert_map):
+    unresolved.invalidate()
+    with patch('nav.eventengine.unresolved.update') as update:
+        unresolved.update_if_stale()
+        assert update.called
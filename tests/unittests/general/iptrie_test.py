@@ -0,0 +1,54 @@
+from IPy import IP
+
+from nav.iptrie import PrefixTrie
+
+
+def _make_trie():
+    return PrefixTrie([
+        ('10.0.0.0/8', 'big'),
+        ('10.0.1.0/24', 'small'),
+        ('10.0.1.128/25', 'smaller'),
+        ('2001:db8::/32', 'v6 big'),
+        ('2001:db8:1234::/48', 'v6 small'),
+    ])
+
+
+def test_should_return_longest_match():
+    trie = _make_trie()
+    assert trie.longest_match('10.0.1.1') == 'small'
+    assert trie.longest_match('10.0.1.200') == 'smaller'
+    assert trie.longest_match('10.42.0.1') == 'big'
+
+
+def test_should_match_ipv6_addresses():
+    trie = _make_trie()
+    assert trie.longest_match(IP('2001:db8:1234::1')) == 'v6 small'
+    assert trie.longest_match(IP('2001:db8:4321::1')) == 'v6 big'
+
+
+def test_should_return_default_on_no_match():
+    trie = _make_trie()
+    assert trie.longest_match('192.0.2.1') is None
+    assert trie.longest_match('2001:db9::1', 'nope') == 'nope'
+
+
+def test_should_not_mix_address_families():
+    trie = PrefixTrie([('::/0', 'v6')])
+    assert trie.longest_match('10.0.0.1') is None
+
+
+def test_network_should_only_match_prefixes_containing_all_of_it():
+    trie = _make_trie()
+    assert trie.longest_match('10.0.1.0/24') == 'small'
+    assert trie.longest_match('10.0.0.0/16') == 'big'
+
+
+def test_default_route_should_match_everything():
+    trie = PrefixTrie([('0.0.0.0/0', 'default')])
+    assert trie.longest_match('192.0.2.1') == 'default'
+
+
+def test_adding_same_prefix_twice_should_replace_value():
+    trie = PrefixTrie([('10.0.0.0/8', 'old'), ('10.0.0.0/8', 'new')])
+    assert len(trie) == 1
+    assert trie.longest_match('10.0.0.1') == 'new'
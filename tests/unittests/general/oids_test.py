@@ -0,0 +1,37 @@
+import pytest
+
+from nav.oids import OID, SuffixParser
+
+PREFIX = '.1.3.6.1.2.1.17.4.3.1.1'
+
+
+@pytest.fixture
+def parser():
+    return SuffixParser(PREFIX)
+
+
+@pytest.mark.parametrize('oid', [
+    PREFIX + '.0.17.164.12.34.56',
+    PREFIX[1:] + '.0.17.164.12.34.56',
+    OID(PREFIX + '.0.17.164.12.34.56'),
+    tuple(OID(PREFIX + '.0.17.164.12.34.56')),
+])
+def test_parse_should_return_suffix(parser, oid):
+    suffix = parser.parse(oid)
+    assert suffix == OID('.0.17.164.12.34.56')
+    assert isinstance(suffix, OID)
+
+
+@pytest.mark.parametrize('oid', [
+    PREFIX,
+    PREFIX + '0.1',
+    '.1.3.6.1.2.1.17.4.3.1.2.1',
+    OID(PREFIX),
+    OID('.1.3.6.1.2.1.17.4.3.1.2.1'),
+])
+def test_parse_should_return_none_for_oids_outside_prefix(parser, oid):
+    assert parser.parse(oid) is None
+
+
+def test_oid_should_not_have_instance_dict():
+    assert not hasattr(OID('.1.3.6'), '__dict__')
@@ -0,0 +1,108 @@
+import os
+import shutil
+
+from mock import Mock
+import pytest
+
+from nav import smidumps
+from nav.mibs import mibretriever
+from nav.oids import OID
+
+
+@pytest.fixture
+def registry():
+    modules = dict(mibretriever.MibRetrieverMaker.modules)
+    yield
+    mibretriever.MibRetrieverMaker.modules.clear()
+    mibretriever.MibRetrieverMaker.modules.update(modules)
+
+
+@pytest.fixture
+def dumpdir(tmpdir):
+    for name in ('if_mib', 'etherlike_mib'):
+        shutil.copy(os.path.join(smidumps.DUMP_DIR, name + '.py'),
+                    str(tmpdir))
+    yield str(tmpdir)
+    smidumps._index.pop(str(tmpdir), None)
+
+
+def test_compact_should_strip_descriptions():
+    mib = smidumps.compact(smidumps.read_dump(
+        os.path.join(smidumps.DUMP_DIR, 'if_mib.py')))
+    assert 'imports' not in mib
+    assert 'description' not in mib['nodes']['ifDescr']
+    assert mib['nodes']['ifDescr']['oid'] == '1.3.6.1.2.1.2.2.1.2'
+    assert mib['nodes']['ifDescr']['syntax']['type']['basetype'] == \
+        'OctetString'
+
+
+def test_compact_should_keep_nodes_named_like_stripped_keys():
+    mib = {'nodes': {'description': {'oid': '1.2.3',
+                                     'description': 'text'}}}
+    expected = {'nodes': {'description': {'oid': '1.2.3'}}}
+    assert smidumps.compact(mib) == expected
+
+
+def test_compile_all_should_write_compiled_mibs_and_index(dumpdir):
+    assert smidumps.compile_all(dumpdir) == 2
+    assert sorted(os.listdir(dumpdir)) == [
+        'etherlike_mib.pickle', 'etherlike_mib.py',
+        'if_mib.pickle', 'if_mib.py',
+        'index.pickle',
+    ]
+    assert smidumps.get_module_name('if_mib', dumpdir) == 'IF-MIB'
+
+
+def test_load_mib_should_prefer_compiled_mib(dumpdir):
+    smidumps.compile_all(dumpdir)
+    os.remove(os.path.join(dumpdir, 'if_mib.py'))
+    mib = smidumps.load_mib('if_mib', dumpdir)
+    assert mib['moduleName'] == 'IF-MIB'
+
+
+def test_load_mib_should_ignore_outdated_compiled_mib(dumpdir):
+    smidumps.compile_all(dumpdir)
+    compiled = os.path.join(dumpdir, 'if_mib.pickle')
+    with open(compiled, 'wb') as handle:
+        handle.write(b'garbage')
+    os.utime(compiled, (0, 0))
+    assert smidumps.load_mib('if_mib', dumpdir)['moduleName'] == 'IF-MIB'
+
+
+def test_lazy_mib_should_not_load_for_module_name(dumpdir):
+    smidumps.compile_all(dumpdir)
+    mib = smidumps.LazyMib('if_mib', dumpdir)
+    assert mib['moduleName'] == 'IF-MIB'
+    assert not mib.loaded
+    assert 'ifTable' in mib['nodes']
+    assert mib.loaded
+
+
+def test_get_mib_should_return_same_instance():
+    assert smidumps.get_mib('if_mib') is smidumps.get_mib('if_mib')
+
+
+def test_retriever_should_be_prepared_on_first_use(dumpdir, registry):
+    smidumps.compile_all(dumpdir)
+    lazy_mib = smidumps.LazyMib('etherlike_mib', dumpdir)
+
+    class LazyEtherLikeMib(mibretriever.MibRetriever):
+        mib = lazy_mib
+
+    assert not lazy_mib.loaded
+    assert not hasattr(LazyEtherLikeMib, 'get_dot3StatsTable')
+    retriever = LazyEtherLikeMib(Mock())
+    assert lazy_mib.loaded
+    assert 'dot3StatsTable' in retriever.tables
+    assert hasattr(retriever, 'get_dot3StatsTable')
+    assert isinstance(retriever.nodes['dot3StatsDuplexStatus'].oid, OID)
+
+
+def test_retriever_nodes_should_be_available_on_class(dumpdir, registry):
+    lazy_mib = smidumps.LazyMib('etherlike_mib', dumpdir)
+
+    class LazyEtherLikeMib(mibretriever.MibRetriever):
+        mib = lazy_mib
+
+    assert 'dot3StatsDuplexStatus' in LazyEtherLikeMib.nodes
+    assert 'dot3StatsTable' in LazyEtherLikeMib.tables
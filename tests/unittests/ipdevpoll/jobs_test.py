@@ -0,0 +1,118 @@
+from mock import patch
+import pytest
+
+from twisted.internet import defer
+
+from nav.ipdevpoll import Plugin, shadows
+from nav.ipdevpoll.jobs import JobHandler
+
+
+class FakePlugin(Plugin):
+    def __init__(self, name):
+        self.alias = name
+        self.handled = defer.Deferred()
+        self.started = False
+
+    def __repr__(self):
+        return self.alias
+
+    def handle(self):
+        self.started = True
+        return self.handled
+
+
+class IndependentPlugin(FakePlugin):
+    WRITES = ()
+
+
+class NetboxPlugin(FakePlugin):
+    WRITES = (shadows.Netbox,)
+
+
+class NetboxReaderPlugin(FakePlugin):
+    READS = (shadows.Netbox,)
+    WRITES = ()
+
+
+@pytest.fixture
+def handler():
+    handler = JobHandler('testjob', 1)
+    handler._reset_timers()
+    return handler
+
+
+@pytest.fixture
+def max_concurrent_plugins():
+    with patch('nav.ipdevpoll.jobs.JobHandler._get_max_concurrent_plugins',
+               return_value=3) as getter:
+        yield getter
+
+
+def test_independent_plugins_should_run_concurrently(handler,
+                                                     max_concurrent_plugins):
+    plugins = [IndependentPlugin('a'), IndependentPlugin('b')]
+    df = handler._iterate_plugins(plugins)
+    assert all(p.started for p in plugins)
+    for plugin in plugins:
+        plugin.handled.callback(None)
+    assert df.called
+
+
+def test_concurrency_should_be_capped(handler, max_concurrent_plugins):
+    plugins = [IndependentPlugin(name) for name in 'abcd']
+    handler._iterate_plugins(plugins)
+    assert [p.started for p in plugins] == [True, True, True, False]
+    plugins[1].handled.callback(None)
+    assert plugins[3].started
+
+
+def test_undeclared_plugin_should_run_exclusively(handler,
+                                                  max_concurrent_plugins):
+    plugins = [IndependentPlugin('a'), FakePlugin('b'), IndependentPlugin('c')]
+    handler._iterate_plugins(plugins)
+    assert [p.started for p in plugins] == [True, False, False]
+    plugins[0].handled.callback(None)
+    assert [p.started for p in plugins] == [True, True, False]
+    plugins[1].handled.callback(None)
+    assert plugins[2].started
+
+
+def test_reader_should_wait_for_preceding_writer(handler,
+                                                 max_concurrent_plugins):
+    plugins = [NetboxPlugin('a'), NetboxReaderPlugin('b'),
+               IndependentPlugin('c')]
+    handler._iterate_plugins(plugins)
+    assert [p.started for p in plugins] == [True, False, True]
+
+
+def test_failure_should_be_reported_after_running_plugins_are_done(
+        handler, max_concurrent_plugins):
+    plugins = [IndependentPlugin(name) for name in 'abcd']
+    df = handler._iterate_plugins(plugins)
+    plugins[0].handled.errback(ValueError('boom'))
+    assert not df.called
+    plugins[1].handled.callback(None)
+    plugins[2].handled.callback(None)
+    assert not plugins[3].started
+    with pytest.raises(ValueError):
+        df.result.raiseException()
+    df.addErrback(lambda failure: None)
+
+
+def test_plugins_should_run_sequentially_by_default(handler):
+    plugins = [IndependentPlugin('a'), IndependentPlugin('b')]
+    handler._iterate_plugins(plugins)
+    assert [p.started for p in plugins] == [True, False]
+
+
+def test_run_should_use_netbox_snapshot_instead_of_loading_netbox():
+    netbox = shadows.Netbox(id=1, sysname='example-sw.example.org')
+    handler = JobHandler('testjob', 1, netbox_snapshot=netbox)
+    with patch('nav.ipdevpoll.jobs.db.run_in_thread') as run_in_thread, \
+            patch.object(JobHandler, '_create_agentproxy'), \
+            patch.object(JobHandler, '_find_plugins',
+                         return_value=defer.succeed(None)):
+        result = handler.run()
+    assert result.result is False
+    assert handler.netbox is netbox
+    assert not run_in_thread.called
@@ -21,7 +21,7 @@ from IPy import IP
 from twisted.internet import defer
 from twisted.python import failure
 
-from mock import Mock
+from mock import Mock, patch
 import pytest
 
 from nav.mibs.cisco_hsrp_mib import CiscoHSRPMib
@@ -35,6 +35,9 @@ from nav.mibs.ip_mib import IpMib, IndexToIpException
 from nav.mibs.ipv6_mib import Ipv6Mib
 from nav.mibs.entity_mib import EntityMib, parse_dateandtime_tc
 from nav.mibs.snmpv2_mib import Snmpv2Mib
+from nav.mibs.if_mib import IfMib
+from nav.mibs.mibretriever import MibRetrieverError
+from nav.ipdevpoll.snmp.common import SNMP_DEFAULTS
 
 
 class TestIpMib(object):
@@ -164,6 +167,101 @@ class TestCiscoHSRPMib(object):
         assert (IP('10.0.42.1'), 155) in df.result.items()
 
 
+class FakeBulkAgent(object):
+    """A fake AgentProxy that answers GET-BULK requests from a fixed set of
+    varbinds, and records the requests it gets.
+
+    """
+    snmpVersion = 'v2c'
+
+    def __init__(self, varbinds, **params):
+        self.varbinds = sorted((OID(oid), value) for oid, value in varbinds)
+        self.snmp_parameters = SNMP_DEFAULTS._replace(**params)
+        self.requests = []
+
+    def _getbulk(self, nonrepeaters, repetitions, oids):
+        self.requests.append(oids)
+        response = []
+        for index in range(repetitions):
+            for oid in oids:
+                following = [v for v in self.varbinds if v[0] > oid]
+                if len(following) > index:
+                    response.append(following[index])
+        return defer.succeed(response)
+
+
+class TestRetrieveColumns(object):
+    ifName = OID('.1.3.6.1.2.1.31.1.1.1.1')
+    ifAlias = OID('.1.3.6.1.2.1.31.1.1.1.18')
+    varbinds = [
+        (ifName + '1', b'ge-0/0/1'), (ifName + '2', b'ge-0/0/2'),
+        (ifName + '3', b'ge-0/0/3'),
+        (ifAlias + '1', b'uplink'), (ifAlias + '2', b'server'),
+        (ifAlias + '3', b''),
+    ]
+
+    def test_interleaved_columns_should_be_retrieved_completely(self):
+        agent = FakeBulkAgent(self.varbinds, interleaved_columns=True,
+                              max_repetitions=4)
+        df = IfMib(agent).retrieve_columns(['ifName', 'ifAlias'])
+        assert df.called
+        result = df.result
+        assert sorted(result.keys()) == [(1,), (2,), (3,)]
+        assert result[(2,)]['ifName'] == 'ge-0/0/2'
+        assert result[(1,)]['ifAlias'] == 'uplink'
+
+    def test_interleaved_columns_should_share_getbulk_requests(self):
+        agent = FakeBulkAgent(self.varbinds, interleaved_columns=True,
+                              max_repetitions=10)
+        IfMib(agent).retrieve_columns(['ifName', 'ifAlias'])
+        assert len(agent.requests[0]) == 2
+
+    def test_concurrent_columns_should_be_requested_in_parallel(self):
+        agent = Mock(snmp_parameters=SNMP_DEFAULTS._replace(
+            max_concurrent_columns=2))
+        agent.getTable.side_effect = lambda oids: defer.Deferred()
+        with patch('nav.mibs.mibretriever.reactor') as reactor:
+            reactor.callLater.side_effect = lambda delay, func: func()
+            IfMib(agent).retrieve_columns(['ifName', 'ifAlias', 'ifAdminStatus'])
+        assert agent.getTable.call_count == 2
+
+
+class TestRetrieveTableResponses(object):
+    ifName = '.1.3.6.1.2.1.31.1.1.1.1'
+    ifAlias = '.1.3.6.1.2.1.31.1.1.1.18'
+
+    def make_agent(self, varlist):
+        agent = Mock()
+        agent.getTable.side_effect = lambda oids: defer.succeed(
+            {oids[0]: varlist})
+        return agent
+
+    def test_column_should_be_indexed_by_oid_suffixes(self):
+        agent = self.make_agent({
+            self.ifName + '.1': b'ge-0/0/1',
+            self.ifName + '.10': b'ge-0/0/10',
+        })
+        df = IfMib(agent).retrieve_column('ifName')
+        assert df.result == {OID('.1'): 'ge-0/0/1', OID('.10'): 'ge-0/0/10'}
+        assert all(isinstance(index, OID) for index in df.result)
+
+    def test_table_should_be_indexed_by_row_index(self):
+        agent = self.make_agent({
+            self.ifName + '.1': b'ge-0/0/1',
+            self.ifAlias + '.1': b'uplink',
+        })
+        df = IfMib(agent).retrieve_table('ifXTable')
+        assert list(df.result.keys()) == [(1,)]
+        assert df.result[(1,)]['ifName'] == b'ge-0/0/1'
+        assert df.result[(1,)]['ifAlias'] == b'uplink'
+
+    def test_table_should_reject_foreign_oids(self):
+        agent = self.make_agent({'.1.3.6.1.2.1.2.2.1.2.1': b'eth0'})
+        df = IfMib(agent).retrieve_table('ifXTable')
+        with pytest.raises(MibRetrieverError):
+            df.result.raiseException()
+
+
 def test_short_dateandtime_parses_properly():
     parsed = parse_dateandtime_tc(b'\xdf\x07\x05\x0e\x0c\x1e*\x05')
     assert parsed == datetime.datetime(2015, 5, 14, 12, 30, 42, 500000)
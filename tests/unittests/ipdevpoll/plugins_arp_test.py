@@ -1,3 +1,6 @@
+from IPy import IP
+from mock import patch
+
 from nav.ipdevpoll.storage import ContainerRepository
 from nav.ipdevpoll.plugins.arp import ipv6_address_in_mappings, Arp
 
@@ -11,3 +14,17 @@ def test_make_new_mappings_should_not_raise_on_empty_ip():
     a = Arp(None, None, ContainerRepository())
     mappings = [(None, '00:0b:ad:c0:ff:ee')]
     a._make_new_mappings(mappings)
+
+
+@patch.object(Arp, 'prefix_cache', None)
+@patch.object(Arp, 'prefix_cache_prefixes', None)
+def test_find_largest_matching_prefix_should_return_most_precise_prefix():
+    Arp._update_prefix_cache_with_result([
+        {'id': 1, 'net_address': '10.0.0.0/16'},
+        {'id': 2, 'net_address': '10.0.1.0/24'},
+        {'id': 3, 'net_address': '10.0.0.0/8'},
+    ])
+    a = Arp(None, None, ContainerRepository())
+    assert a._find_largest_matching_prefix(IP('10.0.1.1')) == 2
+    assert a._find_largest_matching_prefix(IP('10.0.2.1')) == 1
+    assert a._find_largest_matching_prefix(IP('192.0.2.1')) is None
@@ -0,0 +1,152 @@
+from mock import Mock, patch
+import pytest
+
+from twisted.internet import defer
+
+from nav.ipdevpoll import dataloader, pool, shadows
+
+
+def test_dumped_netbox_should_be_loaded_without_touched_attributes():
+    netbox = shadows.Netbox(id=1, sysname='example-sw.example.org')
+    netbox.snmp_up = True
+    loaded = dataloader.load_dumped_netbox(dataloader.dump_netbox(netbox))
+    assert loaded.id == 1
+    assert loaded.sysname == 'example-sw.example.org'
+    assert loaded.snmp_up
+    assert not loaded.get_touched()
+
+
+class TestWorkerPoolSnapshots(object):
+    def execute(self, netbox_snapshot):
+        workerpool = pool.WorkerPool.__new__(pool.WorkerPool)
+        workerpool.job_costs = pool.JobCostEstimator()
+        with patch.object(pool.WorkerPool, '_execute',
+                          return_value=defer.Deferred()) as execute:
+            workerpool.execute_job('inventory', 1, plugins=['system'],
+                                   interval=3600,
+                                   netbox_snapshot=netbox_snapshot)
+        return execute.call_args[1]
+
+    def test_should_ship_netbox_snapshot_with_job(self):
+        netbox = shadows.Netbox(id=1, sysname='example-sw.example.org')
+        kwargs = self.execute(netbox)
+        assert dataloader.load_dumped_netbox(kwargs['snapshot']).id == 1
+
+    def test_should_not_ship_oversized_snapshot(self):
+        netbox = shadows.Netbox(id=1, sysname='x' * 70000)
+        assert 'snapshot' not in self.execute(netbox)
+
+
+def test_job_responder_should_pass_snapshot_to_job():
+    netbox = shadows.Netbox(id=1, sysname='example-sw.example.org')
+    handler = pool.JobHandler()
+    with patch('nav.ipdevpoll.pool.jobs.JobHandler') as job_handler:
+        job_handler.return_value.run.return_value = defer.succeed(True)
+        handler.execute_job(1, 'inventory', ['system'], 3600, 1,
+                            snapshot=dataloader.dump_netbox(netbox))
+    snapshot = job_handler.call_args[1]['netbox_snapshot']
+    assert snapshot.sysname == 'example-sw.example.org'
+
+
+class TestJobCostEstimator(object):
+    @pytest.fixture
+    def estimator(self):
+        estimator = pool.JobCostEstimator(default=1.0, weight=0.5)
+        estimator.load({(1, 'topo'): 100.0, (2, 'topo'): 300.0,
+                        (1, 'statuscheck'): 2.0})
+        return estimator
+
+    def test_should_estimate_from_history(self, estimator):
+        assert estimator.estimate('topo', 1) == 100.0
+
+    def test_should_estimate_unknown_netbox_from_job_average(self, estimator):
+        assert estimator.estimate('topo', 3) == 200.0
+
+    def test_should_estimate_unknown_job_from_default(self, estimator):
+        assert estimator.estimate('inventory', 1) == 1.0
+
+    def test_update_should_move_estimate_towards_run_time(self, estimator):
+        estimator.update('topo', 1, 200.0)
+        assert estimator.estimate('topo', 1) == 150.0
+
+
+class TestWorkerPoolMonitoring(object):
+    @pytest.fixture
+    def workerpool(self):
+        workerpool = pool.WorkerPool.__new__(pool.WorkerPool)
+        workerpool.workers = set()
+        workerpool.max_jobs = None
+        workerpool.max_worker_memory = 100 * 2**20
+        workerpool.threadpoolsize = None
+        workerpool.job_costs = pool.JobCostEstimator()
+        workerpool.serial = 0
+        workerpool.jobs = {}
+        for slot in range(2):
+            worker = pool.Worker(workerpool, None, None, slot)
+            worker.process = Mock()
+            worker.process.callRemote.side_effect = (
+                lambda *args, **kwargs: defer.Deferred())
+            workerpool.workers.add(worker)
+        with patch.object(pool.WorkerPool, '_spawn_worker') as spawn:
+            workerpool.spawned = spawn
+            yield workerpool
+
+    def get_worker(self, workerpool, slot):
+        return [w for w in workerpool.workers if w.slot == slot][0]
+
+    def test_should_send_job_to_worker_with_least_pending_cost(
+            self, workerpool):
+        workerpool._execute(pool.Job, cost=600.0)
+        workerpool._execute(pool.Job, cost=1.0)
+        workerpool._execute(pool.Job, cost=1.0)
+        busy = [w for w in workerpool.workers if w.pending_cost >= 600.0][0]
+        assert busy.active_jobs == 1
+
+    def test_pending_cost_should_be_reduced_when_job_is_done(
+            self, workerpool):
+        deferred = workerpool._execute(pool.Job, cost=10.0)
+        deferred.callback({})
+        assert all(w.pending_cost == 0.0 for w in workerpool.workers)
+
+    def test_should_replace_worker_using_too_much_memory(self, workerpool):
+        for worker in workerpool.workers:
+            rss = 200 * 2**20 if worker.slot == 1 else 50 * 2**20
+            worker.process.callRemote.side_effect = None
+            worker.process.callRemote.return_value = defer.succeed(
+                {'rss': rss, 'cpu_time': 1.0})
+        with patch.object(pool, 'send_metrics'):
+            workerpool.check_workers()
+        assert self.get_worker(workerpool, 1).retired
+        assert not self.get_worker(workerpool, 0).done()
+        workerpool.spawned.assert_called_once_with(1)
+
+    def test_metrics_should_include_queue_depth_of_ready_workers(
+            self, workerpool):
+        self.get_worker(workerpool, 1).retired = True
+        workerpool._execute(pool.Job, cost=5.0)
+        with patch.object(pool.socket, 'gethostname',
+                          return_value='nav.example.org'):
+            metrics = dict(workerpool.get_metrics())
+        prefix = 'nav.ipdevpoll.nav_example_org.workers.0.'
+        assert metrics[prefix + 'active_jobs'][1] == 1
+        assert metrics[prefix + 'pending_cost'][1] == 5.0
+        assert not any('.workers.1.' in path for path in metrics)
+
+    def test_should_not_monitor_workers_without_positive_interval(
+            self, workerpool):
+        workerpool._monitor = None
+        with patch.object(pool, 'LoopingCall') as looping_call:
+            workerpool.monitor_workers(0)
+        assert not looping_call.called
+        assert workerpool._monitor is None
+
+
+def test_idle_worker_should_stop_on_shutdown():
+    handler = pool.JobHandler()
+    with patch.object(pool.reactor, 'callLater') as call_later:
+        handler.shutdown()
+    assert call_later.called
+
+
+def test_get_rss_should_return_memory_size():
+    assert pool.get_rss() > 0
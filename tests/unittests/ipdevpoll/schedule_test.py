@@ -26,9 +26,11 @@ def test_netbox_job_scheduler_reschedule_on_success(netbox_job_scheduler):
     netbox_job_scheduler.callLater = clock.callLater
     netbox_job_scheduler.start()
     clock.advance(1)
-    pool.execute_job.assert_called_once_with('myjob', 1, plugins=[],
-                                             interval=10)
+    pool.execute_job.assert_called_once_with(
+        'myjob', 1, plugins=[], interval=10,
+        netbox_snapshot=netbox_job_scheduler.netbox)
     clock.advance(10)
     assert pool.execute_job.call_count == 2
-    pool.execute_job.assert_called_with('myjob', 1, plugins=[],
-                                        interval=10)
+    pool.execute_job.assert_called_with(
+        'myjob', 1, plugins=[], interval=10,
+        netbox_snapshot=netbox_job_scheduler.netbox)
@@ -0,0 +1,79 @@
+from mock import Mock, patch
+import pytest
+
+from nav.ipdevpoll import sharedcache
+
+
+@pytest.fixture
+def dataset():
+    loader = Mock(return_value={'aa:bb:cc:dd:ee:ff': 1})
+    with patch.dict(sharedcache._datasets, {'macs': loader}):
+        yield loader
+
+
+@pytest.fixture
+def service(tmpdir, dataset):
+    return sharedcache.SharedCacheService(str(tmpdir))
+
+
+def test_snapshot_should_hold_dataset(service, dataset):
+    version = service.update_snapshot('macs')
+    assert sharedcache._read_snapshot(service.get_path('macs')) == (
+        version, dataset.return_value)
+
+
+def test_version_should_not_change_when_data_is_unchanged(service, dataset):
+    version = service.update_snapshot('macs')
+    dataset.return_value = dict(dataset.return_value)
+    assert service.update_snapshot('macs') == version
+
+
+def test_version_should_change_when_data_changes(service, dataset):
+    version = service.update_snapshot('macs')
+    dataset.return_value = {'aa:bb:cc:dd:ee:ff': 2}
+    assert service.update_snapshot('macs') != version
+
+
+class TestSharedCacheClient(object):
+    @pytest.fixture
+    def client(self, service):
+        def _call_remote(func, *args, **kwargs):
+            return {'version': service.update_snapshot('macs'),
+                    'path': service.get_path('macs')}
+
+        with patch.object(sharedcache.threads, 'blockingCallFromThread',
+                          side_effect=_call_remote) as call:
+            client = sharedcache.SharedCacheClient(Mock())
+            client.calls = call
+            yield client
+
+    def test_should_return_data_from_snapshot(self, client, dataset):
+        local = Mock()
+        assert client.get('macs', local) == dataset.return_value
+        assert not local.called
+
+    def test_should_not_ask_master_again_before_check_interval(self, client):
+        client.get('macs', Mock())
+        client.get('macs', Mock())
+        assert client.calls.call_count == 1
+
+    def test_should_keep_data_when_version_is_unchanged(self, client,
+                                                        dataset):
+        first = client.get('macs', Mock())
+        dataset.return_value = dict(dataset.return_value)
+        with patch.object(sharedcache, 'CHECK_INTERVAL',
+                          sharedcache.timedelta(0)):
+            assert client.get('macs', Mock()) is first
+
+    def test_should_load_locally_when_master_fails(self, client):
+        client.calls.side_effect = RuntimeError("connection lost")
+        local = Mock(return_value={})
+        assert client.get('macs', local) == {}
+        assert local.called
+
+
+def test_shared_function_should_run_locally_without_client():
+    func = Mock(return_value=42)
+    with patch.dict(sharedcache._datasets):
+        shared = sharedcache.shared('answer')(func)
+        assert shared() == 42
@@ -1,4 +1,10 @@
-from nav.ipdevpoll.storage import get_shadow_sort_order
+import datetime
+
+from mock import patch
+
+from nav.models import manage
+from nav.ipdevpoll.storage import (get_shadow_sort_order, ContainerRepository,
+                                   DefaultManager, BulkManager, bulk_update)
 from nav.ipdevpoll import shadows
 
 
@@ -8,3 +14,150 @@ from nav.ipdevpoll import shadows
 def test_netboxinfo_should_always_sort_last():
     classes = get_shadow_sort_order()
     assert classes[-1] is shadows.NetboxInfo
+
+
+def _make_device_repo(*serials):
+    containers = ContainerRepository()
+    for serial in serials:
+        device = containers.factory(serial, shadows.Device)
+        device.serial = serial
+    return containers
+
+
+def _resolve_devices(containers, existing):
+    manager = DefaultManager(shadows.Device, containers)
+    with patch.object(manage.Device, 'objects') as objects:
+        objects.filter.return_value = existing
+        manager.resolve_existing_models()
+    return objects
+
+
+def test_resolve_existing_models_should_use_a_single_query():
+    containers = _make_device_repo('A', 'B', 'C')
+    objects = _resolve_devices(containers, [])
+    assert objects.filter.call_count == 1
+
+
+def test_resolve_existing_models_should_seed_existing_model():
+    containers = _make_device_repo('A', 'B')
+    existing = manage.Device(id=42, serial='A')
+    _resolve_devices(containers, [existing])
+
+    device = containers.get('A', shadows.Device)
+    assert device.get_existing_model() is existing
+    assert device.id == 42
+
+
+def test_unmatched_shadow_should_not_query_for_existing_model():
+    containers = _make_device_repo('A', 'B')
+    _resolve_devices(containers, [manage.Device(id=42, serial='A')])
+
+    device = containers.get('B', shadows.Device)
+    with patch.object(manage.Device, 'objects') as objects:
+        assert device.get_existing_model() is None
+        assert not objects.get.called
+
+
+def test_ambiguous_match_should_be_left_for_lazy_lookup():
+    containers = _make_device_repo('A')
+    _resolve_devices(containers, [manage.Device(id=1, serial='A'),
+                                  manage.Device(id=2, serial='A')])
+
+    device = containers.get('A', shadows.Device)
+    assert not device._cached_existing_model
+    assert not device._cached_nonexistent
+
+
+def test_unresolved_foreign_key_should_be_left_for_lazy_lookup():
+    containers = ContainerRepository()
+    netbox = containers.factory(None, shadows.Netbox)
+    info = containers.factory('foo', shadows.NetboxInfo)
+    info.netbox = netbox
+    info.key = None
+    info.variable = 'foo'
+
+    manager = DefaultManager(shadows.NetboxInfo, containers)
+    with patch.object(manage.NetboxInfo, 'objects') as objects:
+        manager.resolve_existing_models()
+        assert not objects.filter.called
+    assert not info._cached_nonexistent
+
+
+def test_shadow_with_custom_lookup_should_not_be_resolved_in_bulk():
+    containers = ContainerRepository()
+    containers.factory('1', shadows.Vlan)
+    manager = DefaultManager(shadows.Vlan, containers)
+    with patch.object(manage.Vlan, 'objects') as objects:
+        manager.resolve_existing_models()
+        assert not objects.filter.called
+
+
+def _make_arp_repo():
+    containers = ContainerRepository()
+    new = containers.factory('new', shadows.Arp)
+    new.ip = '10.0.0.1'
+    new.mac = '00:00:00:00:00:01'
+
+    expired = containers.factory('expired', shadows.Arp)
+    expired.id = 1
+    expired.end_time = datetime.datetime(2019, 1, 1)
+    expired.set_existing_model(manage.Arp(id=1, ip='10.0.0.2',
+                                          end_time=datetime.datetime.max))
+    return containers
+
+
+@patch('django.db.transaction.Atomic.__enter__')
+@patch('django.db.transaction.Atomic.__exit__', return_value=False)
+def _bulk_save_arps(containers, *_):
+    manager = BulkManager(shadows.Arp, containers)
+    with patch('nav.ipdevpoll.storage.bulk_update') as bulk_update, \
+            patch('nav.ipdevpoll.storage.connection') as connection, \
+            patch.object(manage.Arp, 'objects') as objects:
+        connection.features.can_return_ids_from_bulk_insert = True
+        manager.save()
+    return bulk_update, objects
+
+
+def test_bulk_manager_should_insert_new_objects_in_bulk():
+    containers = _make_arp_repo()
+    _bulk_update, objects = _bulk_save_arps(containers)
+    assert objects.bulk_create.call_count == 1
+    inserted = objects.bulk_create.call_args[0][0]
+    assert [arp.ip for arp in inserted] == ['10.0.0.1']
+
+
+def test_bulk_manager_should_update_changed_objects_in_bulk():
+    containers = _make_arp_repo()
+    bulk_update, _objects = _bulk_save_arps(containers)
+    assert bulk_update.call_count == 1
+    updated, attrs = bulk_update.call_args[0]
+    assert [arp.id for arp in updated] == [1]
+    assert attrs == ('end_time',)
+
+
+def test_bulk_manager_should_clear_touched_attributes_after_save():
+    containers = _make_arp_repo()
+    _bulk_save_arps(containers)
+    for arp in containers[shadows.Arp].values():
+        assert not arp.get_touched()
+
+
+def test_bulk_update_should_update_all_rows_in_one_statement():
+    candidates = [manage.AdjacencyCandidate(id=i, miss_count=i)
+                  for i in range(1, 4)]
+    with patch('nav.ipdevpoll.storage.connection') as connection, \
+            patch.dict('nav.ipdevpoll.storage._column_types', clear=True):
+        connection.ops.quote_name.side_effect = lambda name: '"%s"' % name
+        connection.ops.validate_autopk_value.side_effect = lambda value: value
+        cursor = connection.cursor.return_value
+        cursor.fetchall.return_value = [('adjacency_candidateid', 'integer'),
+                                        ('misscnt', 'integer')]
+        bulk_update(candidates, ['miss_count'])
+
+    assert cursor.execute.call_count == 2
+    sql, params = cursor.execute.call_args[0]
+    assert sql.startswith('UPDATE "adjacency_candidate" AS target '
+                          'SET "misscnt" = changed."misscnt"')
+    row = '(CAST(%s AS integer), CAST(%s AS integer))'
+    assert 'VALUES {0}, {0}, {0}'.format(row) in sql
+    assert params == [1, 1, 2, 2, 3, 3]
@@ -0,0 +1,70 @@
+import pickle
+import socket
+import struct
+
+from mock import Mock, patch
+import pytest
+
+from nav.metrics import carbon
+
+
+METRICS = [('nav.a', (1500000000.5, 1)), ('nav.b', (1500000000, 2.5))]
+
+
+def test_pickle_frame_should_be_length_prefixed():
+    frame = carbon.metrics_to_pickle_frame(METRICS)
+    length, = struct.unpack("!L", frame[:4])
+    assert length == len(frame) - 4
+    assert pickle.loads(frame[4:]) == METRICS
+
+
+@pytest.fixture
+def connection():
+    conn = Mock()
+    with patch('socket.create_connection', return_value=conn) as create:
+        yield create
+
+
+def test_pickle_sender_should_send_normalized_metrics(connection):
+    sender = carbon.PickleSender('localhost', queue_size=10)
+    sender.send(METRICS)
+    frame = connection.return_value.sendall.call_args[0][0]
+    assert pickle.loads(frame[4:]) == [('nav.a', (1500000000, 1.0)),
+                                       ('nav.b', (1500000000, 2.5))]
+    assert sender.sent == 2
+    assert sender.queued == 0
+
+
+def test_pickle_sender_should_keep_metrics_queued_when_send_fails(connection):
+    connection.return_value.sendall.side_effect = socket.error("broken pipe")
+    sender = carbon.PickleSender('localhost', queue_size=10)
+    sender.send(METRICS)
+    assert sender.queued == 2
+    assert sender.sent == 0
+
+
+def test_pickle_sender_should_not_reconnect_too_often(connection):
+    connection.side_effect = socket.error("connection refused")
+    sender = carbon.PickleSender('localhost', queue_size=10)
+    sender.send(METRICS)
+    sender.send(METRICS)
+    assert connection.call_count == 1
+    assert sender.queued == 4
+
+
+def test_pickle_sender_should_drop_oldest_metrics_when_queue_is_full(
+        connection):
+    connection.side_effect = socket.error("connection refused")
+    sender = carbon.PickleSender('localhost', queue_size=3)
+    sender.send(METRICS)
+    sender.send([('nav.c', (1500000000, 3)), ('nav.d', (1500000000, 4))])
+    assert sender.queued == 3
+    assert sender.dropped == 1
+    assert sender._queue[0][0] == 'nav.b'
+
+
+def test_pickle_sender_should_drop_malformed_metrics(connection):
+    sender = carbon.PickleSender('localhost', queue_size=10)
+    sender.send([('nav.a', (1500000000, None))] + METRICS)
+    assert sender.sent == 2
+    assert sender.dropped == 1
@@ -0,0 +1,79 @@
+from mock import Mock, patch
+import pytest
+
+from nav.metrics import lookup
+
+
+def make_netbox(pk, sysname):
+    return Mock(id=pk, sysname=sysname)
+
+
+def make_interface(netbox, ifname, ifdescr=None):
+    return Mock(netbox=netbox, netbox_id=netbox.id, ifname=ifname,
+                ifdescr=ifdescr)
+
+
+@pytest.fixture
+def netboxes():
+    netboxes = [make_netbox(1, 'a-sw.example.org'),
+                make_netbox(2, 'b-sw.example.org')]
+    with patch('nav.metrics.lookup.Netbox.objects') as objects:
+        objects.all.return_value = netboxes
+        yield netboxes
+
+
+@pytest.fixture
+def interfaces(netboxes):
+    a, b = netboxes
+    interfaces = [make_interface(a, 'Gi1/1'), make_interface(a, 'Gi1/2'),
+                  make_interface(b, 'Gi1/1', 'GigabitEthernet1/1')]
+    with patch('nav.metrics.lookup.Interface.objects') as objects:
+        objects.filter.return_value.select_related.return_value = interfaces
+        yield interfaces
+
+
+def test_lookup_many_should_resolve_interfaces(netboxes, interfaces):
+    result = lookup.lookup_many([
+        'nav.devices.a-sw_example_org.ports.Gi1_2.ifInOctets',
+        'nav.devices.b-sw_example_org.ports.Gi1_1.ifInOctets',
+        'nav.devices.b-sw_example_org.ports.GigabitEthernet1_1.ifInErrors',
+        'nav.devices.b-sw_example_org.ports.Gi1_9.ifInOctets',
+    ])
+    assert result == {
+            'nav.devices.a-sw_example_org.ports.Gi1_2.ifInOctets':
+                interfaces[1],
+            'nav.devices.b-sw_example_org.ports.Gi1_1.ifInOctets':
+                interfaces[2],
+            'nav.devices.b-sw_example_org.ports.GigabitEthernet1_1.ifInErrors':
+                interfaces[2],
+            'nav.devices.b-sw_example_org.ports.Gi1_9.ifInOctets': None,
+        }
+
+
+def test_lookup_many_should_query_once_per_handler(netboxes, interfaces):
+    lookup.lookup_many([
+        'nav.devices.a-sw_example_org.ports.Gi1_1.ifInOctets',
+        'nav.devices.b-sw_example_org.ports.Gi1_1.ifInOctets',
+    ])
+    assert lookup.Interface.objects.filter.call_count == 1
+    assert lookup.Netbox.objects.all.call_count == 1
+
+
+def test_lookup_many_should_resolve_devices(netboxes):
+    result = lookup.lookup_many(['nav.devices.a-sw_example_org',
+                                 'nav.devices.b-sw_example_org.system.uptime',
+                                 'nav.devices.c-sw_example_org.system.uptime'])
+    assert result['nav.devices.a-sw_example_org'] is netboxes[0]
+    assert result['nav.devices.b-sw_example_org.system.uptime'] is netboxes[1]
+    assert result['nav.devices.c-sw_example_org.system.uptime'] == \
+        'c-sw_example_org'
+
+
+def test_lookup_many_should_not_resolve_ambiguous_names(netboxes):
+    netboxes.append(make_netbox(3, 'a-sw_example.org'))
+    result = lookup.lookup_many(['nav.devices.a-sw_example_org'])
+    assert result['nav.devices.a-sw_example_org'] is None
+
+
+def test_lookup_many_should_map_unknown_metrics_to_none():
+    assert lookup.lookup_many(['foo.bar']) == {'foo.bar': None}
@@ -1,5 +1,10 @@
+from datetime import timedelta
+
+from mock import patch
 import pytest
 
+from nav.metrics.errors import GraphiteUnreachableError
+from nav.metrics.thresholds import ThresholdEvaluator, get_values_in_bulk
 from nav.metrics.graphs import (extract_series_name,
                                 translate_serieslist_to_regex)
 
@@ -39,3 +44,42 @@ def test_translate_serieslist_to_regex(series, matches, nonmatches):
 
     for string in nonmatches:
         assert not pattern.match(string), "%s matches %s" % (string, series)
+
+
+def test_get_values_in_bulk_should_distribute_tagged_series():
+    evaluators = [ThresholdEvaluator('nav.a.*', raw=True),
+                  ThresholdEvaluator('nav.b.*', raw=True),
+                  ThresholdEvaluator('nav.a.*', raw=True)]
+    response = {'0|nav.a.x': 1.0, '0|nav.a.y': 2.0, '1|nav.b.x': 3.0}
+    with patch('nav.metrics.thresholds.get_metric_average',
+               return_value=response) as get_average:
+        failed = get_values_in_bulk(evaluators)
+
+    assert failed == []
+    assert get_average.call_count == 1
+    targets = get_average.call_args[0][0]
+    assert targets == ['aliasSub(nav.a.*,"^","0|")',
+                       'aliasSub(nav.b.*,"^","1|")']
+    assert sorted(evaluators[0].result) == ['nav.a.x', 'nav.a.y']
+    assert evaluators[2].result == evaluators[0].result
+    assert evaluators[1].result == {'nav.b.x': dict(value=3.0)}
+
+
+def test_get_values_in_bulk_should_batch_by_period_and_size():
+    evaluators = [ThresholdEvaluator('nav.%d' % i, raw=True,
+                                     period=timedelta(minutes=i % 2 + 1))
+                  for i in range(6)]
+    with patch('nav.metrics.thresholds.get_metric_average',
+               return_value={}) as get_average:
+        get_values_in_bulk(evaluators, max_targets=2)
+
+    starts = sorted(call[1]['start'] for call in get_average.call_args_list)
+    assert starts == ['-1min', '-1min', '-2min', '-2min']
+
+
+def test_get_values_in_bulk_should_report_failed_evaluators():
+    evaluators = [ThresholdEvaluator('nav.a', raw=True)]
+    with patch('nav.metrics.thresholds.get_metric_average',
+               side_effect=GraphiteUnreachableError("down")):
+        failed = get_values_in_bulk(evaluators)
+    assert failed == evaluators
@@ -0,0 +1,70 @@
+from mock import Mock, patch
+import pytest
+
+from twisted.internet import task
+
+from nav.metrics import twistedcarbon
+
+
+@pytest.fixture
+def clock():
+    clock = task.Clock()
+    with patch('nav.metrics.twistedcarbon.reactor', clock):
+        yield clock
+
+
+@pytest.fixture
+def sink(clock):
+    sink = twistedcarbon.ReactorSink('localhost', protocol='pickle',
+                                     queue_size=10000)
+    writer = Mock()
+    writer.transport = Mock()
+    sink.connected(writer)
+    return sink
+
+
+def make_metrics(count):
+    return [('nav.metric%d' % i, (1500000000, i)) for i in range(count)]
+
+
+def test_send_should_not_write_immediately(sink, clock):
+    sink.send(make_metrics(10))
+    assert not sink._writer.write_metrics.called
+    clock.advance(0)
+    assert sink._writer.write_metrics.call_count == 1
+    assert sink.sent == 10
+
+
+def test_large_sends_should_be_written_over_several_iterations(sink, clock):
+    sink.send(make_metrics(twistedcarbon.FLUSH_BATCH_SIZE * 2 + 1))
+    sink._flush()
+    assert sink._writer.write_metrics.call_count == 1
+    assert sink.queued == twistedcarbon.FLUSH_BATCH_SIZE + 1
+    clock.advance(0)
+    assert sink._writer.write_metrics.call_count == 3
+    assert sink.queued == 0
+
+
+def test_paused_sink_should_not_write(sink, clock):
+    sink.pauseProducing()
+    sink.send(make_metrics(10))
+    clock.advance(0)
+    assert not sink._writer.write_metrics.called
+    sink.resumeProducing()
+    clock.advance(0)
+    assert sink.sent == 10
+
+
+def test_metrics_should_stay_queued_while_disconnected(sink, clock):
+    sink.disconnected(sink._writer)
+    sink.send(make_metrics(10))
+    clock.advance(0)
+    assert sink.queued == 10
+
+
+def test_full_queue_should_drop_oldest_metrics(clock):
+    sink = twistedcarbon.ReactorSink('localhost', protocol='pickle',
+                                     queue_size=5)
+    sink.send(make_metrics(8))
+    assert sink.queued == 5
+    assert sink.dropped == 3
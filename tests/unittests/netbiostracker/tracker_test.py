@@ -0,0 +1,37 @@
+from mock import patch
+
+from nav.netbiostracker import tracker
+
+
+def test_shards_should_keep_prefixes_together():
+    addresses = (['10.0.1.%d' % i for i in range(1, 4)] +
+                 ['10.0.2.%d' % i for i in range(1, 4)] +
+                 ['10.0.3.%d' % i for i in range(1, 3)])
+    shards = list(tracker.shard_addresses(addresses, shard_size=5))
+    assert shards == [
+        ['10.0.1.1', '10.0.1.2', '10.0.1.3'],
+        ['10.0.2.1', '10.0.2.2', '10.0.2.3', '10.0.3.1', '10.0.3.2'],
+    ]
+
+
+def test_shards_should_split_large_prefixes():
+    addresses = ['10.0.1.%d' % i for i in range(1, 11)]
+    shards = list(tracker.shard_addresses(addresses, shard_size=4))
+    assert [len(shard) for shard in shards] == [4, 4, 2]
+    assert sum(shards, []) == addresses
+
+
+def test_scan_in_parallel_should_parse_results_of_all_shards():
+    def _scan(addresses, bandwidth=None):
+        return '\n'.join(
+            tracker.SPLITCHAR.join([ip, 'NAME', '', '', '00:11:22:33:44:55'])
+            for ip in addresses)
+
+    addresses = ['10.0.%d.1' % i for i in range(10)]
+    with patch.object(tracker, 'scan', side_effect=_scan) as scan:
+        results = list(tracker.scan_in_parallel(
+            addresses, workers=3, bandwidth=3000, shard_size=1))
+
+    assert sorted(result.ip for result in results) == sorted(addresses)
+    assert scan.call_count == 10
+    assert all(call[1]['bandwidth'] == 1000 for call in scan.call_args_list)
@@ -0,0 +1,63 @@
+"""Tests for the report SQL generation"""
+from unittest import TestCase
+
+from nav.report.generator import DEFAULT_LIMIT, ReportConfig
+
+
+class ReportConfigTest(TestCase):
+    def setUp(self):
+        self.config = ReportConfig()
+        self.config.sql = "SELECT sysname, swport FROM netbox"
+        self.config.where = ["sysname ilike %s"]
+        self.config.parameters = ["gw%"]
+        self.config.order_by = ["sysname"]
+
+    def test_make_sql_should_limit_rows_in_query(self):
+        sql, parameters = self.config.make_sql(limit=25, offset=50)
+        self.assertTrue(
+            sql.endswith("ORDER BY sysname,1 LIMIT 25 OFFSET 50"))
+        self.assertEqual(parameters, ["gw%"])
+
+    def test_make_sql_should_order_pages_without_order_by(self):
+        self.config.order_by = []
+        sql, _parameters = self.config.make_sql(limit=25)
+        self.assertTrue(sql.endswith("ORDER BY 1 LIMIT 25"))
+
+    def test_make_sql_should_not_add_sort_key_by_default(self):
+        sql, _parameters = self.config.make_sql()
+        self.assertTrue(sql.endswith("ORDER BY sysname"))
+
+    def test_make_sql_should_not_limit_rows_by_default(self):
+        sql, _parameters = self.config.make_sql()
+        self.assertNotIn("LIMIT", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_make_totals_sql_should_count_and_sum_without_ordering(self):
+        self.config.sum = ["swport"]
+        sql, parameters = self.config.make_totals_sql()
+        self.assertTrue(
+            sql.startswith('SELECT COUNT(*), SUM("swport") FROM'))
+        self.assertIn("WHERE sysname ilike %s", sql)
+        self.assertNotIn("ORDER BY", sql)
+        self.assertEqual(parameters, ["gw%"])
+
+    def test_make_totals_sql_should_quote_summed_columns(self):
+        self.config.sum = ['Port "count"']
+        sql, _parameters = self.config.make_totals_sql()
+        self.assertIn('SUM("Port ""count""")', sql)
+
+    def test_default_window_should_be_limited(self):
+        self.assertEqual(self.config.get_window(), (0, DEFAULT_LIMIT))
+
+    def test_zero_limit_should_give_unlimited_window(self):
+        self.config.limit = "0"
+        self.assertEqual(self.config.get_window(), (0, None))
+
+    def test_page_window_should_be_offset_into_window(self):
+        self.config.offset = "10"
+        self.assertEqual(self.config.get_page_window(3, 25), (60, 25))
+
+    def test_page_window_should_not_exceed_limit(self):
+        self.config.limit = "60"
+        self.assertEqual(self.config.get_page_window(3, 25), (50, 10))
+        self.assertEqual(self.config.get_page_window(4, 25), (75, 0))
@@ -15,7 +15,9 @@
 
 import networkx as nx
 
-from nav.topology.analyze import AdjacencyReducer, Box, Port
+from nav.topology.analyze import (AdjacencyReducer, Box, Port,
+                                  reduce_candidate_graph)
+from nav.topology.cache import TopologyCache
 
 
 class TestAdjecencyReducer(object):
@@ -220,3 +222,47 @@ class TestAdjecencyReducer(object):
         assert not result.has_edge(self.switch_port_b, self.switch_port_a)
         assert result.out_degree(self.switch_port_a) == 1
         assert self.switch_port_b not in result
+
+
+class TestReduceCandidateGraph(object):
+    """Tests for nav.topology.analyze.reduce_candidate_graph"""
+
+    @staticmethod
+    def make_graph():
+        """Two separate pairs of switches, one linked by LLDP, one by CAM"""
+        graph = nx.MultiDiGraph()
+        for offset, source in ((0, "lldp"), (10, "cam")):
+            box_a, box_b = Box(offset + 1), Box(offset + 2)
+            port_a = Port((box_a, offset + 1))
+            port_b = Port((box_b, offset + 2))
+            graph.add_edge(box_a, port_a)
+            graph.add_edge(box_b, port_b)
+            if source == "lldp":
+                graph.add_edge(port_a, port_b, source)
+                graph.add_edge(port_b, port_a, source)
+            else:
+                graph.add_edge(port_a, box_b, source)
+                graph.add_edge(port_b, box_a, source)
+        return graph
+
+    def test_should_give_same_result_as_reducing_entire_graph(self):
+        reducer = AdjacencyReducer(self.make_graph())
+        reducer.reduce()
+        expected = reducer.get_single_edges_from_ports()
+        result = reduce_candidate_graph(self.make_graph())
+        assert sorted(result) == sorted(expected)
+
+    def test_should_reuse_cached_links_of_unchanged_components(self, tmpdir):
+        filename = str(tmpdir.join("cache.json"))
+        cache = TopologyCache(filename)
+        expected = reduce_candidate_graph(self.make_graph(), cache=cache)
+        cache.save()
+
+        cache = TopologyCache(filename).load()
+        graph = self.make_graph()
+        graph.add_edge(Box(21), Port((21, 21)))
+        result = reduce_candidate_graph(graph, cache=cache)
+        assert sorted(result) == sorted(expected)
+        assert all(isinstance(dest, (Box, Port)) for _source, dest in result)
+        assert cache.hits == 2
+        assert cache.misses == 1
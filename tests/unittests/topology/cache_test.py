@@ -0,0 +1,31 @@
+from nav.topology.cache import TopologyCache, fingerprint
+
+
+def test_saved_results_should_be_loaded_by_next_run(tmpdir):
+    filename = str(tmpdir.join("cache.json"))
+    cache = TopologyCache(filename)
+    cache.set("vlan", "key", {"1": "up"})
+    cache.save()
+
+    assert TopologyCache(filename).load().get("vlan", "key") == {"1": "up"}
+
+
+def test_unused_results_should_not_be_saved(tmpdir):
+    filename = str(tmpdir.join("cache.json"))
+    cache = TopologyCache(filename)
+    cache.set("vlan", "unused", {})
+    cache.save()
+    TopologyCache(filename).load().save()
+
+    assert TopologyCache(filename).load().get("vlan", "unused") is None
+
+
+def test_missing_cache_file_should_give_empty_cache(tmpdir):
+    cache = TopologyCache(str(tmpdir.join("missing.json"))).load()
+    assert cache.get("layer2", "key") is None
+    assert cache.misses == 1
+
+
+def test_fingerprint_should_depend_on_inputs():
+    assert fingerprint([1, 2], "a") == fingerprint([1, 2], "a")
+    assert fingerprint([1, 2], "a") != fingerprint([2, 1], "a")
@@ -0,0 +1,73 @@
+from mock import Mock, patch
+import networkx as nx
+import pytest
+
+from nav.topology import vlan
+
+
+class FakeInterface(object):
+    def __init__(self, pk, netbox):
+        self.pk = pk
+        self.netbox = netbox
+
+    def __repr__(self):
+        return "FakeInterface(%r)" % self.pk
+
+
+class FakeTopologyAnalyzer(object):
+    """Sends vlan N down interface N and up interface N + 1"""
+    def __init__(self, vlan_, interfaces):
+        self.vlan = vlan_
+        self.interfaces = interfaces
+
+    def analyze(self):
+        return {
+            self.interfaces[self.vlan.vlan]: 'down',
+            self.interfaces[self.vlan.vlan + 1]: 'up',
+        }
+
+
+@pytest.fixture
+def analyzer():
+    layer2 = nx.MultiDiGraph()
+    interfaces = {}
+    for pk in range(1, 12):
+        interfaces[pk] = FakeInterface(pk, netbox=pk)
+        layer2.add_edge(pk, pk + 1, key=interfaces[pk])
+    routed_vlans = {Mock(vlan=number, pk=number): Mock()
+                    for number in range(1, 11)}
+
+    with patch.object(vlan.VlanGraphAnalyzer, '_build_vlan_router_dict',
+                      return_value=routed_vlans), \
+            patch.object(vlan.VlanGraphAnalyzer,
+                         '_build_unrouted_vlan_seed_dict',
+                         return_value=set()), \
+            patch.object(vlan, 'build_layer2_graph', return_value=layer2), \
+            patch.object(vlan, 'get_stp_blocked_ports', return_value={}), \
+            patch.object(vlan, 'connections'), \
+            patch.object(vlan.VlanGraphAnalyzer, '_make_topology_analyzer',
+                         lambda self, vlan_: FakeTopologyAnalyzer(
+                             vlan_, interfaces)):
+        yield vlan.VlanGraphAnalyzer
+
+
+def _simplify(ifc_vlan_map):
+    return {
+        ifc.pk: {vlan_.vlan: direction for vlan_, direction in vlans.items()}
+        for ifc, vlans in ifc_vlan_map.items()
+    }
+
+
+def test_parallel_analysis_should_give_same_result_as_sequential(analyzer):
+    sequential = analyzer().analyze_all()
+    parallel = analyzer().analyze_all(processes=3)
+    assert _simplify(parallel) == _simplify(sequential)
+    assert _simplify(parallel)[5] == {4: 'up', 5: 'down'}
+
+
+def test_parallel_analysis_should_map_results_to_graph_interfaces(analyzer):
+    instance = analyzer()
+    edge_interfaces = set(ifc for _u, _v, ifc in
+                          instance.layer2.edges(keys=True))
+    result = instance.analyze_all(processes=2)
+    assert all(ifc in edge_interfaces for ifc in result)
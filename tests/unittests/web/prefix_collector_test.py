@@ -0,0 +1,35 @@
+from mock import Mock, patch
+
+from nav.web.api.v1.helpers import prefix_collector
+
+
+def test_collect_active_ips_should_use_a_single_query():
+    prefixes = [Mock(pk=1), Mock(pk=2), Mock(pk=3)]
+    cursor = Mock()
+    cursor.fetchall.return_value = [(1, 10), (3, 0)]
+    with patch.object(prefix_collector, 'connection') as connection:
+        connection.cursor.return_value = cursor
+        result = prefix_collector.collect_active_ips(prefixes)
+
+    assert result == {1: 10, 2: 0, 3: 0}
+    assert cursor.execute.call_count == 1
+    _query, params = cursor.execute.call_args[0]
+    assert params == [(1, 2, 3)]
+
+
+def test_collect_active_ips_should_pass_time_window_parameters():
+    cursor = Mock()
+    cursor.fetchall.return_value = []
+    with patch.object(prefix_collector, 'connection') as connection:
+        connection.cursor.return_value = cursor
+        prefix_collector.collect_active_ips([Mock(pk=1)], 'start', 'end')
+
+    query, params = cursor.execute.call_args[0]
+    assert 'OVERLAPS' in query
+    assert params == ['start', 'end', (1,)]
+
+
+def test_collect_active_ips_should_not_query_for_no_prefixes():
+    with patch.object(prefix_collector, 'connection') as connection:
+        assert prefix_collector.collect_active_ips([]) == {}
+        assert not connection.cursor.called